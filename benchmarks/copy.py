@@ -0,0 +1,192 @@
+"""Measures the throughput of cross provider file copies with and without reading ahead of the upload.
+
+    python -m benchmarks.copy [--megabytes 16] [--bandwidth 50] [--latency 0.001]
+
+Upstream requests are faked. Every chunk a download or an upload moves costs
+``--latency`` seconds plus its size over ``--bandwidth`` megabytes per second,
+as if each direction had its own connection. Filesystem copies read and
+write a temporary folder. ``lock-step`` copies with ``READ_AHEAD_BUDGET``
+set to 0, ``read-ahead`` with its default.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from urllib import parse
+from unittest import mock
+
+from waterbutler.core import settings
+from waterbutler.core import connections
+
+from waterbutler.providers.s3 import S3Provider
+from waterbutler.providers.cloudfiles import CloudFilesProvider
+from waterbutler.providers.filesystem import FileSystemProvider
+
+
+CHUNK_SIZE = 64 * 1024  # aiohttp reads request bodies in chunks of this size
+
+
+class Network:
+
+    def __init__(self, bandwidth, latency):
+        self.bandwidth = bandwidth * 1024 * 1024
+        self.latency = latency
+        self.objects = {}
+
+    @asyncio.coroutine
+    def transfer(self, size):
+        yield from asyncio.sleep(self.latency + size / self.bandwidth)
+
+
+class FakeContent:
+
+    def __init__(self, data, network):
+        self.data = data
+        self.network = network
+
+    @asyncio.coroutine
+    def read(self, size=-1):
+        size = len(self.data) if size < 0 else size
+        chunk, self.data = self.data[:size], self.data[size:]
+        yield from self.network.transfer(len(chunk))
+        return chunk
+
+
+class FakeResponse:
+
+    def __init__(self, status=200, headers=None, content=None):
+        self.status = status
+        self.headers = headers or {}
+        self.content = content
+
+    @asyncio.coroutine
+    def read(self):
+        return b''
+
+    @asyncio.coroutine
+    def read_and_close(self):
+        return b''
+
+    def close(self):
+        pass
+
+
+def headers_for(data):
+    values = {
+        'Content-Length': str(len(data)),
+        'Content-Type': 'application/octet-stream',
+        'Last-Modified': 'Thu, 01 Jan 2015 00:00:00 GMT',
+        'ETag': '"{}"'.format(hashlib.md5(data).hexdigest()),
+    }
+    # S3 metadata reads the upper cased header names aiohttp hands out, CloudFiles the originals
+    values.update({key.upper(): value for key, value in values.items()})
+    values['etag'] = values['ETag']
+    return values
+
+
+def fake_request(network):
+    @asyncio.coroutine
+    def request(method, url, data=None, **kwargs):
+        key = parse.urlparse(url).path
+        method = method.upper()
+
+        if method == 'PUT':
+            md5, chunks = hashlib.md5(), []
+            chunk = yield from data.read(CHUNK_SIZE)
+            while chunk:
+                yield from network.transfer(len(chunk))
+                md5.update(chunk)
+                chunks.append(chunk)
+                chunk = yield from data.read(CHUNK_SIZE)
+            network.objects[key] = b''.join(chunks)
+            return FakeResponse(201, headers_for(network.objects[key]))
+
+        if key not in network.objects:
+            return FakeResponse(404)
+
+        body = network.objects[key]
+        if method == 'HEAD':
+            return FakeResponse(200, headers_for(body))
+        return FakeResponse(200, headers_for(body), FakeContent(body, network))
+
+    return request
+
+
+def s3():
+    return S3Provider({}, {'access_key': 'key', 'secret_key': 'secret'}, {'bucket': 'bucket'})
+
+
+def cloudfiles():
+    provider = CloudFilesProvider(
+        {},
+        {'region': 'iad', 'token': 'token', 'username': 'user', 'temp_key': 'key'},
+        {'container': 'container'},
+    )
+    provider.token = 'token'
+    provider.endpoint = 'https://cloudfiles.example.com/v1/account'
+    return provider
+
+
+def filesystem(folder):
+    return FileSystemProvider({}, {}, {'folder': folder})
+
+
+@asyncio.coroutine
+def seed(provider, network, data):
+    path = yield from provider.validate_path('/source')
+    if isinstance(provider, FileSystemProvider):
+        with open(path.full_path, 'wb') as fp:
+            fp.write(data)
+    elif isinstance(provider, S3Provider):
+        network.objects['/source'] = data
+    else:
+        network.objects['/v1/account/container/source'] = data
+    return path
+
+
+@asyncio.coroutine
+def copy(src, dest, network, data):
+    src_path = yield from seed(src, network, data)
+    dest_path = yield from dest.validate_path('/destination')
+
+    start = time.time()
+    yield from src.copy(dest, src_path, dest_path, handle_naming=False)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--megabytes', type=int, default=16)
+    parser.add_argument('--bandwidth', type=float, default=50, help='megabytes per second')
+    parser.add_argument('--latency', type=float, default=0.001, help='seconds per chunk')
+    args = parser.parse_args()
+
+    data = os.urandom(args.megabytes * 1024 * 1024)
+    loop = asyncio.get_event_loop()
+
+    print('{:<26} {:<12} {:>10} {:>10}'.format('copy', 'mode', 'seconds', 'MB/s'))
+    with tempfile.TemporaryDirectory() as folder:
+        pairs = (
+            ('s3', s3, 'cloudfiles', cloudfiles),
+            ('cloudfiles', cloudfiles, 's3', s3),
+            ('s3', s3, 'filesystem', lambda: filesystem(os.path.join(folder, 'dest'))),
+            ('filesystem', lambda: filesystem(os.path.join(folder, 'src')), 's3', s3),
+            ('cloudfiles', cloudfiles, 'filesystem', lambda: filesystem(os.path.join(folder, 'dest'))),
+            ('filesystem', lambda: filesystem(os.path.join(folder, 'src')), 'cloudfiles', cloudfiles),
+        )
+
+        for src_name, src, dest_name, dest in pairs:
+            for mode, budget in (('lock-step', 0), ('read-ahead', settings.READ_AHEAD_BUDGET)):
+                network = Network(args.bandwidth, args.latency)
+                with mock.patch.object(connections, 'request', fake_request(network)), \
+                        mock.patch.object(settings, 'READ_AHEAD_BUDGET', budget):
+                    seconds = loop.run_until_complete(copy(src(), dest(), network, data))
+                print('{:<26} {:<12} {:>10.2f} {:>10.1f}'.format(
+                    '{} -> {}'.format(src_name, dest_name), mode, seconds, args.megabytes / seconds
+                ))
+
+
+if __name__ == '__main__':
+    main()
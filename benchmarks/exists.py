@@ -0,0 +1,149 @@
+"""Counts the requests and response bytes of ``exists`` checks with and without the providers' own implementations.
+
+    python -m benchmarks.exists [--children 1000]
+
+``metadata`` is :meth:`waterbutler.core.provider.BaseProvider.exists`, which
+calls the provider's full ``metadata``. ``exists`` is the provider's override.
+Upstream responses are faked, every folder holds ``--children`` entries and
+every GitHub repository as many files.
+"""
+import json
+import asyncio
+import argparse
+from unittest import mock
+
+from waterbutler.core import provider
+from waterbutler.core import connections
+from waterbutler.core.path import WaterButlerPath
+
+from waterbutler.providers.s3 import S3Provider
+from waterbutler.providers.github import GitHubProvider
+from waterbutler.providers.dropbox import DropboxProvider
+from waterbutler.providers.github.provider import GitHubPath
+from waterbutler.providers.googledrive import GoogleDriveProvider
+from waterbutler.providers.googledrive.provider import GoogleDrivePath
+
+
+class FakeResponse:
+
+    def __init__(self, status=200, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    @asyncio.coroutine
+    def read(self):
+        return self.body
+
+    @asyncio.coroutine
+    def read_and_close(self):
+        return self.body
+
+    @asyncio.coroutine
+    def json(self):
+        return json.loads(self.body.decode())
+
+    def close(self):
+        pass
+
+
+def s3_listing(count):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><ListBucketResult>' +
+        ''.join(
+            '<Contents><Key>folder/file{0}</Key><Size>1</Size><ETag>"etag"</ETag>'
+            '<LastModified>2015-01-01T00:00:00.000Z</LastModified></Contents>'.format(i)
+            for i in range(count)
+        ) +
+        '</ListBucketResult>'
+    ).encode()
+
+
+def s3_folder(children):
+    def respond(method, url, params):
+        return FakeResponse(body=s3_listing(1 if 'max-keys' in params else children))
+
+    prov = S3Provider({}, {'access_key': 'key', 'secret_key': 'secret'}, {'bucket': 'bucket'})
+    return prov, WaterButlerPath('/folder/'), respond
+
+
+def googledrive_folder(children):
+    def respond(method, url, params):
+        if 'fields=' in url:
+            return FakeResponse(body=json.dumps({'id': 'folder', 'labels': {'trashed': False}}).encode())
+        return FakeResponse(body=json.dumps({'items': [
+            {'id': str(i), 'title': 'file{}'.format(i), 'mimeType': 'text/plain'}
+            for i in range(children)
+        ]}).encode())
+
+    prov = GoogleDriveProvider({}, {'token': 'token'}, {'folder': {'id': 'root', 'name': '/'}})
+    return prov, GoogleDrivePath('/folder/', _ids=['root', 'folder']), respond
+
+
+def dropbox_folder(children):
+    def respond(method, url, params):
+        contents = [] if 'list=false' in url else [
+            {'path': '/folder/file{}'.format(i), 'is_dir': False, 'bytes': 1}
+            for i in range(children)
+        ]
+        return FakeResponse(body=json.dumps({'path': '/folder', 'is_dir': True, 'contents': contents}).encode())
+
+    prov = DropboxProvider({}, {'token': 'token'}, {'folder': '/'})
+    return prov, WaterButlerPath('/folder/', prepend='/'), respond
+
+
+def github_file(children):
+    def respond(method, url, params):
+        if method == 'HEAD':
+            return FakeResponse()
+        if '/commits' in url:
+            return FakeResponse(body=json.dumps([{'commit': {'tree': {'sha': 'tree'}}}]).encode())
+        return FakeResponse(body=json.dumps({'tree': [
+            {'path': 'file{}'.format(i), 'type': 'blob', 'sha': 'sha', 'size': 1}
+            for i in range(children)
+        ]}).encode())
+
+    prov = GitHubProvider({}, {'token': 'token'}, {'owner': 'cat', 'repo': 'food'})
+    path = GitHubPath('/file0')
+    path.parts[-1]._id = ('master', None)
+    return prov, path, respond
+
+
+SCENARIOS = (
+    ('s3 folder', s3_folder),
+    ('googledrive folder', googledrive_folder),
+    ('dropbox folder', dropbox_folder),
+    ('github file', github_file),
+)
+
+
+def measure(check, prov, path, respond):
+    calls = []
+
+    @asyncio.coroutine
+    def request(method, url, params=None, **kwargs):
+        response = respond(method.upper(), url, params or {})
+        calls.append(len(response.body))
+        return response
+
+    with mock.patch.object(connections, 'request', request):
+        asyncio.get_event_loop().run_until_complete(check(prov, path))
+
+    return len(calls), sum(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--children', type=int, default=1000)
+    args = parser.parse_args()
+
+    print('{:<20} {:<10} {:>10} {:>12}'.format('scenario', 'check', 'requests', 'bytes'))
+    for name, scenario in SCENARIOS:
+        prov, path, respond = scenario(args.children)
+        for check_name, check in (('metadata', provider.BaseProvider.exists), ('exists', type(prov).exists)):
+            requests, size = measure(check, prov, path, respond)
+            print('{:<20} {:<10} {:>10} {:>12}'.format(name, check_name, requests, size))
+
+
+if __name__ == '__main__':
+    main()
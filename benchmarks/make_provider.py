@@ -0,0 +1,58 @@
+"""Compares the cost of getting a provider with and without the cached provider registry and pool.
+
+    python -m benchmarks.make_provider [--number 1000]
+
+``cold`` is the first build made by a fresh process, which has to scan the
+``waterbutler.providers`` entry points. ``warm`` is every later build.
+``driver manager`` builds a :class:`stevedore.driver.DriverManager` per call,
+which is how providers used to be built. ``pooled`` reuses an instance from
+:data:`waterbutler.core.utils.provider_pool`.
+"""
+import argparse
+import timeit
+
+from stevedore import driver
+
+from waterbutler.core import utils
+
+
+NAME = 'github'
+ARGS = ({}, {'token': 'naps'}, {'owner': 'cat', 'repo': 'food'})
+
+
+def driver_manager():
+    return driver.DriverManager(
+        namespace='waterbutler.providers',
+        name=NAME,
+        invoke_on_load=True,
+        invoke_args=ARGS,
+    ).driver
+
+
+def cold():
+    utils._provider_classes = None
+    return utils.build_provider(NAME, *ARGS)
+
+
+def warm():
+    return utils.build_provider(NAME, *ARGS)
+
+
+def pooled():
+    return utils.make_provider(NAME, *ARGS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--number', type=int, default=1000)
+    args = parser.parse_args()
+
+    warm()  # Import the provider module outside of the timings
+
+    for name, func in (('driver manager', driver_manager), ('cold', cold), ('warm', warm), ('pooled', pooled)):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3)) / args.number
+        print('{:<15} {:>10.2f} us/call'.format(name, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Measures the CPU cost of zipping folders with and without the per entry compression policy,
+and how deflating on ZIP_COMPRESSION_WORKERS threads scales.
+
+    python -m benchmarks.zip [--megabytes 32] [--files 64] [--chunk-size 65536] [--workers 0,1,2,4]
+
+Each dataset is zipped from memory, so the time measured is the process time
+spent building the archive. ``deflate-all`` deflates every entry with the
+stored lists emptied, ``policy`` stores the entries ``ZIP_STORED_EXTENSIONS``
+and ``ZIP_STORED_TYPES`` match and ``fast`` additionally deflates the rest at
+level 1. Throughput is reported in megabytes of input per second of CPU time,
+which is the rate of one core.
+
+The scaling table zips the text dataset, as large entries split into blocks
+and as small entries opened and deflated ahead, with every worker count of
+``--workers``, 0 deflating on the event loop. It reports wall clock throughput
+and the longest the event loop went without running a 1 ms timer, the latency
+a zip download adds to the other requests of its process.
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+from unittest import mock
+
+from waterbutler.core import streams
+from waterbutler.core import settings
+
+
+WORDS = [b'sample', b'subject', b'response', b'0.125', b'1.75', b'control', b'trial', b'2015-01-01']
+
+
+def text(size):
+    rows = []
+    while size > 0:
+        row = b','.join(random.choice(WORDS) for _ in range(8)) + b'\n'
+        rows.append(row)
+        size -= len(row)
+    return b''.join(rows)
+
+
+def datasets(megabytes, files):
+    size = megabytes * 1024 * 1024 // files
+    names = ('data{}.csv', 'photo{}.jpg', 'clip{}.mp4')
+    return (
+        ('text', [(names[0].format(i), text(size)) for i in range(files)]),
+        ('media', [(names[i % 2 + 1].format(i), os.urandom(size)) for i in range(files)]),
+        ('mixed', [
+            (names[i % 3].format(i), text(size) if i % 3 == 0 else os.urandom(size))
+            for i in range(files)
+        ]),
+    )
+
+
+def opener(data):
+    @asyncio.coroutine
+    def open():
+        return streams.StringStream(data)
+    return open
+
+
+@asyncio.coroutine
+def archive(files, chunk_size):
+    stream = streams.ZipStreamReader(*[(name, streams.StringStream(data)) for name, data in files])
+
+    size, start = 0, time.process_time()
+    chunk = yield from stream.read(chunk_size)
+    while chunk:
+        size += len(chunk)
+        chunk = yield from stream.read(chunk_size)
+    return time.process_time() - start, size
+
+
+@asyncio.coroutine
+def scaling(files, chunk_size):
+    lag, running = [0], [True]
+
+    @asyncio.coroutine
+    def tick():
+        while running[0]:
+            start = time.perf_counter()
+            yield from asyncio.sleep(0.001)
+            lag[0] = max(lag[0], time.perf_counter() - start - 0.001)
+
+    ticker = asyncio.async(tick())
+    stream = streams.ZipStreamReader(*[(name, opener(data)) for name, data in files])
+
+    start = time.perf_counter()
+    chunk = yield from stream.read(chunk_size)
+    while chunk:
+        chunk = yield from stream.read(chunk_size)
+    seconds = time.perf_counter() - start
+
+    running[0] = False
+    yield from ticker
+    return seconds, lag[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--megabytes', type=int, default=32)
+    parser.add_argument('--files', type=int, default=64)
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+    parser.add_argument('--workers', default='0,1,2,4', help='comma separated worker counts')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    modes = (
+        ('deflate-all', settings.ZIP_COMPRESSION_LEVEL, []),
+        ('policy', settings.ZIP_COMPRESSION_LEVEL, None),
+        ('fast', 1, None),
+    )
+
+    print('{:<8} {:<12} {:>10} {:>10} {:>14}'.format('dataset', 'mode', 'seconds', 'ratio', 'MB/s per core'))
+    for dataset, files in datasets(args.megabytes, args.files):
+        total = sum(len(data) for _, data in files)
+        for mode, level, stored in modes:
+            extensions = settings.ZIP_STORED_EXTENSIONS if stored is None else stored
+            types = settings.ZIP_STORED_TYPES if stored is None else stored
+            with mock.patch.object(settings, 'ZIP_COMPRESSION_LEVEL', level), \
+                    mock.patch.object(settings, 'ZIP_STORED_EXTENSIONS', extensions), \
+                    mock.patch.object(settings, 'ZIP_STORED_TYPES', types):
+                seconds, size = loop.run_until_complete(archive(files, args.chunk_size))
+            print('{:<8} {:<12} {:>10.2f} {:>10.3f} {:>14.1f}'.format(
+                dataset, mode, seconds, size / total, total / 1024 / 1024 / seconds
+            ))
+
+    text_files = [
+        ('large{}.csv'.format(i), text(args.megabytes * 1024 * 1024 // 8)) for i in range(4)
+    ] + [
+        ('small{}.csv'.format(i), text(args.megabytes * 1024 * 1024 // 2 // args.files)) for i in range(args.files)
+    ]
+    total = sum(len(data) for _, data in text_files)
+
+    print()
+    print('{:<8} {:>10} {:>10} {:>10} {:>14}'.format('workers', 'seconds', 'MB/s', 'speedup', 'max lag (ms)'))
+    baseline = None
+    for workers in (int(count) for count in args.workers.split(',')):
+        with mock.patch.object(settings, 'ZIP_COMPRESSION_WORKERS', workers):
+            seconds, lag = loop.run_until_complete(scaling(text_files, args.chunk_size))
+        baseline = baseline or seconds
+        print('{:<8} {:>10.2f} {:>10.1f} {:>10.2f} {:>14.1f}'.format(
+            workers, seconds, total / 1024 / 1024 / seconds, baseline / seconds, lag * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
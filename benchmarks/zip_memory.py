@@ -0,0 +1,77 @@
+"""Measures the memory a folder zip holds per entry written, with tracemalloc.
+
+    python -m benchmarks.zip_memory [--entries 20000] [--size 100] [--batch 1000]
+
+Entries of ``--size`` bytes are listed in batches of ``--batch``, as a folder walk
+hands them to the archive, and read back in 64 KiB chunks. Memory is measured
+once every entry is written and before the central directory is, so it is what
+the archive keeps to write the directory. ``records`` is the archive as is,
+``kept-files`` also holds on to every written entry as the archive used to.
+"""
+import asyncio
+import argparse
+import mimetypes
+import tracemalloc
+from unittest import mock
+
+from waterbutler.core import streams
+from waterbutler.core.streams import zip as zip_streams
+
+
+@asyncio.coroutine
+def archive(entries, size, batch):
+    names = iter(range(entries))
+    data = b'x' * size
+
+    @asyncio.coroutine
+    def source():
+        listed = [('folder/file{}.txt'.format(index), streams.StringStream(data)) for _, index in zip(range(batch), names)]
+        return listed or None
+
+    stream = streams.ZipStreamReader(source=source)
+    written = None
+
+    chunk = yield from stream.read(64 * 1024)
+    while chunk:
+        if written is None and len(stream.records) == entries:
+            written = tracemalloc.get_traced_memory()[0]
+        chunk = yield from stream.read(64 * 1024)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    # Loaded on the first entry otherwise, and counted against the first mode
+    mimetypes.init()
+    append = zip_streams.ZipEntryRecords.append
+
+    print('{:<12} {:>14} {:>14} {:>16}'.format('mode', 'held (MB)', 'peak (MB)', 'bytes per entry'))
+    for mode in ('records', 'kept-files'):
+        kept = []
+
+        def keep(records, file):
+            kept.append(file)
+            return append(records, file)
+
+        with mock.patch.object(zip_streams.ZipEntryRecords, 'append', keep if mode == 'kept-files' else append):
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            written = loop.run_until_complete(archive(args.entries, args.size, args.batch))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        held = written - baseline
+        print('{:<12} {:>14.1f} {:>14.1f} {:>16.0f}'.format(
+            mode, held / 1024 / 1024, (peak - baseline) / 1024 / 1024, held / args.entries
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,8 @@ settings.config['TASKS_CONFIG'] = {
 
 import aiohttpretty
 
+from waterbutler.core import breaker
+
 
 def pytest_configure(config):
     config.addinivalue_line(
@@ -19,6 +21,8 @@ def pytest_configure(config):
 def pytest_runtest_setup(item):
     marker = item.get_marker('aiohttpretty')
     if marker is not None:
+        # Upstream failures from one test must not trip breakers for the next
+        breaker.reset()
         aiohttpretty.clear()
         aiohttpretty.activate()
 
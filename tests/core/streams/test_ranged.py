@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+
+
+DATA = bytes(range(256)) * 4
+
+
+class RangeFetcher:
+    """Serves ranges of `data`, tracking how many fetches run at once"""
+
+    def __init__(self, data=DATA, truncate=False):
+        self.data = data
+        self.truncate = truncate
+        self.ranges = []
+        self.running = self.peak = 0
+
+    @asyncio.coroutine
+    def __call__(self, range):
+        self.ranges.append(range)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        yield from asyncio.sleep(0.001)
+        self.running -= 1
+
+        start, end = range
+        if self.truncate:
+            end -= 1
+        return streams.StringStream(self.data[start:end + 1])
+
+
+class TestRangedStream:
+
+    @async
+    def test_reassembles_in_order(self):
+        fetch = RangeFetcher()
+        stream = streams.RangedStream(fetch, len(DATA), part_size=100, window=3)
+
+        assert stream.size == len(DATA)
+        assert (yield from stream.read()) == DATA
+        assert fetch.ranges[:2] == [(0, 99), (100, 199)]
+        assert fetch.ranges[-1] == (1000, 1023)
+
+    @async
+    def test_bounded_window(self):
+        fetch = RangeFetcher()
+        stream = streams.RangedStream(fetch, len(DATA), part_size=100, window=3)
+
+        chunks = []
+        chunk = yield from stream.read(64)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(64)
+
+        assert b''.join(chunks) == DATA
+        assert fetch.peak == 3
+        assert len(fetch.ranges) == 11
+
+    @async
+    def test_uses_first_part(self):
+        fetch = RangeFetcher()
+        first = streams.StringStream(DATA[:100])
+        stream = streams.RangedStream(fetch, len(DATA), first=first, part_size=100, window=2, name='file.bin')
+
+        assert (yield from stream.read()) == DATA
+        assert (0, 99) not in fetch.ranges
+        assert stream.name == 'file.bin'
+
+    @async
+    def test_first_part_is_everything(self):
+        fetch = RangeFetcher()
+        stream = streams.RangedStream(fetch, 10, first=streams.StringStream(DATA[:10]), part_size=100)
+
+        assert (yield from stream.read()) == DATA[:10]
+        assert fetch.ranges == []
+        assert not getattr(stream, 'partial', False)
+
+    @async
+    def test_short_range_raises(self):
+        stream = streams.RangedStream(RangeFetcher(truncate=True), len(DATA), part_size=100, window=2)
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from stream.read()
+
+    @async
+    def test_cancel(self):
+        stream = streams.RangedStream(RangeFetcher(), len(DATA), part_size=100, window=2)
+        parts = list(stream._parts)
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert all(part.cancelled() for part in parts)
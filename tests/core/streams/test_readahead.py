@@ -0,0 +1,108 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import streams
+
+
+class SlowStream(streams.BaseStream):
+    """Hands out `data` in chunks of at most `chunk` bytes, then raises `error` if given"""
+
+    def __init__(self, data, chunk=4, error=None):
+        super().__init__()
+        self.data = data
+        self.chunk = chunk
+        self.error = error
+        self.reads = 0
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @asyncio.coroutine
+    def _read(self, size):
+        yield from asyncio.sleep(0)
+        if not self.data:
+            if self.error:
+                raise self.error
+            self.feed_eof()
+            return b''
+        self.reads += 1
+        chunk, self.data = self.data[:min(size, self.chunk)], self.data[min(size, self.chunk):]
+        return chunk
+
+
+class TestReadAheadStream:
+
+    @async
+    def test_reads_everything(self):
+        stream = streams.ReadAheadStream(SlowStream(b'abcdefghijklmnopqrstuvwxyz'), budget=8, chunk_size=4)
+
+        assert stream.size == 26
+        assert (yield from stream.read()) == b'abcdefghijklmnopqrstuvwxyz'
+        assert stream.at_eof()
+        assert (yield from stream.read()) == b''
+
+    @async
+    def test_reads_in_order(self):
+        stream = streams.ReadAheadStream(SlowStream(b'abcdefghij'), budget=8, chunk_size=4)
+        chunks = []
+
+        chunk = yield from stream.read(3)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(3)
+
+        assert b''.join(chunks) == b'abcdefghij'
+        assert all(len(chunk) <= 3 for chunk in chunks)
+
+    @async
+    def test_reads_ahead_within_budget(self):
+        inner = SlowStream(b'x' * 100, chunk=4)
+        stream = streams.ReadAheadStream(inner, budget=12, chunk_size=4)
+
+        for _ in range(20):
+            yield from asyncio.sleep(0)
+
+        # Three chunks queued and one read waiting for room
+        assert inner.reads == 4
+        assert (yield from stream.read()) == b'x' * 100
+
+    @async
+    def test_raises_errors_after_data(self):
+        stream = streams.ReadAheadStream(SlowStream(b'abcd', error=ConnectionResetError()), budget=8, chunk_size=4)
+
+        assert (yield from stream.read(4)) == b'abcd'
+        with pytest.raises(ConnectionResetError):
+            yield from stream.read(4)
+
+    @async
+    def test_feeds_writers(self):
+        stream = streams.ReadAheadStream(SlowStream(b'abcdefgh'), budget=8, chunk_size=4)
+        written = []
+        stream.add_writer('list', type('Writer', (), {'write': lambda self, data: written.append(data)})())
+
+        yield from stream.read()
+
+        assert b''.join(written) == b'abcdefgh'
+
+    @async
+    def test_cancel(self):
+        stream = streams.ReadAheadStream(SlowStream(b'x' * 100), budget=8, chunk_size=4)
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert stream._task.cancelled()
+
+    @async
+    def test_cancel_passes_on(self):
+        inner = SlowStream(b'x' * 100)
+        inner.cancel = mock.Mock()
+        stream = streams.ReadAheadStream(inner, budget=8, chunk_size=4)
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert inner.cancel.called
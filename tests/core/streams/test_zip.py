@@ -1,11 +1,22 @@
+import gc
 import io
 import os
+import struct
+import asyncio
+import functools
+import weakref
 import tempfile
 import zipfile
+from unittest import mock
+
+import pytest
 
 from tests.utils import async, temp_files
 
 from waterbutler.core import streams
+from waterbutler.core import exceptions
+from waterbutler.core import settings
+from waterbutler.core.streams import zip as zip_streams
 
 
 class TestZipStreamReader:
@@ -118,4 +129,562 @@ class TestZipStreamReader:
         assert zip.testzip() is None
 
         for file in files:
-            assert zip.open(file['filename']).read() == file['contents']
\ No newline at end of file
+            assert zip.open(file['filename']).read() == file['contents']
+
+    @async
+    def test_entries_from_source(self):
+        batches = [
+            [('file1.txt', streams.StringStream('[File One]'))],
+            [],
+            [('sub/file2.txt', streams.StringStream('[File Two]')), ('file3.txt', streams.StringStream('[File Three]'))],
+        ]
+
+        @asyncio.coroutine
+        def source():
+            return batches.pop(0) if batches else None
+
+        stream = streams.ZipStreamReader(source=source)
+
+        chunks = []
+        chunk = yield from stream.read(7)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(7)
+
+        zip = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+        assert zip.testzip() is None
+        assert zip.namelist() == ['file1.txt', 'sub/file2.txt', 'file3.txt']
+        assert zip.open('sub/file2.txt').read() == b'[File Two]'
+
+    @async
+    def test_streams_before_source_is_done(self):
+        listed = asyncio.Future()
+        batches = [[('file1.txt', streams.StringStream('[File One]'))]]
+
+        @asyncio.coroutine
+        def source():
+            if batches:
+                return batches.pop(0)
+            yield from listed
+            return None
+
+        stream = streams.ZipStreamReader(source=source)
+
+        first = yield from stream.read(1024)
+        assert first.startswith(b'PK\x03\x04')
+        assert not listed.done()
+
+        listed.set_result(None)
+        zip = zipfile.ZipFile(io.BytesIO(first + (yield from stream.read())))
+
+        assert zip.testzip() is None
+        assert zip.namelist() == ['file1.txt']
+
+    @async
+    def test_empty_source(self):
+        @asyncio.coroutine
+        def source():
+            return None
+
+        zip = zipfile.ZipFile(io.BytesIO((yield from streams.ZipStreamReader(source=source).read())))
+
+        assert zip.namelist() == []
+
+    def test_cancel_stops_source(self):
+        cancel_source = mock.Mock()
+        stream = streams.ZipStreamReader(source=mock.Mock(), cancel_source=cancel_source)
+
+        stream.cancel()
+        stream.close()
+
+        assert cancel_source.call_count == 1
+
+
+class TestZipPrefetch:
+
+    def openers(self, contents, opened):
+        def opener(name, data):
+            @asyncio.coroutine
+            def open():
+                opened.append(name)
+                return streams.StringStream(data)
+            return open
+        return [(name, opener(name, data)) for name, data in contents]
+
+    @async
+    def test_opens_upcoming_entries(self):
+        opened = []
+        contents = [('file{}'.format(i), b'x' * 10) for i in range(6)]
+        stream = streams.ZipStreamReader(*self.openers(contents, opened), prefetch=2)
+        yield from asyncio.sleep(0)
+
+        # The first entry opens when it is read, the next two ahead of it
+        assert opened == ['file1', 'file2']
+
+        zip = zipfile.ZipFile(io.BytesIO((yield from stream.read())))
+
+        assert zip.testzip() is None
+        assert zip.namelist() == [name for name, _ in contents]
+        assert sorted(opened) == sorted(name for name, _ in contents)
+
+    @async
+    def test_disabled(self):
+        opened = []
+        stream = streams.ZipStreamReader(*self.openers([('a', b'a'), ('b', b'b')], opened), prefetch=0)
+        yield from asyncio.sleep(0)
+
+        assert opened == []
+        yield from stream.read()
+        assert opened == ['a', 'b']
+
+    @async
+    def test_small_entries_are_buffered_within_budget(self, monkeypatch):
+        monkeypatch.setattr(settings, 'ZIP_PREFETCH_BUFFER_SIZE', 10)
+        monkeypatch.setattr(settings, 'ZIP_PREFETCH_BUDGET', 15)
+        contents = [('first', b'1'), ('small', b's' * 10), ('also', b'a' * 10), ('large', b'l' * 20)]
+        stream = streams.ZipStreamReader(*self.openers(contents, []), prefetch=3)
+        for _ in range(5):
+            yield from asyncio.sleep(0)
+
+        files = {file.zinfo.filename: file.data for file in stream.files}
+        assert files['small']._reserved == 10
+        # Does not fit next to small, too large to buffer at all
+        assert files['also']._reserved == 0
+        assert files['large']._reserved == 0
+        assert stream.budget.available == 5
+
+        zip = zipfile.ZipFile(io.BytesIO((yield from stream.read())))
+
+        assert zip.open('small').read() == b's' * 10
+        assert stream.budget.available == 15
+
+    @async
+    def test_cancel_closes_prefetched_entries(self, monkeypatch):
+        monkeypatch.setattr(settings, 'ZIP_PREFETCH_BUFFER_SIZE', 0)
+        opened, blocked = streams.StringStream(b'opened'), asyncio.Future()
+        opened.close = mock.Mock()
+
+        @asyncio.coroutine
+        def slow():
+            yield from blocked
+
+        stream = streams.ZipStreamReader(
+            ('first', streams.StringStream(b'1')),
+            ('opened', asyncio.coroutine(lambda: opened)),
+            ('slow', slow),
+            prefetch=2,
+        )
+        opening = stream.files[2].data._opening
+        yield from asyncio.sleep(0)
+
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert opened.close.called
+        assert opening.cancelled()
+
+
+class TestZipCompression:
+
+    @asyncio.coroutine
+    def archive(self, *files, chunk_size=-1):
+        stream = streams.ZipStreamReader(*files)
+        chunks = []
+        chunk = yield from stream.read(chunk_size)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(chunk_size)
+        return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    @async
+    def test_compressed_types_are_stored(self):
+        zip = yield from self.archive(
+            ('photo.JPG', streams.StringStream(b'x' * 100)),
+            ('notes.txt', streams.StringStream(b'x' * 100)),
+            ('clip', streams.StringStream(b'x' * 100), 'video/mp4'),
+        )
+
+        types = {info.filename: info.compress_type for info in zip.infolist()}
+        assert types == {'photo.JPG': zipfile.ZIP_STORED, 'notes.txt': zipfile.ZIP_DEFLATED, 'clip': zipfile.ZIP_STORED}
+        assert zip.testzip() is None
+        assert zip.open('photo.JPG').read() == b'x' * 100
+
+    @async
+    def test_level_zero_stores_everything(self, monkeypatch):
+        monkeypatch.setattr(settings, 'ZIP_COMPRESSION_LEVEL', 0)
+
+        zip = yield from self.archive(('notes.txt', streams.StringStream(b'x' * 100)))
+
+        assert zip.infolist()[0].compress_type == zipfile.ZIP_STORED
+        assert zip.infolist()[0].compress_size == 100
+
+    @async
+    def test_no_flush_per_chunk(self):
+        zip = yield from self.archive(('notes.txt', streams.StringStream(b'x' * 100000)), chunk_size=100)
+
+        # One sync flush marker per read would add several bytes per 100 byte chunk
+        assert zip.infolist()[0].compress_size < 1000
+        assert zip.open('notes.txt').read() == b'x' * 100000
+
+    @async
+    def test_empty_entries(self):
+        zip = yield from self.archive(('empty.txt', streams.StringStream(b'')), ('empty.jpg', streams.StringStream(b'')))
+
+        assert zip.testzip() is None
+        assert zip.open('empty.txt').read() == b''
+
+
+class TestZipEntryRecords:
+
+    @async
+    def test_written_entries_are_released(self):
+        stream = streams.ZipStreamReader(*[('file{}.txt'.format(i), streams.StringStream('x' * i)) for i in range(3)])
+        files = [weakref.ref(file) for file in stream.files]
+
+        data = yield from stream.read()
+        gc.collect()
+
+        assert [file() for file in files] == [None, None, None]
+        assert stream.files == []
+        assert len(stream.records) == 3
+        assert zipfile.ZipFile(io.BytesIO(data)).testzip() is None
+
+    @async
+    def test_records(self):
+        stream = streams.ZipStreamReader(('a.txt', streams.StringStream('aaa')), ('sub/b.jpg', streams.StringStream('b')))
+
+        archive = zipfile.ZipFile(io.BytesIO((yield from stream.read())))
+        records = list(stream.records)
+
+        assert [record.filename for record in records] == [b'a.txt', b'sub/b.jpg']
+        for record, info in zip(records, archive.infolist()):
+            assert record.header_offset == info.header_offset
+            assert record.crc == info.CRC
+            assert record.compressed_size == info.compress_size
+            assert record.original_size == info.file_size
+            assert record.compress_type == info.compress_type
+        assert stream.records.size == archive.start_dir
+
+
+class UnsizedStream(streams.StringStream):
+    size = None
+
+
+class TestZip64:
+
+    @asyncio.coroutine
+    def archive(self, *files):
+        stream = streams.ZipStreamReader(*files)
+        chunks = []
+        chunk = yield from stream.read(64)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(64)
+        return b''.join(chunks)
+
+    @async
+    def test_large_entries(self, monkeypatch):
+        monkeypatch.setattr(zip_streams, 'ZIP64_LIMIT', 1000)
+        big, small = os.urandom(2000), b'small'
+
+        data = yield from self.archive(
+            ('big.bin', streams.StringStream(big)),
+            ('small.txt', streams.StringStream(small)),
+        )
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        assert zip.open('big.bin').read() == big
+        assert zip.open('small.txt').read() == small
+        assert zip.getinfo('big.bin').file_size == 2000
+        # Found through the Zip64 extra field of its directory header
+        assert zip.getinfo('small.txt').header_offset > 2000
+
+        # The local header of the large entry announces Zip64, its descriptor has 64 bit sizes
+        header = struct.unpack(zipfile.structFileHeader, data[:zipfile.sizeFileHeader])
+        assert header[zipfile._FH_EXTRACT_VERSION] == zipfile.ZIP64_VERSION
+        assert header[zipfile._FH_EXTRA_FIELD_LENGTH] == 20
+        offset = zipfile.sizeFileHeader + len('big.bin') + 20 + zip.getinfo('big.bin').compress_size
+        assert struct.unpack('<4sLQQ', data[offset:offset + 24])[2:] == (zip.getinfo('big.bin').compress_size, 2000)
+
+    @async
+    def test_entries_growing_past_the_limit(self, monkeypatch):
+        monkeypatch.setattr(zip_streams, 'ZIP64_LIMIT', 1000)
+        big = os.urandom(2000)
+
+        data = yield from self.archive(('big.bin', UnsizedStream(big)))
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.open('big.bin').read() == big
+        header = struct.unpack(zipfile.structFileHeader, data[:zipfile.sizeFileHeader])
+        assert header[zipfile._FH_EXTRA_FIELD_LENGTH] == 0
+        offset = zipfile.sizeFileHeader + len('big.bin') + zip.getinfo('big.bin').compress_size
+        assert data[offset:offset + 4] == b'PK\x07\x08'
+        assert struct.unpack('<4sLQQ', data[offset:offset + 24])[2:] == (zip.getinfo('big.bin').compress_size, 2000)
+
+    @async
+    def test_many_entries(self, monkeypatch):
+        monkeypatch.setattr(zip_streams, 'ZIP_FILECOUNT_LIMIT', 3)
+        files = [('file{}.txt'.format(i), streams.StringStream(str(i))) for i in range(4)]
+
+        data = yield from self.archive(*files)
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zipfile.stringEndArchive64 in data
+        assert zip.namelist() == ['file0.txt', 'file1.txt', 'file2.txt', 'file3.txt']
+        assert zip.open('file3.txt').read() == b'3'
+
+    @async
+    def test_small_archives_are_not_zip64(self):
+        data = yield from self.archive(('file.txt', streams.StringStream('content')))
+
+        assert zipfile.stringEndArchive64 not in data
+        assert len(data) == (
+            zipfile.sizeFileHeader + len('file.txt') + zipfile.ZipFile(io.BytesIO(data)).getinfo('file.txt').compress_size +
+            16 + zipfile.sizeCentralDir + len('file.txt') + zipfile.sizeEndCentDir
+        )
+
+
+class TestParallelDeflate:
+
+    @asyncio.coroutine
+    def archive(self, *files):
+        stream = streams.ZipStreamReader(*files)
+        chunks = []
+        chunk = yield from stream.read(1000)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(1000)
+        return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    def text(self):
+        return b''.join('line {} of {}\n'.format(i, i % 7).encode('utf-8') for i in range(5000))
+
+    @async
+    def test_blocks_form_one_stream(self, monkeypatch):
+        monkeypatch.setattr(settings, 'ZIP_COMPRESSION_BLOCK_SIZE', 1000)
+        data = self.text()
+
+        zip = yield from self.archive(('a.txt', streams.StringStream(data)), ('empty.txt', streams.StringStream(b'')))
+
+        assert zip.testzip() is None
+        assert zip.open('a.txt').read() == data
+        assert zip.open('empty.txt').read() == b''
+
+    @async
+    def test_compresses_like_a_single_stream(self, monkeypatch):
+        data = self.text()
+        parallel = yield from self.archive(('a.txt', streams.StringStream(data)))
+
+        monkeypatch.setattr(settings, 'ZIP_COMPRESSION_WORKERS', 0)
+        serial = yield from self.archive(('a.txt', streams.StringStream(data)))
+
+        # Blocks carry the end of the one before as their dictionary
+        assert parallel.getinfo('a.txt').compress_size < serial.getinfo('a.txt').compress_size * 1.05
+        assert serial.open('a.txt').read() == data
+
+    def test_no_workers(self, monkeypatch):
+        monkeypatch.setattr(settings, 'ZIP_COMPRESSION_WORKERS', 0)
+        stream = streams.ZipStreamReader(('a.txt', streams.StringStream(b'content')))
+
+        assert not isinstance(stream.files[0].compressor, zip_streams.ParallelDeflate)
+
+    @async
+    def test_prefetched_entries_are_deflated_ahead(self):
+        contents = [('file{}.txt'.format(i), self.text()) for i in range(3)]
+        stream = streams.ZipStreamReader(*TestZipPrefetch().openers(contents, []), prefetch=2)
+        for _ in range(5):
+            yield from asyncio.sleep(0)
+
+        assert [len(file.compressor.blocks) for file in stream.files] == [0, 1, 1]
+
+        zip = zipfile.ZipFile(io.BytesIO((yield from stream.read())))
+
+        assert zip.testzip() is None
+        assert zip.open('file2.txt').read() == contents[2][1]
+
+
+FILES = [('a.txt', b'first file'), ('sub/b.jpg', bytes(range(256)) * 8), ('empty', b''), ('c.csv', b'x,y\n' * 50)]
+
+
+class Upstream:
+    """Serves stored archive entries out of `files`, honouring ranges unless `ranges` is False"""
+
+    def __init__(self, files=FILES, ranges=True, sizes=None, keys=True, modified=None):
+        self.files = files
+        self.ranges = ranges
+        self.sizes = sizes or {}
+        self.keys = keys
+        self.modified = modified
+        self.fetched = []
+
+    def entries(self):
+        return [
+            (
+                name,
+                self.sizes.get(name, len(data)),
+                functools.partial(self.fetch, name, data),
+                'key:' + name if self.keys else None,
+                self.modified,
+            )
+            for name, data in self.files
+        ]
+
+    @asyncio.coroutine
+    def fetch(self, name, data, range=None):
+        self.fetched.append((name, range))
+        if range is None or not self.ranges:
+            return streams.StringStream(data)
+        stream = streams.StringStream(data[range[0]:range[1] + 1])
+        stream.partial = True
+        return stream
+
+
+class TestStoredZipArchive:
+
+    def archive(self, upstream, crcs=None):
+        return streams.StoredZipArchive(upstream.entries(), crcs=crcs or zip_streams.CrcCache(100))
+
+    @async
+    def test_full_archive(self):
+        archive = self.archive(Upstream())
+
+        data = yield from archive.stream().read()
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert len(data) == archive.size
+        assert zip.testzip() is None
+        assert [info.filename for info in zip.infolist()] == [name for name, _ in FILES]
+        for name, content in FILES:
+            assert zip.open(name).read() == content
+            assert zip.getinfo(name).compress_type == zipfile.ZIP_STORED
+            assert zip.getinfo(name).date_time == (1980, 1, 1, 0, 0, 0)
+
+    @async
+    def test_deterministic(self):
+        first = yield from self.archive(Upstream()).stream().read()
+        second = yield from self.archive(Upstream()).stream().read()
+
+        assert first == second
+        assert self.archive(Upstream()).etag == self.archive(Upstream()).etag
+        assert self.archive(Upstream()).etag != self.archive(Upstream(files=FILES[:2])).etag
+
+    def test_etag_needs_keys_or_modified(self):
+        before = self.archive(Upstream(keys=False, modified='yesterday')).etag
+
+        assert before is not None
+        assert self.archive(Upstream(keys=False, modified='today')).etag != before
+        assert self.archive(Upstream(keys=False)).etag is None
+
+    @async
+    def test_ranges(self):
+        full = yield from self.archive(Upstream()).stream().read()
+        size = len(full)
+
+        for start, end in ((0, 10), (5, 100), (40, 2000), (100, size - 30), (size - 30, size), (0, size), (size - 1, size)):
+            for ranges in (True, False):
+                stream = self.archive(Upstream(ranges=ranges)).stream(start, end)
+                assert stream.size == end - start
+                assert (yield from stream.read()) == full[start:end]
+
+    @async
+    def test_ranges_fetch_what_they_overlap(self):
+        upstream = Upstream()
+        archive = self.archive(upstream)
+        data = archive.offsets[1] + len(archive.files[1].local_header)
+
+        chunk = yield from archive.stream(data + 10, data + 20).read()
+
+        assert chunk == FILES[1][1][10:20]
+        assert upstream.fetched == [('sub/b.jpg', (10, 19))]
+
+    @async
+    def test_descriptors_need_whole_entries(self):
+        upstream = Upstream()
+        archive = self.archive(upstream)
+        descriptor = archive.offsets[2] - 16
+
+        yield from archive.stream(descriptor - 10, descriptor + 16).read()
+
+        # Reading from the start of the entry computes its CRC
+        assert upstream.fetched == [('sub/b.jpg', None)]
+
+    @async
+    def test_directory_uses_known_crcs(self):
+        crcs = zip_streams.CrcCache(100)
+        full = yield from self.archive(Upstream(), crcs=crcs).stream().read()
+
+        upstream = Upstream()
+        archive = self.archive(upstream, crcs=crcs)
+        tail = yield from archive.stream(archive.directory_offset).read()
+
+        assert tail == full[archive.directory_offset:]
+        assert upstream.fetched == []
+
+        upstream = Upstream()
+        archive = self.archive(upstream)
+        assert (yield from archive.stream(archive.directory_offset).read()) == tail
+        # The empty entry is never fetched
+        assert sorted(upstream.fetched) == [('a.txt', None), ('c.csv', None), ('sub/b.jpg', None)]
+
+    def test_needs_downloads(self):
+        archive = self.archive(Upstream())
+        data = archive.offsets[1] + len(archive.files[1].local_header)
+        descriptor = archive.offsets[2] - 16
+
+        assert not archive.needs_downloads()
+        assert not archive.needs_downloads(data + 10, data + 20)
+        assert not archive.needs_downloads(data - 5, descriptor + 16)
+        assert archive.needs_downloads(data + 10, descriptor + 16)
+        assert archive.needs_downloads(archive.directory_offset)
+
+        archive.crcs.set('key:a.txt', 1)
+        archive.crcs.set('key:sub/b.jpg', 2)
+        archive.crcs.set('key:c.csv', 3)
+        assert not archive.needs_downloads(archive.directory_offset)
+
+    @async
+    def test_shares_crcs_through_the_client(self):
+        client = mock.Mock()
+        client.mget.return_value = [None, None, None]
+        crcs = zip_streams.CrcCache(100, client=client)
+        full = yield from self.archive(Upstream(), crcs=crcs).stream().read()
+        yield from asyncio.sleep(0.01)
+
+        known = {call[0][0]: call[0][1] for call in client.set.call_args_list}
+        assert sorted(known) == ['waterbutler:zip-crc:key:' + name for name in ('a.txt', 'c.csv', 'sub/b.jpg')]
+
+        # Another process knows them from the client alone
+        client.mget.side_effect = lambda keys: [str(known[key]).encode() for key in keys]
+        upstream = Upstream()
+        archive = self.archive(upstream, crcs=zip_streams.CrcCache(100, client=client))
+        yield from archive.load_crcs()
+
+        assert not archive.needs_downloads(archive.directory_offset)
+        assert (yield from archive.stream(archive.directory_offset).read()) == full[archive.directory_offset:]
+        assert upstream.fetched == []
+
+    @async
+    def test_changed_entries_raise(self):
+        archive = self.archive(Upstream(sizes={'a.txt': 5}))
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from archive.stream().read()
+
+        archive = self.archive(Upstream(sizes={'a.txt': 50}))
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from archive.stream().read()
+
+    @async
+    def test_zip64(self, monkeypatch):
+        monkeypatch.setattr(zip_streams, 'ZIP64_LIMIT', 1000)
+        archive = self.archive(Upstream())
+
+        data = yield from archive.stream().read()
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert len(data) == archive.size
+        assert zip.open('sub/b.jpg').read() == FILES[1][1]
+        assert zip.open('c.csv').read() == FILES[3][1]
@@ -0,0 +1,172 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import breaker
+from waterbutler.core import exceptions
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.reset()
+    breaker.reset()
+
+
+@pytest.fixture
+def circuit():
+    return breaker.CircuitBreaker('mock', 'example.com', window=4, min_requests=4, error_rate=0.5, reset_timeout=10)
+
+
+def responder(status, headers=None):
+    @asyncio.coroutine
+    def send():
+        return mock.Mock(status=status, headers=headers or {})
+    return send
+
+
+@asyncio.coroutine
+def refuse():
+    raise OSError('Connection refused')
+
+
+def trip(circuit):
+    for _ in range(4):
+        circuit.record(True)
+
+
+class TestCircuitBreaker:
+
+    def test_starts_closed(self, circuit):
+        assert circuit.state == breaker.CLOSED
+        assert circuit.before_request() is False
+
+    def test_needs_min_requests(self, circuit):
+        for _ in range(3):
+            circuit.record(True)
+
+        assert circuit.state == breaker.CLOSED
+
+    def test_opens_at_error_rate(self, circuit):
+        circuit.record(False)
+        circuit.record(True)
+        circuit.record(False)
+        circuit.record(True)
+
+        assert circuit.state == breaker.OPEN
+        assert metrics.snapshot()['breaker'] == {'mock.opened': 1}
+
+    def test_open_fails_fast(self, circuit):
+        trip(circuit)
+
+        with pytest.raises(exceptions.UpstreamUnavailableError) as e:
+            circuit.before_request()
+
+        assert e.value.code == 503
+        assert isinstance(e.value, exceptions.ProviderError)
+        assert metrics.snapshot()['breaker']['mock.rejected'] == 1
+
+    def test_half_open_probe(self, circuit):
+        trip(circuit)
+
+        with mock.patch('time.monotonic', return_value=circuit._opened_at + 10):
+            assert circuit.state == breaker.HALF_OPEN
+            assert circuit.before_request() is True
+
+            with pytest.raises(exceptions.UpstreamUnavailableError):
+                circuit.before_request()
+
+    def test_successful_probe_closes(self, circuit):
+        trip(circuit)
+
+        with mock.patch('time.monotonic', return_value=circuit._opened_at + 10):
+            circuit.record(False, circuit.before_request())
+
+        assert circuit.state == breaker.CLOSED
+        assert circuit.before_request() is False
+
+    def test_failed_probe_reopens(self, circuit):
+        trip(circuit)
+        opened_at = circuit._opened_at
+
+        with mock.patch('time.monotonic', return_value=opened_at + 10):
+            circuit.record(True, circuit.before_request())
+
+        assert circuit._opened_at == opened_at + 10
+        assert circuit._state == breaker.OPEN
+
+    @async
+    def test_send_records_outcomes(self, circuit):
+        for _ in range(2):
+            yield from circuit.send(responder(200))
+
+        for _ in range(2):
+            with pytest.raises(OSError):
+                yield from circuit.send(refuse)
+
+        assert circuit.state == breaker.OPEN
+
+    @async
+    def test_client_errors_do_not_count(self, circuit):
+        for _ in range(4):
+            yield from circuit.send(responder(404))
+
+        assert circuit.state == breaker.CLOSED
+
+    @async
+    def test_server_errors_count(self, circuit):
+        for _ in range(4):
+            yield from circuit.send(responder(502))
+
+        assert circuit.state == breaker.OPEN
+
+    @async
+    def test_throttling_does_not_count(self, circuit):
+        for status in (429, 503, 429, 503):
+            yield from circuit.send(responder(status, {'Retry-After': '10'}))
+
+        assert circuit.state == breaker.CLOSED
+
+    @async
+    def test_unavailable_without_retry_after_counts(self, circuit):
+        for _ in range(4):
+            yield from circuit.send(responder(503))
+
+        assert circuit.state == breaker.OPEN
+
+
+class TestBreakerFor:
+
+    def test_keyed_by_provider_and_host(self):
+        first = breaker.breaker_for('mock', 'https://example.com/foo')
+
+        assert first is breaker.breaker_for('mock', 'https://example.com/bar?baz=1')
+        assert first is not breaker.breaker_for('mock', 'https://other.example.com/foo')
+        assert first is not breaker.breaker_for('other', 'https://example.com/foo')
+
+    def test_evicts_least_recently_used(self, monkeypatch):
+        monkeypatch.setattr(breaker.settings, 'BREAKER_MAX_UPSTREAMS', 2)
+        first = breaker.breaker_for('mock', 'https://first.example.com')
+        second = breaker.breaker_for('mock', 'https://second.example.com')
+        assert breaker.breaker_for('mock', 'https://first.example.com') is first
+
+        breaker.breaker_for('mock', 'https://third.example.com')
+
+        assert breaker.breaker_for('mock', 'https://first.example.com') is first
+        assert breaker.breaker_for('mock', 'https://second.example.com') is not second
+
+    def test_states(self):
+        breaker.breaker_for('mock', 'https://example.com/foo')
+        down = breaker.breaker_for('mock', 'https://down.example.com/foo')
+        for _ in range(breaker.settings.BREAKER_MIN_REQUESTS):
+            down.record(True)
+
+        assert breaker.states() == {
+            'mock': {
+                'example.com': 'closed',
+                'down.example.com': 'open',
+            }
+        }
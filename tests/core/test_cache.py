@@ -0,0 +1,247 @@
+import re
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import cache
+from waterbutler.core import metrics
+from waterbutler.core.path import WaterButlerPath
+
+
+class FakeRedis:
+    """Just enough of redis.StrictRedis for the redis backend"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        # Only trailing wildcards are used
+        prefix = re.sub(r'\\(.)', r'\1', match[:-1])
+        return [key for key in list(self.hashes) if key.startswith(prefix)]
+
+
+class CachedProvider(utils.MockProvider1):
+    NAME = 'cached'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    @cache.cached
+    @asyncio.coroutine
+    def metadata(self, path, revision=None, **kwargs):
+        self.calls += 1
+        return {'path': str(path), 'revision': revision, 'calls': self.calls}
+
+    @cache.invalidates
+    @asyncio.coroutine
+    def upload(self, stream, path, **kwargs):
+        return {'path': str(path)}, True
+
+    @cache.invalidates
+    @asyncio.coroutine
+    def delete(self, path, **kwargs):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def metadata_cache(request, monkeypatch):
+    if request.param == 'memory':
+        backend = cache.MemoryBackend(size=10)
+    else:
+        backend = cache.RedisBackend(FakeRedis())
+
+    metadata_cache = cache.MetadataCache(backend, ttl=60, ttls={'short': 0})
+    monkeypatch.setattr(cache, 'metadata_cache', metadata_cache)
+    return metadata_cache
+
+
+@pytest.fixture
+def provider():
+    return CachedProvider({}, {'token': 'a'}, {'folder': 'f'})
+
+
+class TestMemoryBackend:
+
+    def test_lru(self):
+        backend = cache.MemoryBackend(size=2)
+        backend.set('a', 'x', b'1', 60)
+        backend.set('b', 'x', b'2', 60)
+        backend.get('a', 'x')
+        backend.set('c', 'x', b'3', 60)
+
+        assert backend.get('a', 'x') == b'1'
+        assert backend.get('b', 'x') is None
+        assert backend.get('c', 'x') == b'3'
+
+    def test_expires(self):
+        backend = cache.MemoryBackend()
+
+        with mock.patch('time.time', return_value=0):
+            backend.set('a', 'x', b'1', 10)
+
+        with mock.patch('time.time', return_value=11):
+            assert backend.get('a', 'x') is None
+
+    def test_delete_drops_variants(self):
+        backend = cache.MemoryBackend()
+        backend.set('a', 'x', b'1', 60)
+        backend.set('a', 'y', b'2', 60)
+
+        backend.delete('a')
+
+        assert backend.get('a', 'x') is None
+        assert backend.get('a', 'y') is None
+
+
+class TestCached:
+
+    @async
+    def test_disabled_by_default(self, provider, monkeypatch):
+        monkeypatch.setattr(cache, 'metadata_cache', None)
+
+        yield from provider.metadata(WaterButlerPath('/foo'))
+        yield from provider.metadata(WaterButlerPath('/foo'))
+
+        assert provider.calls == 2
+
+    @async
+    def test_serves_from_cache(self, provider, metadata_cache):
+        first = yield from provider.metadata(WaterButlerPath('/foo'))
+        second = yield from provider.metadata(WaterButlerPath('/foo'))
+
+        assert first == second
+        assert provider.calls == 1
+        assert metrics.snapshot()['metadata_cache'] == {'cached.misses': 1, 'cached.hits': 1}
+
+    @async
+    def test_hits_are_copies(self, provider, metadata_cache):
+        yield from provider.metadata(WaterButlerPath('/foo'))
+        first = yield from provider.metadata(WaterButlerPath('/foo'))
+        first['path'] = '/changed'
+
+        second = yield from provider.metadata(WaterButlerPath('/foo'))
+
+        assert second['path'] == '/foo'
+
+    @async
+    def test_keyed_by_arguments(self, provider, metadata_cache):
+        yield from provider.metadata(WaterButlerPath('/foo'))
+        yield from provider.metadata(WaterButlerPath('/foo'), revision='1')
+        yield from provider.metadata(WaterButlerPath('/foo'), revision='1')
+        yield from provider.metadata(WaterButlerPath('/foo', _ids=('root', 'id')))
+
+        assert provider.calls == 3
+
+    @async
+    def test_keyed_by_provider(self, provider, metadata_cache):
+        other = CachedProvider({}, {'token': 'b'}, {'folder': 'f'})
+
+        yield from provider.metadata(WaterButlerPath('/foo'))
+        yield from other.metadata(WaterButlerPath('/foo'))
+
+        assert provider.calls == 1
+        assert other.calls == 1
+
+    @async
+    def test_per_provider_ttl(self, provider, metadata_cache):
+        provider.NAME = 'short'
+
+        yield from provider.metadata(WaterButlerPath('/foo'))
+        yield from provider.metadata(WaterButlerPath('/foo'))
+
+        assert provider.calls == 2
+
+    @async
+    def test_backend_errors_are_misses(self, provider, metadata_cache):
+        metadata_cache.backend = mock.Mock(blocking=False)
+        metadata_cache.backend.get.side_effect = ConnectionError()
+
+        yield from provider.metadata(WaterButlerPath('/foo'))
+
+        assert provider.calls == 1
+        assert metrics.snapshot()['metadata_cache']['errors'] == 1
+
+
+class TestInvalidates:
+
+    @async
+    def test_upload_invalidates_path_and_parent(self, provider, metadata_cache):
+        yield from provider.metadata(WaterButlerPath('/folder/'))
+        yield from provider.metadata(WaterButlerPath('/folder/file'))
+        yield from provider.metadata(WaterButlerPath('/other/'))
+
+        yield from provider.upload(None, WaterButlerPath('/folder/file'))
+
+        yield from provider.metadata(WaterButlerPath('/folder/'))
+        yield from provider.metadata(WaterButlerPath('/folder/file'))
+        yield from provider.metadata(WaterButlerPath('/other/'))
+
+        assert provider.calls == 5
+
+    @async
+    def test_delete_invalidates(self, provider, metadata_cache):
+        yield from provider.metadata(WaterButlerPath('/file'))
+
+        yield from provider.delete(WaterButlerPath('/file'))
+        yield from provider.metadata(WaterButlerPath('/file'))
+
+        assert provider.calls == 2
+
+    @async
+    def test_folder_delete_invalidates_contents(self, provider, metadata_cache):
+        for name in ('/fo*der/', '/fo*der/sub/file', '/fo*der-other/file'):
+            yield from provider.metadata(WaterButlerPath(name))
+
+        yield from provider.delete(WaterButlerPath('/fo*der/'))
+        for name in ('/fo*der/', '/fo*der/sub/file', '/fo*der-other/file'):
+            yield from provider.metadata(WaterButlerPath(name))
+
+        assert provider.calls == 5
+
+    @async
+    def test_delete_many_invalidates_every_path(self, provider, metadata_cache):
+        paths = [WaterButlerPath('/a/file'), WaterButlerPath('/b/')]
+        for path in paths:
+            yield from provider.metadata(path)
+
+        yield from provider.delete_many(paths)
+        for path in paths:
+            yield from provider.metadata(path)
+
+        assert provider.calls == 4
+
+    @async
+    def test_move_invalidates_both_sides(self, provider, metadata_cache):
+        src, dest = WaterButlerPath('/src/file'), WaterButlerPath('/dest/file')
+        yield from provider.metadata(src.parent)
+        yield from provider.metadata(dest.parent)
+
+        yield from provider.move(provider, src, dest, handle_naming=False)
+
+        yield from provider.metadata(src.parent)
+        yield from provider.metadata(dest.parent)
+
+        assert provider.calls == 4
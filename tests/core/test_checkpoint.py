@@ -0,0 +1,188 @@
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import checkpoint
+
+
+class DictStore:
+
+    def __init__(self):
+        self.values = {}
+        self.sets = 0
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.sets += 1
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class BrokenStore:
+
+    def get(self, key):
+        raise ConnectionError
+
+    set = delete = get
+
+
+class HashedMetadata(utils.MockFileMetadata):
+
+    def __init__(self, size=1337, md5=None):
+        super().__init__()
+        self.size = size
+        self.md5 = md5
+
+    @property
+    def extra(self):
+        return {'hashes': {'md5': self.md5}} if self.md5 else {}
+
+
+@pytest.fixture
+def store():
+    return DictStore()
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+class TestMatches:
+
+    def test_unrecorded(self):
+        manifest = checkpoint.Manifest('key')
+
+        assert manifest.matches('/a', HashedMetadata()) is False
+
+    def test_missing_at_destination(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/a', HashedMetadata())
+
+        assert manifest.matches('/a', None) is False
+
+    def test_size_and_hash(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/a', HashedMetadata(md5='abc'))
+
+        assert manifest.matches('/a', HashedMetadata(md5='abc')) is True
+        assert manifest.matches('/a', HashedMetadata(md5='def')) is False
+        assert manifest.matches('/a', HashedMetadata(size=1, md5='abc')) is False
+
+    def test_unknown_hash_is_not_compared(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/a', HashedMetadata(md5='abc'))
+
+        assert manifest.matches('/a', HashedMetadata()) is True
+
+    def test_unknown_size_and_hash_is_transferred_again(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/a', HashedMetadata(size=None))
+
+        assert manifest.matches('/a', HashedMetadata(size=None)) is False
+        assert manifest.matches('/a', HashedMetadata(size=None, md5='abc')) is False
+
+    def test_kind(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/a', utils.MockFolderMetadata())
+
+        assert manifest.matches('/a', HashedMetadata()) is False
+        assert manifest.matches('/a', utils.MockFolderMetadata()) is True
+
+
+class TestProgress:
+
+    def test_record(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.record('/', utils.MockFolderMetadata())
+        manifest.record('/a', HashedMetadata(size=10))
+        manifest.record('/b', HashedMetadata(size=5))
+
+        assert manifest.progress == {'transferred': 2, 'skipped': 0, 'bytes': 15}
+
+    def test_skip(self):
+        manifest = checkpoint.Manifest('key')
+        manifest.skip(HashedMetadata(size=10))
+
+        assert manifest.progress == {'transferred': 0, 'skipped': 1, 'bytes': 0}
+        assert metrics.snapshot()['checkpoint'] == {'skipped': 1, 'skipped_bytes': 10}
+
+
+class TestStore:
+
+    @async
+    def test_round_trip(self, store):
+        manifest = checkpoint.Manifest('key', store=store)
+        manifest.target, manifest.created = '/dest/', True
+        manifest.record('/dest/a', HashedMetadata(md5='abc'))
+        yield from manifest.save()
+
+        loaded = yield from checkpoint.Manifest('key', store=store).load()
+
+        assert loaded.target == '/dest/'
+        assert loaded.created is True
+        assert loaded.progress == manifest.progress
+        assert loaded.matches('/dest/a', HashedMetadata(md5='abc'))
+
+    @async
+    def test_load_nothing(self, store):
+        manifest = yield from checkpoint.Manifest('key', store=store).load()
+
+        assert manifest.entries == {}
+        assert manifest.target is None
+
+    @async
+    def test_checkpoint_waits_for_interval(self, store):
+        manifest = checkpoint.Manifest('key', store=store, interval=60)
+
+        yield from manifest.checkpoint()
+        assert store.sets == 0
+
+        manifest.interval = 0
+        yield from manifest.checkpoint()
+        assert store.sets == 1
+
+    @async
+    def test_expired(self, store):
+        manifest = checkpoint.Manifest('key', store=store)
+        manifest.record('/dest/a', HashedMetadata(md5='abc'))
+        with mock.patch('time.time', return_value=0):
+            yield from manifest.save()
+
+        with mock.patch('time.time', return_value=61):
+            loaded = yield from checkpoint.Manifest('key', store=store, ttl=60).load()
+
+        assert loaded.entries == {}
+        assert store.values == {}
+        assert metrics.snapshot()['checkpoint'] == {'expired': 1}
+
+    @async
+    def test_discard(self, store):
+        manifest = checkpoint.Manifest('key', store=store)
+        yield from manifest.save()
+        yield from manifest.discard()
+
+        assert store.values == {}
+
+    @async
+    def test_no_store(self):
+        manifest = yield from checkpoint.Manifest('key').load()
+        yield from manifest.save()
+        yield from manifest.discard()
+
+    @async
+    def test_store_errors_are_swallowed(self):
+        manifest = yield from checkpoint.Manifest('key', store=BrokenStore()).load()
+        yield from manifest.save()
+        yield from manifest.discard()
+
+        assert manifest.entries == {}
+        assert metrics.snapshot()['checkpoint']['errors'] == 3
@@ -0,0 +1,113 @@
+import time
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import connections
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.fixture
+def connector():
+    return connections.PooledConnector(limit_per_host=1)
+
+
+def make_connection():
+    transport, protocol = mock.Mock(), mock.Mock()
+    protocol.is_connected.return_value = True
+    protocol.reader.output = None
+    return transport, protocol
+
+
+def make_request(should_close=False):
+    req = mock.Mock()
+    req.response.message.should_close = should_close
+    return req
+
+
+class TestPooledConnector:
+
+    def test_counts_misses(self, connector):
+        transport, protocol = connector._get(('example.com', 443, True))
+
+        assert transport is None
+        assert protocol is None
+        assert metrics.snapshot()['connections'] == {'pool_misses': 1}
+
+    def test_counts_hits(self, connector):
+        key = ('example.com', 443, True)
+        transport, protocol = make_connection()
+        connector._conns[key] = [(transport, protocol, time.time())]
+
+        assert connector._get(key) == (transport, protocol)
+        assert metrics.snapshot()['connections'] == {'pool_hits': 1}
+
+    def test_closes_connections_over_limit(self, connector):
+        key = ('example.com', 443, True)
+        pooled, overflow = make_connection(), make_connection()
+        connector._conns[key] = [pooled + (time.time(), )]
+
+        connector._release(key, make_request(), *overflow)
+
+        assert overflow[0].close.called is True
+        assert len(connector._conns[key]) == 1
+        assert metrics.snapshot()['connections'] == {'pool_overflows': 1}
+
+    def test_closing_connections_are_not_overflows(self, connector):
+        key = ('example.com', 443, True)
+        pooled, closing, done = make_connection(), make_connection(), make_connection()
+        connector._conns[key] = [pooled + (time.time(), )]
+
+        connector._release(key, make_request(), *closing, should_close=True)
+        connector._release(key, make_request(should_close=True), *done)
+
+        assert closing[0].close.called is True
+        assert done[0].close.called is True
+        assert 'connections' not in metrics.snapshot()
+
+
+class TestConnectionPool:
+
+    def test_connector_per_loop(self):
+        pool = connections.ConnectionPool()
+        loop = asyncio.new_event_loop()
+
+        try:
+            assert pool.connector(loop=loop) is pool.connector(loop=loop)
+            assert pool.connector(loop=loop) is not pool.connector()
+        finally:
+            loop.close()
+
+    def test_drops_closed_loops(self):
+        pool = connections.ConnectionPool()
+        loop = asyncio.new_event_loop()
+        first = pool.connector(loop=loop)
+        loop.close()
+
+        pool.connector()
+
+        assert first not in pool._connectors.values()
+
+    @async
+    def test_request_uses_pooled_connector(self, monkeypatch):
+        pool = connections.ConnectionPool()
+        mock_request = mock.Mock(return_value=asyncio.Future())
+        mock_request.return_value.set_result('response')
+        monkeypatch.setattr(connections.aiohttp, 'request', mock_request)
+
+        resp = yield from pool.request('GET', 'http://example.com', params={'foo': 'bar'})
+
+        assert resp == 'response'
+        mock_request.assert_called_once_with(
+            'GET', 'http://example.com',
+            params={'foo': 'bar'},
+            connector=pool.connector(),
+        )
@@ -0,0 +1,175 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import hedging
+
+
+KEY = ('mock', 'GET', 'MetadataError')
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.fixture(autouse=True)
+def tracker(monkeypatch):
+    tracker = hedging.LatencyTracker(sample_size=10)
+    monkeypatch.setattr(hedging, 'tracker', tracker)
+    return tracker
+
+
+def responder(*delays):
+    """Returns a `send` callable whose nth call responds after delays[n] seconds"""
+    responses = []
+
+    @asyncio.coroutine
+    def send():
+        response = mock.Mock()
+        responses.append(response)
+        delay = delays[len(responses) - 1]
+        if isinstance(delay, Exception):
+            raise delay
+        yield from asyncio.sleep(delay)
+        return response
+
+    send.responses = responses
+    return send
+
+
+class TestLatencyTracker:
+
+    def test_percentile(self, tracker):
+        for i in range(10):
+            tracker.record(KEY, i)
+
+        assert tracker.percentile(KEY, 50) == 5
+        assert tracker.percentile(KEY, 95) == 9
+        assert tracker.percentile(KEY, 100) == 9
+
+    def test_min_samples(self, tracker):
+        tracker.record(KEY, 1)
+
+        assert tracker.percentile(KEY, 95, min_samples=2) is None
+        assert tracker.percentile(('other', 'GET', None), 95) is None
+
+    def test_keeps_latest_samples(self, tracker):
+        for i in range(20):
+            tracker.record(KEY, i)
+
+        assert tracker.percentile(KEY, 0) == 10
+
+
+class TestHedgeDelay:
+
+    def test_not_opted_in(self, monkeypatch):
+        monkeypatch.setattr(hedging.settings, 'HEDGE_PROVIDERS', {})
+        assert hedging.hedge_delay(KEY) is None
+
+    def test_only_reads(self, monkeypatch):
+        monkeypatch.setattr(hedging.settings, 'HEDGE_PROVIDERS', {'mock': 1})
+        assert hedging.hedge_delay(('mock', 'PUT', 'UploadError')) is None
+
+    def test_fixed_delay(self, monkeypatch):
+        monkeypatch.setattr(hedging.settings, 'HEDGE_PROVIDERS', {'mock': 0.5})
+        assert hedging.hedge_delay(KEY) == 0.5
+
+    def test_observed_delay(self, monkeypatch, tracker):
+        monkeypatch.setattr(hedging.settings, 'HEDGE_PROVIDERS', {'mock': None})
+        monkeypatch.setattr(hedging.settings, 'HEDGE_MIN_SAMPLES', 10)
+        monkeypatch.setattr(hedging.settings, 'HEDGE_DEFAULT_DELAY', 3)
+
+        assert hedging.hedge_delay(KEY) == 3
+
+        for i in range(10):
+            tracker.record(KEY, i)
+
+        assert hedging.hedge_delay(KEY) == 9
+
+
+class TestHedged:
+
+    @async
+    def test_fast_primary(self, tracker):
+        send = responder(0)
+
+        resp = yield from hedging.hedged(KEY, send, 0.1)
+
+        assert resp is send.responses[0]
+        assert len(send.responses) == 1
+        assert tracker.percentile(KEY, 50) is not None
+        assert metrics.snapshot() == {}
+
+    @async
+    def test_hedge_wins(self):
+        send = responder(1, 0)
+
+        resp = yield from hedging.hedged(KEY, send, 0.01)
+
+        assert resp is send.responses[1]
+        assert metrics.snapshot()['hedging'] == {'mock.fired': 1, 'mock.won': 1}
+
+    @async
+    def test_primary_wins(self):
+        send = responder(0.05, 1)
+
+        resp = yield from hedging.hedged(KEY, send, 0.01)
+
+        assert resp is send.responses[0]
+        assert metrics.snapshot()['hedging'] == {'mock.fired': 1}
+
+    @async
+    def test_failed_primary_falls_back(self):
+        send = responder(0.02, 0.05)
+        send_calls = []
+
+        @asyncio.coroutine
+        def failing_primary():
+            send_calls.append(1)
+            if len(send_calls) == 1:
+                yield from asyncio.sleep(0.02)
+                raise ValueError('boom')
+            return (yield from send())
+
+        resp = yield from hedging.hedged(KEY, failing_primary, 0.01)
+
+        assert resp is send.responses[0]
+
+    @async
+    def test_both_fail(self):
+        send = responder(0.02, ValueError('boom'))
+
+        @asyncio.coroutine
+        def failing():
+            yield from send()
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            yield from hedging.hedged(KEY, failing, 0.01)
+
+    @async
+    def test_cancelled_during_delay(self):
+        cancelled = []
+
+        @asyncio.coroutine
+        def send():
+            try:
+                yield from asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        task = asyncio.async(hedging.hedged(KEY, send, 0.5))
+        yield from asyncio.sleep(0.01)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            yield from task
+        yield from asyncio.sleep(0)
+
+        assert cancelled == [True]
@@ -0,0 +1,155 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import limiter
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.fixture
+def aimd():
+    return limiter.AIMDLimiter('mock', initial_window=2, min_window=1, max_window=4)
+
+
+def response(status=200, headers=None):
+    return mock.Mock(status=status, headers=headers or {})
+
+
+class TestParseRetryAfter:
+
+    def test_missing(self):
+        assert limiter.parse_retry_after(None) is None
+
+    def test_seconds(self):
+        assert limiter.parse_retry_after('12') == 12
+
+    def test_http_date(self):
+        assert limiter.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+class TestAIMDLimiter:
+
+    def test_grows_on_success(self, aimd):
+        aimd.in_flight = 1
+        aimd.release(response(200))
+
+        assert aimd.window == 2.5
+
+    def test_window_is_capped(self, aimd):
+        aimd.window = 4
+
+        aimd.in_flight = 1
+        aimd.release(response(200))
+
+        assert aimd.window == 4
+
+    @pytest.mark.parametrize('resp', [
+        response(429),
+        response(503),
+        response(200, {'Retry-After': '0'}),
+    ])
+    def test_shrinks_when_throttled(self, aimd, resp):
+        aimd.window = 4
+
+        aimd.in_flight = 1
+        aimd.release(resp)
+
+        assert aimd.window == 2
+        assert metrics.snapshot()['limiter']['mock.throttled'] == 1
+
+    def test_shrinks_once_per_burst(self, aimd):
+        aimd.window = 4
+        started = aimd._loop.time()
+
+        aimd.in_flight = 2
+        aimd.release(response(429), started)
+        aimd.release(response(429), started)
+
+        assert aimd.window == 2
+
+    def test_never_below_min(self, aimd):
+        aimd.window = 1
+
+        aimd.in_flight = 1
+        aimd.release(response(429))
+
+        assert aimd.window == 1
+
+    @async
+    def test_queues_excess(self, aimd):
+        yield from aimd.acquire()
+        yield from aimd.acquire()
+
+        waiter = asyncio.async(aimd.acquire())
+        yield from asyncio.sleep(0)
+
+        assert not waiter.done()
+        assert aimd.in_flight == 2
+        assert metrics.snapshot()['limiter']['mock.queue_depth'] == 1
+
+        aimd.release(response(200))
+        yield from waiter
+
+        assert aimd.in_flight == 2
+        assert metrics.snapshot()['limiter']['mock.queued'] == 1
+        assert metrics.snapshot()['limiter']['mock.queue_depth'] == 0
+        assert metrics.snapshot()['limiter']['mock.wait_seconds'] >= 0
+
+    @async
+    def test_cancelled_waiter_leaves_queue(self, aimd):
+        yield from aimd.acquire()
+        yield from aimd.acquire()
+
+        waiter = asyncio.async(aimd.acquire())
+        yield from asyncio.sleep(0)
+        waiter.cancel()
+        yield from asyncio.sleep(0)
+
+        assert aimd.idle is False
+        assert len(aimd._waiters) == 0
+        assert metrics.snapshot()['limiter']['mock.queue_depth'] == 0
+
+    @async
+    def test_retry_after_pauses(self, aimd):
+        yield from aimd.acquire()
+        aimd.release(response(503, {'Retry-After': '0.05'}))
+
+        start = aimd._loop.time()
+        yield from aimd.acquire()
+
+        assert aimd._loop.time() - start >= 0.04
+
+    @async
+    def test_send_releases_on_error(self, aimd):
+        @asyncio.coroutine
+        def send():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            yield from aimd.send(send)
+
+        assert aimd.in_flight == 0
+        assert aimd.window == 2
+
+
+class TestLimiterFor:
+
+    def test_shared_by_credentials(self):
+        assert limiter.limiter_for('mock', {'token': 'a'}) is limiter.limiter_for('mock', {'token': 'a'})
+
+    def test_separate_credentials(self):
+        assert limiter.limiter_for('mock', {'token': 'a'}) is not limiter.limiter_for('mock', {'token': 'b'})
+        assert limiter.limiter_for('mock', {'token': 'a'}) is not limiter.limiter_for('other', {'token': 'a'})
+
+    def test_provider_overrides(self, monkeypatch):
+        monkeypatch.setattr(limiter.settings, 'LIMITER_PROVIDERS', {'overridden': {'LIMITER_MAX_WINDOW': 3}})
+
+        assert limiter.limiter_for('overridden', {}).max_window == 3
@@ -1,10 +1,115 @@
+import io
+import asyncio
+import zipfile
+import collections
+
 import pytest
 
 from tests import utils
 from unittest import mock
 from tests.utils import async
+from waterbutler.core import streams
 from waterbutler.core import metadata
+from waterbutler.core import zipcache
+from waterbutler.core import settings
+from waterbutler.core import checkpoint
 from waterbutler.core import exceptions
+from waterbutler.core.provider import BaseProvider
+
+
+class Item(collections.namedtuple('Item', ['name', 'is_folder'])):
+    size = None
+    extra = {}
+
+    @property
+    def kind(self):
+        return 'folder' if self.is_folder else 'file'
+
+
+class TreeProvider(utils.MockProvider1):
+    """Lists folders out of `tree`, a dict of names to subtrees or None for files,
+    and copies files while tracking how many copies are running at once
+    """
+    NAME = 'tree'
+
+    def __init__(self, tree):
+        super().__init__({}, {}, {})
+        self.tree = tree
+        self.created = []
+        self.copied = []
+        self.running = self.peak = 0
+
+    @asyncio.coroutine
+    def metadata(self, path, **kwargs):
+        tree = self.tree
+        try:
+            for part in path.parts[1:]:
+                tree = tree[part.value]
+        except KeyError:
+            raise exceptions.NotFoundError(str(path))
+        return [Item(name, child is not None) for name, child in sorted(tree.items())]
+
+    @asyncio.coroutine
+    def create_folder(self, path, **kwargs):
+        self.created.append(str(path))
+        return utils.MockFolderMetadata()
+
+    @asyncio.coroutine
+    def delete(self, path, **kwargs):
+        raise exceptions.NotFoundError(str(path))
+
+    @asyncio.coroutine
+    def copy(self, dest_provider, src_path, dest_path, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        yield from asyncio.sleep(0.001)
+        self.running -= 1
+
+        if src_path.name == 'broken':
+            raise exceptions.ProviderError('broken')
+
+        self.copied.append(str(dest_path))
+        return str(dest_path), True
+
+
+class MirrorTreeProvider(TreeProvider):
+    """A TreeProvider that also writes what it creates into `tree`
+    and fails to copy the files named in `failing`
+    """
+
+    def __init__(self, tree):
+        super().__init__(tree)
+        self.failing = set()
+
+    def _add(self, path, node):
+        tree = self.tree
+        for part in path.parent.parts[1:]:
+            tree = tree.setdefault(part.value, {})
+        tree[path.name] = node
+
+    @asyncio.coroutine
+    def create_folder(self, path, **kwargs):
+        self._add(path, {})
+        return (yield from super().create_folder(path))
+
+    @asyncio.coroutine
+    def copy(self, dest_provider, src_path, dest_path, **kwargs):
+        if src_path.name in self.failing:
+            yield from asyncio.sleep(0.01)
+            raise exceptions.ProviderError('failing')
+
+        yield from super().copy(dest_provider, src_path, dest_path)
+        self._add(dest_path, None)
+        return Item(dest_path.name, False), True
+
+
+class DictStore(dict):
+
+    def set(self, key, value):
+        self[key] = value
+
+    def delete(self, key):
+        self.pop(key, None)
 
 
 @pytest.fixture
@@ -105,6 +210,13 @@ class TestBaseProvider:
         assert str(path) == str(new_path.parent)
         assert new_path.name == 'text_file.txt'
 
+    @async
+    def test_revalidate_paths_keeps_order(self, provider1):
+        path = yield from provider1.validate_path('/this/is/a/path/')
+        new_paths = yield from provider1.revalidate_paths(path, [('b.txt', False), ('a', True)])
+
+        assert [str(p) for p in new_paths] == ['/this/is/a/path/b.txt', '/this/is/a/path/a/']
+
 
 class TestHandleNameConflict:
 
@@ -164,6 +276,35 @@ class TestHandleNameConflict:
         assert str(handled) == '/test/path (2)'
         assert handled.name == 'path (2)'
 
+    @async
+    def test_renames_from_sibling_names(self, provider1):
+        path = yield from provider1.validate_path('/test/path.txt')
+        provider1.exists = utils.MockCoroutine(return_value=True)
+        provider1.sibling_names = utils.MockCoroutine(return_value={'path.txt', 'path (1).txt', 'path (3).txt'})
+
+        handled, exists = yield from provider1.handle_name_conflict(path, conflict='keep')
+
+        assert exists is False
+        assert handled.name == 'path (2).txt'
+        assert provider1.exists.call_count == 1
+        provider1.sibling_names.assert_called_once_with(path)
+
+    @async
+    def test_sibling_names_not_needed(self, provider1):
+        path = yield from provider1.validate_path('/test/path')
+        provider1.exists = utils.MockCoroutine(return_value=False)
+        provider1.sibling_names = utils.MockCoroutine(return_value=set())
+
+        yield from provider1.handle_name_conflict(path, conflict='keep')
+
+        assert not provider1.sibling_names.called
+
+    @async
+    def test_sibling_names_default(self, provider1):
+        path = yield from provider1.validate_path('/test/path')
+
+        assert (yield from provider1.sibling_names(path)) is None
+
 
 class TestHandleNaming:
 
@@ -317,10 +458,12 @@ class TestCopy:
             provider1,
             src_path,
             dest_path.child('path', folder=True),
+            checkpoint=None,
         )
 
     @async
-    def test_copy_pipes_download_to_upload(self, provider1):
+    def test_copy_pipes_download_to_upload(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'READ_AHEAD_BUDGET', 0)
         src_path = yield from provider1.validate_path('/source/path')
         dest_path = yield from provider1.validate_path('/destination/path')
 
@@ -333,6 +476,99 @@ class TestCopy:
         provider1.download.assert_called_once_with(src_path)
         provider1.upload.assert_called_once_with('Download return', dest_path)
 
+    @async
+    def test_copy_reads_ahead_of_upload(self, provider1):
+        src_path = yield from provider1.validate_path('/source/path')
+        dest_path = yield from provider1.validate_path('/destination/path')
+
+        @asyncio.coroutine
+        def upload(stream, path):
+            return (yield from stream.read()), stream.size
+
+        provider1.upload = upload
+        provider1.download = utils.MockCoroutine(return_value=streams.StringStream(b'Download return'))
+
+        ret = yield from provider1.copy(provider1, src_path, dest_path)
+
+        assert ret == (b'Download return', 15)
+
+
+class TestRangedDownload:
+
+    @pytest.fixture
+    def ranged(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'RANGED_FETCH_PROVIDERS', [provider1.NAME])
+        monkeypatch.setattr(settings, 'RANGED_FETCH_PART_SIZE', 4)
+        data = b'freddie brian john roger'
+        ranges = []
+
+        @asyncio.coroutine
+        def download(path, range=None, **kwargs):
+            ranges.append(range)
+            if range is None:
+                return streams.StringStream(data)
+            stream = streams.StringStream(data[range[0]:range[1] + 1])
+            stream.partial = True
+            stream.content_range = 'bytes {}-{}/{}'.format(range[0], range[1], len(data))
+            stream.content_type = 'text/plain'
+            return stream
+
+        provider1.download = download
+        return data, ranges
+
+    @async
+    def test_not_opted_in(self, provider1):
+        provider1.download = utils.MockCoroutine(return_value='Download return')
+        path = yield from provider1.validate_path('/file')
+
+        assert (yield from provider1.ranged_download(path)) == 'Download return'
+        provider1.download.assert_called_once_with(path)
+
+    @async
+    def test_fetches_ranges(self, provider1, ranged):
+        data, ranges = ranged
+        path = yield from provider1.validate_path('/file')
+
+        stream = yield from provider1.ranged_download(path)
+
+        assert stream.size == len(data)
+        assert stream.content_type == 'text/plain'
+        assert (yield from stream.read()) == data
+        assert ranges[0] == (0, 3)
+        assert len(ranges) == 6
+
+    @async
+    def test_requested_range_is_not_split(self, provider1, ranged):
+        data, ranges = ranged
+        path = yield from provider1.validate_path('/file')
+
+        stream = yield from provider1.ranged_download(path, range=(0, 9))
+
+        assert (yield from stream.read()) == data[:10]
+        assert ranges == [(0, 9)]
+
+    @async
+    def test_range_ignored_upstream(self, provider1, ranged):
+        data, ranges = ranged
+        path = yield from provider1.validate_path('/file')
+        full = streams.StringStream(data)
+        provider1.download = utils.MockCoroutine(return_value=full)
+
+        assert (yield from provider1.ranged_download(path)) is full
+
+    @async
+    def test_unknown_size(self, provider1, ranged):
+        data, ranges = ranged
+        path = yield from provider1.validate_path('/file')
+        first = streams.StringStream(data[:4])
+        first.partial = True
+        first.content_range = 'bytes 0-3/*'
+        full = streams.StringStream(data)
+        provider1.download = utils.MockCoroutine(side_effect=[first, full])
+
+        assert (yield from provider1.ranged_download(path)) is full
+        provider1.download.assert_called_with(path)
+
 
 class TestMove:
     @async
@@ -436,6 +672,7 @@ class TestMove:
             provider1,
             src_path,
             dest_path.child('path', folder=True),
+            checkpoint=None,
         )
 
     @async
@@ -477,8 +714,367 @@ class TestMove:
             handle_naming=False
         )
 
+    @async
+    def test_folder_sources_are_deleted_together(self, provider1):
+        src_path = yield from provider1.validate_path('/source/path/')
+        dest_path = yield from provider1.validate_path('/destination/path/')
+
+        provider1.delete_many = utils.MockCoroutine()
+        provider1._folder_file_op = utils.MockCoroutine(return_value=('Someratheruniquevalue', 'AndThen'))
+
+        yield from provider1.move(provider1, src_path, dest_path)
+
+        provider1.delete_many.assert_called_once_with([src_path])
+
     def test_build_range_header(self, provider1):
         assert 'bytes=0-' == provider1._build_range_header((0, None))
         assert 'bytes=10-' == provider1._build_range_header((10, None))
         assert 'bytes=10-100' == provider1._build_range_header((10, 100))
         assert 'bytes=-255' == provider1._build_range_header((None, 255))
+
+
+class TestWalk:
+
+    @async
+    def test_walks_every_folder(self):
+        provider = TreeProvider({'a': None, 'sub': {'b': None, 'deeper': {'c': None}}, 'empty': {}})
+        path = yield from provider.validate_path('/')
+
+        entries = yield from provider.walk(path).collect()
+
+        paths = [str(path) for path, _ in entries]
+        assert sorted(paths) == ['/a', '/empty/', '/sub/', '/sub/b', '/sub/deeper/', '/sub/deeper/c']
+        # Folders come before their contents
+        assert paths.index('/sub/') < paths.index('/sub/deeper/') < paths.index('/sub/deeper/c')
+        assert all(item.name == path.name for path, item in entries)
+
+    @async
+    def test_bounded_listings(self, monkeypatch):
+        monkeypatch.setattr(settings, 'WALK_CONCURRENCY', 2)
+        provider = TreeProvider({'sub{}'.format(i): {'file': None} for i in range(6)})
+        listing, running = provider.metadata, collections.Counter()
+
+        @asyncio.coroutine
+        def metadata(path, **kwargs):
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            yield from asyncio.sleep(0.001)
+            running['now'] -= 1
+            return (yield from listing(path))
+
+        provider.metadata = metadata
+        path = yield from provider.validate_path('/')
+
+        entries = yield from provider.walk(path).collect()
+
+        assert len(entries) == 12
+        assert running['peak'] == 2
+
+    @async
+    def test_errors_are_raised(self):
+        provider = TreeProvider({'sub': {'file': None}})
+        provider.metadata = utils.MockCoroutine(side_effect=exceptions.MetadataError('nope'))
+        path = yield from provider.validate_path('/')
+
+        with pytest.raises(exceptions.MetadataError):
+            yield from provider.walk(path).collect()
+
+    @async
+    def test_zip_walks(self):
+        provider = TreeProvider({'a': None, 'sub': {'b': None}})
+        provider.download = utils.MockCoroutine(return_value=streams.StringStream(b''))
+        path = yield from provider.validate_path('/')
+
+        stream = yield from provider.zip(path)
+        archive = zipfile.ZipFile(io.BytesIO((yield from stream.read())))
+
+        assert sorted(archive.namelist()) == ['a', 'sub/b']
+
+    @async
+    def test_zip_streams_while_walking(self):
+        provider = TreeProvider({'a': None, 'slow': {'b': None}})
+        provider.download = utils.MockCoroutine(return_value=streams.StringStream(b''))
+        listing, listed = provider.metadata, asyncio.Future()
+
+        @asyncio.coroutine
+        def metadata(path, **kwargs):
+            if path.name == 'slow':
+                yield from listed
+            return (yield from listing(path))
+
+        provider.metadata = metadata
+        path = yield from provider.validate_path('/')
+
+        stream = yield from provider.zip(path)
+        first = yield from stream.read(1024)
+
+        assert first.startswith(b'PK\x03\x04')
+        assert not listed.done()
+
+        listed.set_result(None)
+        archive = zipfile.ZipFile(io.BytesIO(first + (yield from stream.read())))
+
+        assert sorted(archive.namelist()) == ['a', 'slow/b']
+
+    @async
+    def test_zip_cancel_stops_walk(self, monkeypatch):
+        monkeypatch.setattr(settings, 'WALK_BUFFER', 1)
+        provider = TreeProvider({str(i): {'file': None} for i in range(10)})
+        walks, walk = [], provider.walk
+        provider.walk = lambda path, **kwargs: walks.append(walk(path, **kwargs)) or walks[-1]
+        path = yield from provider.validate_path('/')
+
+        stream = yield from provider.zip(path)
+        yield from asyncio.sleep(0.01)
+        # The walk waits for room in its buffer until the client reads on or goes away
+        assert not walks[0]._task.done()
+
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert walks[0]._task.cancelled()
+
+    @async
+    def test_zip_cache(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(zipcache, 'zip_cache', zipcache.ZipCache(str(tmpdir), size=1024 ** 2))
+        monkeypatch.setattr(Item, 'etag', 'etag', raising=False)
+        provider = TreeProvider({'a': None, 'sub': {'b': None}})
+        provider.download = utils.MockCoroutine(return_value=streams.StringStream(b''))
+        path = yield from provider.validate_path('/')
+
+        data = yield from (yield from provider.zip(path)).read()
+        cached = yield from provider.zip(path)
+
+        assert isinstance(cached, streams.FileStreamReader)
+        assert (yield from cached.read()) == data
+        assert provider.download.call_count == 2
+        assert sorted(zipfile.ZipFile(io.BytesIO(data)).namelist()) == ['a', 'sub/b']
+
+        monkeypatch.setattr(Item, 'etag', 'changed')
+        assert not isinstance((yield from provider.zip(path)), streams.FileStreamReader)
+
+    @async
+    def test_zip_cache_needs_etags(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(zipcache, 'zip_cache', zipcache.ZipCache(str(tmpdir), size=1024 ** 2))
+        provider = TreeProvider({'a': None})
+        provider.download = utils.MockCoroutine(return_value=streams.StringStream(b''))
+        path = yield from provider.validate_path('/')
+
+        yield from (yield from provider.zip(path)).read()
+
+        assert not isinstance((yield from provider.zip(path)), streams.FileStreamReader)
+        assert tmpdir.listdir() == []
+
+    @async
+    def test_stored_zip(self, monkeypatch):
+        monkeypatch.setattr(Item, 'size', 4)
+        provider = TreeProvider({'a': None, 'sub': {'b': None}})
+        provider.download = asyncio.coroutine(lambda path, **kwargs: streams.StringStream(b'data'))
+        path = yield from provider.validate_path('/')
+
+        archive = yield from provider.stored_zip(path)
+        data = yield from archive.stream().read()
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert len(data) == archive.size
+        assert sorted(zip.namelist()) == ['a', 'sub/b']
+        assert zip.open('sub/b').read() == b'data'
+
+    @async
+    def test_stored_zip_needs_sizes(self):
+        provider = TreeProvider({'a': None, 'sub': {'b': None}})
+        path = yield from provider.validate_path('/')
+
+        assert (yield from provider.stored_zip(path)) is None
+
+
+class TestDeleteMany:
+
+    @async
+    def test_bounded_deletes(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'DELETE_MANY_CONCURRENCY', 2)
+        deleted, running = [], collections.Counter()
+
+        @asyncio.coroutine
+        def delete(path, **kwargs):
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            yield from asyncio.sleep(0.001)
+            running['now'] -= 1
+            deleted.append(str(path))
+
+        provider1.delete = delete
+        paths = []
+        for i in range(5):
+            paths.append((yield from provider1.validate_path('/file{}'.format(i))))
+
+        yield from provider1.delete_many(paths)
+
+        assert sorted(deleted) == ['/file{}'.format(i) for i in range(5)]
+        assert running['peak'] == 2
+
+    @async
+    def test_raises_errors(self, provider1):
+        provider1.delete = utils.MockCoroutine(side_effect=exceptions.DeleteError('nope'))
+        path = yield from provider1.validate_path('/file')
+
+        with pytest.raises(exceptions.DeleteError):
+            yield from provider1.delete_many([path])
+
+
+class TestFolderFileOp:
+
+    @async
+    def test_bounded_window(self, monkeypatch):
+        monkeypatch.setattr(settings, 'FOLDER_OP_CONCURRENCY_PAIRS', {'tree:tree': 3})
+        provider = TreeProvider({'file{:02}'.format(i): None for i in range(20)})
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        folder, created = yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path)
+
+        assert created is False
+        assert provider.peak == 3
+        assert len(provider.copied) == 20
+        assert folder.children == ['/dest/file{:02}'.format(i) for i in range(20)]
+
+    @async
+    def test_walks_subfolders(self):
+        provider = TreeProvider({'a': None, 'sub': {'b': None, 'deeper': {'c': None}}})
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        folder, _ = yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path)
+
+        assert provider.created == ['/dest/', '/dest/sub/', '/dest/sub/deeper/']
+        assert sorted(provider.copied) == ['/dest/a', '/dest/sub/b', '/dest/sub/deeper/c']
+        assert folder.children[0] == '/dest/a'
+        assert folder.children[1].children[1].children == ['/dest/sub/deeper/c']
+
+    @async
+    def test_intra_subfolders_are_not_walked(self):
+        provider = TreeProvider({'sub': {'b': None}})
+        provider.can_intra_copy = mock.Mock(return_value=True)
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path)
+
+        assert provider.created == ['/dest/']
+        assert provider.copied == ['/dest/sub/']
+
+    @async
+    def test_children_are_revalidated_per_folder(self):
+        provider = TreeProvider({'a': None, 'b': None, 'sub': {'c': None}})
+        provider.revalidate_paths = mock.Mock(wraps=provider.revalidate_paths)
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path)
+
+        # Once for the source and once for the destination of each folder
+        assert provider.revalidate_paths.call_count == 4
+        assert sorted(provider.copied) == ['/dest/a', '/dest/b', '/dest/sub/c']
+
+    @async
+    def test_move_copies_files(self):
+        provider = TreeProvider({'a': None, 'sub': {'b': None}})
+        provider.move = asyncio.coroutine(mock.Mock(side_effect=AssertionError('Files are copied')))
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        yield from provider._folder_file_op(provider.move, provider, src_path, dest_path)
+
+        # Sources are left for move to delete at once
+        assert sorted(provider.copied) == ['/dest/a', '/dest/sub/b']
+
+    @async
+    def test_first_error_is_raised(self):
+        provider = TreeProvider({'broken': None, 'fine': None})
+        src_path = yield from provider.validate_path('/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        with pytest.raises(exceptions.ProviderError):
+            yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path)
+
+    @async
+    def test_resumes_from_checkpoint(self, monkeypatch):
+        # Files are only skipped when something about them is known to match
+        monkeypatch.setattr(Item, 'size', 4)
+        provider = MirrorTreeProvider({'src': {'a': None, 'flaky': None, 'sub': {'c': None}}})
+        provider.failing = {'flaky'}
+        store = DictStore()
+        src_path = yield from provider.validate_path('/src/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        with pytest.raises(exceptions.ProviderError):
+            yield from provider._folder_file_op(
+                provider.copy, provider, src_path, dest_path,
+                checkpoint=checkpoint.Manifest('key', store=store),
+            )
+
+        assert sorted(provider.copied) == ['/dest/a', '/dest/sub/c']
+
+        provider.failing, provider.copied, provider.created = set(), [], []
+        manifest = yield from checkpoint.Manifest('key', store=store).load()
+
+        folder, created = yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path, checkpoint=manifest)
+
+        assert created is False
+        assert provider.created == []
+        assert provider.copied == ['/dest/flaky']
+        assert [child.name for child in folder.children] == ['a', 'flaky', 'Bar']
+        assert manifest.progress == {'transferred': 3, 'skipped': 2, 'bytes': 12}
+
+    @async
+    def test_retried_copy_resumes(self, monkeypatch):
+        # What a retried copy task does, a fresh manifest loaded from the same store
+        monkeypatch.setattr(Item, 'size', 4)
+        provider = MirrorTreeProvider({'src': {'a': None, 'flaky': None}, 'dest': {}})
+        provider.failing = {'flaky'}
+        store = DictStore()
+        src_path = yield from provider.validate_path('/src/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        with pytest.raises(exceptions.ProviderError):
+            yield from BaseProvider.copy(provider, provider, src_path, dest_path, checkpoint=checkpoint.Manifest('key', store=store))
+
+        provider.failing, provider.copied = set(), []
+        manifest = yield from checkpoint.Manifest('key', store=store).load()
+
+        yield from BaseProvider.copy(provider, provider, src_path, dest_path, checkpoint=manifest)
+
+        assert provider.copied == ['/dest/src/flaky']
+        assert manifest.progress['skipped'] == 1
+
+    @async
+    def test_resumes_into_folders_created_after_the_checkpoint(self):
+        provider = MirrorTreeProvider({'src': {'sub': {'deep': {'c': None}}}, 'dest': {'sub': {'deep': {}}}})
+        src_path = yield from provider.validate_path('/src/')
+        dest_path = yield from provider.validate_path('/dest/')
+        # Saved before sub and deep were created
+        manifest = checkpoint.Manifest('key')
+        manifest.record(dest_path, utils.MockFolderMetadata())
+
+        yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path, checkpoint=manifest)
+
+        assert provider.created == []
+        assert provider.copied == ['/dest/sub/deep/c']
+
+    @async
+    def test_mismatched_children_are_transferred_again(self, monkeypatch):
+        monkeypatch.setattr(Item, 'size', 4)
+        provider = MirrorTreeProvider({'src': {'a': None, 'b': None}})
+        manifest = checkpoint.Manifest('key')
+        src_path = yield from provider.validate_path('/src/')
+        dest_path = yield from provider.validate_path('/dest/')
+
+        yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path, checkpoint=manifest)
+
+        # b was changed or removed at the destination since
+        del provider.tree['dest']['b']
+        provider.copied = []
+
+        yield from provider._folder_file_op(provider.copy, provider, src_path, dest_path, checkpoint=manifest)
+
+        assert provider.copied == ['/dest/b']
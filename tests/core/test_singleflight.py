@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import metrics
+from waterbutler.core import singleflight
+from waterbutler.core.path import WaterButlerPath
+
+
+class SlowProvider(utils.MockProvider1):
+    NAME = 'slow'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    @singleflight.coalesce
+    @asyncio.coroutine
+    def metadata(self, path, revision=None):
+        self.calls.append((path, revision))
+        yield from asyncio.sleep(0.01)
+        if revision == 'bad':
+            raise ValueError('bad revision')
+        return {'path': str(path), 'revision': revision}
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.fixture
+def provider():
+    return SlowProvider({}, {'token': 'a'}, {})
+
+
+class TestCoalesce:
+
+    @async
+    def test_coalesces_identical_calls(self, provider):
+        path = WaterButlerPath('/folder/')
+
+        results = yield from asyncio.gather(*[provider.metadata(path) for _ in range(5)])
+
+        assert len(provider.calls) == 1
+        assert all(result == {'path': '/folder/', 'revision': None} for result in results)
+        assert metrics.snapshot()['singleflight'] == {'slow.metadata.coalesced': 4}
+
+    @async
+    def test_results_are_copies(self, provider):
+        first, second = yield from asyncio.gather(provider.metadata('/foo'), provider.metadata('/foo'))
+
+        first['path'] = '/changed'
+
+        assert first is not second
+        assert second['path'] == '/foo'
+
+    @async
+    def test_other_providers(self, provider):
+        other = SlowProvider({}, {'token': 'b'}, {})
+
+        yield from asyncio.gather(provider.metadata('/foo'), other.metadata('/foo'))
+
+        assert len(provider.calls) == 1
+        assert len(other.calls) == 1
+
+    @async
+    def test_other_arguments(self, provider):
+        yield from asyncio.gather(
+            provider.metadata('/foo'),
+            provider.metadata('/bar'),
+            provider.metadata('/foo', revision='1'),
+            provider.metadata(WaterButlerPath('/foo', _ids=('root', 'id1'))),
+            provider.metadata(WaterButlerPath('/foo', _ids=('root', 'id2'))),
+        )
+
+        assert len(provider.calls) == 5
+
+    @async
+    def test_sequential_calls_are_not_coalesced(self, provider):
+        yield from provider.metadata('/foo')
+        yield from provider.metadata('/foo')
+
+        assert len(provider.calls) == 2
+
+    @async
+    def test_errors_fan_out(self, provider):
+        results = yield from asyncio.gather(
+            provider.metadata('/foo', revision='bad'),
+            provider.metadata('/foo', revision='bad'),
+            return_exceptions=True,
+        )
+
+        assert len(provider.calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @async
+    def test_cancelled_caller_does_not_cancel_others(self, provider):
+        first = asyncio.async(provider.metadata('/foo'))
+        second = asyncio.async(provider.metadata('/foo'))
+        yield from asyncio.sleep(0)
+
+        first.cancel()
+
+        assert (yield from second) == {'path': '/foo', 'revision': None}
+        assert len(provider.calls) == 1
+
+    @async
+    def test_disabled(self, provider, monkeypatch):
+        monkeypatch.setattr(singleflight.settings, 'SINGLEFLIGHT_ENABLED', False)
+
+        yield from asyncio.gather(provider.metadata('/foo'), provider.metadata('/foo'))
+
+        assert len(provider.calls) == 2
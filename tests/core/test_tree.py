@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import tree
+from waterbutler.core.path import WaterButlerPath
+
+
+def batches(*batches, error=None):
+    @asyncio.coroutine
+    def fill(put):
+        for batch in batches:
+            yield from put(batch)
+        if error:
+            raise error
+    return fill
+
+
+class TestWalk:
+
+    @async
+    def test_hands_out_batches(self):
+        walk = tree.Walk(batches([1, 2], [], [3]))
+
+        assert (yield from walk.next()) == [1, 2]
+        assert (yield from walk.next()) == [3]
+        assert (yield from walk.next()) is None
+        assert (yield from walk.next()) is None
+
+    @async
+    def test_collect(self):
+        walk = tree.Walk(batches([1, 2], [3]))
+
+        assert (yield from walk.collect()) == [1, 2, 3]
+
+    @async
+    def test_raises_errors_after_entries(self):
+        walk = tree.Walk(batches([1], error=ValueError('listing failed')))
+
+        assert (yield from walk.next()) == [1]
+        with pytest.raises(ValueError):
+            yield from walk.next()
+        assert (yield from walk.next()) is None
+
+    @async
+    def test_runs_ahead_within_buffer(self):
+        listed = []
+
+        @asyncio.coroutine
+        def fill(put):
+            for i in range(10):
+                listed.append(i)
+                yield from put([i])
+
+        walk = tree.Walk(fill, buffer=2)
+        for _ in range(10):
+            yield from asyncio.sleep(0)
+
+        # Two batches queued and one waiting for room
+        assert listed == [0, 1, 2]
+        assert len((yield from walk.collect())) == 10
+
+    @async
+    def test_cancel(self):
+        walk = tree.Walk(batches(*[[i] for i in range(10)]), buffer=1)
+        walk.cancel()
+        yield from asyncio.sleep(0)
+
+        assert walk._task.cancelled()
+
+
+class TestListing:
+
+    def folder(self, path):
+        return 'implied ' + str(path)
+
+    def test_implies_folders_once(self):
+        listing = tree.Listing(WaterButlerPath('/root/'), self.folder)
+
+        assert listing.entries('a/b/file', 'file') == [
+            (WaterButlerPath('/root/a/'), 'implied /root/a/'),
+            (WaterButlerPath('/root/a/b/'), 'implied /root/a/b/'),
+            (WaterButlerPath('/root/a/b/file'), 'file'),
+        ]
+        assert listing.entries('a/other', 'other') == [(WaterButlerPath('/root/a/other'), 'other')]
+
+    def test_explicit_folders(self):
+        listing = tree.Listing(WaterButlerPath('/'), self.folder)
+
+        assert listing.entries('a/', 'marker', folder=True) == [(WaterButlerPath('/a/'), 'marker')]
+        assert listing.entries('a/file', 'file') == [(WaterButlerPath('/a/file'), 'file')]
+        # Folders already seen are not handed out again
+        assert listing.entries('a', 'marker', folder=True) == []
+
+    def test_child_arguments(self):
+        listing = tree.Listing(WaterButlerPath('/'), self.folder, _id='branch')
+
+        (path, _), = listing.entries('file', 'file')
+
+        assert path.identifier == 'branch'
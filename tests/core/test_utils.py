@@ -6,6 +6,8 @@ import pytest
 from tests.utils import async
 
 from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import exceptions
 
 
 class TestAsyncRetry:
@@ -92,3 +94,73 @@ class TestAsyncRetry:
         yield from asyncio.sleep(.1)
 
         assert mock_func.call_count == 18
+
+
+class TestBuildProvider:
+
+    @pytest.fixture(autouse=True)
+    def registry(self, monkeypatch):
+        monkeypatch.setattr(utils, '_provider_classes', None)
+
+    def test_scans_entry_points_once(self):
+        with mock.patch('waterbutler.core.utils.extension.ExtensionManager', wraps=utils.extension.ExtensionManager) as manager:
+            first = utils.build_provider('github', {}, {'token': 'naps'}, {'owner': 'cat', 'repo': 'food'})
+            second = utils.build_provider('github', {}, {'token': 'naps'}, {'owner': 'cat', 'repo': 'food'})
+
+        assert manager.call_count == 1
+        assert type(first) is type(second)
+        assert first is not second
+        assert first.NAME == 'github'
+
+    def test_not_found(self):
+        with pytest.raises(exceptions.ProviderNotFound):
+            utils.build_provider('notaprovider', {}, {}, {})
+
+
+class TestProviderPool:
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    @pytest.fixture
+    def pool(self):
+        return utils.ProviderPool(size=2, ttl=60)
+
+    def make(self, pool, token='naps', name='github'):
+        return pool.get(name, {}, {'token': token}, {'owner': 'cat', 'repo': 'food'})
+
+    def test_reuses_instances(self, pool):
+        assert self.make(pool) is self.make(pool)
+        assert metrics.snapshot()['provider_pool'] == {'github.misses': 1, 'github.hits': 1}
+
+    def test_keyed_by_credentials(self, pool):
+        assert self.make(pool, token='naps') is not self.make(pool, token='nope')
+
+    def test_does_not_share_callers_dicts(self, pool):
+        credentials = {'token': 'naps'}
+        provider = pool.get('github', {}, credentials, {'owner': 'cat', 'repo': 'food'})
+
+        credentials['token'] = 'changed'
+
+        assert provider.credentials == {'token': 'naps'}
+
+    def test_evicts_least_recently_used(self, pool):
+        first = self.make(pool, token='1')
+        self.make(pool, token='2')
+        self.make(pool, token='1')
+        self.make(pool, token='3')
+
+        assert self.make(pool, token='1') is first
+        assert metrics.snapshot()['provider_pool']['evictions'] == 1
+
+    def test_expires(self, pool):
+        with mock.patch('time.monotonic', side_effect=[0, 61]):
+            first = self.make(pool)
+            assert self.make(pool) is not first
+
+        assert metrics.snapshot()['provider_pool']['github.expired'] == 1
+
+    def test_disabled(self):
+        pool = utils.ProviderPool(size=0)
+        assert self.make(pool) is not self.make(pool)
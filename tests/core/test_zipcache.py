@@ -0,0 +1,151 @@
+import os
+import asyncio
+import collections
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import cache
+from waterbutler.core import streams
+from waterbutler.core import zipcache
+from waterbutler.core.path import WaterButlerPath
+
+
+Metadata = collections.namedtuple('Metadata', ['size', 'etag', 'modified'])
+
+
+class WritingProvider(utils.MockProvider1):
+    NAME = 'writing'
+
+    @cache.invalidates
+    @asyncio.coroutine
+    def upload(self, stream, path, **kwargs):
+        return utils.MockFileMetadata(), True
+
+
+class BrokenStream(streams.StringStream):
+
+    @asyncio.coroutine
+    def _read(self, size):
+        raise OSError('connection reset')
+
+
+@pytest.fixture
+def zip_cache(tmpdir, monkeypatch):
+    zip_cache = zipcache.ZipCache(str(tmpdir), size=1024)
+    monkeypatch.setattr(zipcache, 'zip_cache', zip_cache)
+    return zip_cache
+
+
+@pytest.fixture
+def provider():
+    return WritingProvider({}, {'token': 'a'}, {'folder': 'f'})
+
+
+@asyncio.coroutine
+def store(zip_cache, provider, path, fingerprint, data):
+    stream = yield from zip_cache.put(provider, WaterButlerPath(path), fingerprint, streams.StringStream(data))
+    return (yield from stream.read())
+
+
+def cached(zip_cache):
+    return sorted(
+        os.path.join(folder, name)
+        for folder in os.listdir(zip_cache.path)
+        for name in os.listdir(os.path.join(zip_cache.path, folder))
+    )
+
+
+class TestFingerprint:
+
+    def entries(self, *files):
+        # Folders have no fingerprint of their own
+        return [(WaterButlerPath('/folder/'), None)] + [
+            (WaterButlerPath(path), Metadata(*values)) for path, values in files
+        ]
+
+    def test_changes_with_files(self):
+        before = zipcache.fingerprint(self.entries(('/a', (1, 'x', None))))
+
+        assert zipcache.fingerprint(self.entries(('/a', (1, 'x', None)))) == before
+        assert zipcache.fingerprint(self.entries(('/a', (1, 'y', None)))) != before
+        assert zipcache.fingerprint(self.entries(('/a', (2, 'x', None)))) != before
+        assert zipcache.fingerprint(self.entries(('/a', (1, 'x', None)), ('/b', (1, 'x', None)))) != before
+
+    def test_ignores_listing_order(self):
+        a, b = ('/a', (1, 'x', None)), ('/b', (1, None, 'today'))
+
+        assert zipcache.fingerprint(self.entries(a, b)) == zipcache.fingerprint(self.entries(b, a))
+
+    def test_needs_etag_or_modified(self):
+        assert zipcache.fingerprint(self.entries(('/a', (1, 'x', None)), ('/b', (1, None, None)))) is None
+
+
+class TestZipCache:
+
+    @async
+    def test_stores_archives_read_to_the_end(self, zip_cache, provider):
+        assert (yield from store(zip_cache, provider, '/folder/', 'abc', b'archive')) == b'archive'
+
+        stream = yield from zip_cache.get(provider, WaterButlerPath('/folder/'), 'abc')
+
+        assert isinstance(stream, streams.FileStreamReader)
+        assert stream.size == 7
+        assert (yield from stream.read()) == b'archive'
+        assert (yield from zip_cache.get(provider, WaterButlerPath('/folder/'), 'other')) is None
+        assert (yield from zip_cache.get(utils.MockProvider1({}, {}, {}), WaterButlerPath('/folder/'), 'abc')) is None
+
+    @async
+    def test_discards_partial_archives(self, zip_cache, provider):
+        stream = yield from zip_cache.put(provider, WaterButlerPath('/folder/'), 'abc', BrokenStream(b''))
+
+        with pytest.raises(OSError):
+            yield from stream.read()
+        yield from asyncio.sleep(0.01)
+
+        assert cached(zip_cache) == []
+
+    @async
+    def test_cancel_discards_the_archive(self, zip_cache, provider):
+        archive = streams.StringStream(b'archive')
+        archive.cancel = mock.Mock()
+        stream = yield from zip_cache.put(provider, WaterButlerPath('/folder/'), 'abc', archive)
+
+        yield from stream.read(3)
+        stream.close()
+        yield from asyncio.sleep(0.01)
+
+        assert archive.cancel.called
+        assert cached(zip_cache) == []
+
+    @async
+    def test_evicts_least_recently_served(self, zip_cache, provider):
+        zip_cache.size = 1200
+        for index, name in enumerate(('/a/', '/b/', '/c/')):
+            yield from store(zip_cache, provider, name, 'abc', b'x' * 400)
+            os.utime(zip_cache._file(provider, WaterButlerPath(name), 'abc'), (index, index))
+
+        zip_cache.size = 1024
+        yield from zip_cache.get(provider, WaterButlerPath('/a/'), 'abc')
+        zip_cache._evict()
+
+        assert (yield from zip_cache.get(provider, WaterButlerPath('/a/'), 'abc')) is not None
+        assert (yield from zip_cache.get(provider, WaterButlerPath('/b/'), 'abc')) is None
+        assert (yield from zip_cache.get(provider, WaterButlerPath('/c/'), 'abc')) is not None
+        # Folders left without archives go too
+        assert len(os.listdir(zip_cache.path)) == 2
+
+    @async
+    def test_writes_invalidate_folders_above(self, zip_cache, provider):
+        for name in ('/', '/a/', '/a/b/', '/other/'):
+            yield from store(zip_cache, provider, name, 'abc', b'archive')
+
+        yield from provider.upload(streams.StringStream(b''), WaterButlerPath('/a/file'))
+
+        assert cached(zip_cache) == sorted(
+            os.path.relpath(zip_cache._file(provider, WaterButlerPath(name), 'abc'), zip_cache.path)
+            for name in ('/a/b/', '/other/')
+        )
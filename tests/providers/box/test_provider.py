@@ -507,6 +507,57 @@ class TestRevisions:
         assert aiohttpretty.has_call(method='GET', uri=revisions_url)
 
 
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_file(self, provider):
+        path = WaterButlerPath('/foo.txt', _ids=(provider.folder, '1234'))
+        url = provider.build_url('files', '1234', fields='id')
+        aiohttpretty.register_json_uri('GET', url, body={'id': '1234'})
+
+        assert (yield from provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_deleted_folder(self, provider):
+        path = WaterButlerPath('/foo/', _ids=(provider.folder, '1234'))
+        url = provider.build_url('folders', '1234', fields='id')
+        aiohttpretty.register_uri('GET', url, status=404)
+
+        assert (yield from provider.exists(path)) is False
+
+    @async
+    def test_no_id(self, provider):
+        path = WaterButlerPath('/foo.txt', _ids=(provider.folder, None))
+
+        assert (yield from provider.exists(path)) is False
+
+
+class TestRevalidatePaths:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_one_listing(self, provider, folder_list_metadata):
+        folder_list_metadata['total_count'] = 2
+        base = WaterButlerPath('/', _ids=(provider.folder, ))
+        url = provider.build_url('folders', provider.folder, 'items', fields='id,name,type', limit=1000, offset=0)
+        aiohttpretty.register_json_uri('GET', url, body=folder_list_metadata)
+
+        folder, file, missing = yield from provider.revalidate_paths(base, [
+            ('stephen curry three pointers', True),
+            ('Warriors.jpg', None),
+            ('Warriors.jpg', True),
+        ])
+
+        assert folder.is_dir and folder.identifier == '192429928'
+        assert folder.name == 'stephen curry three pointers'
+        assert file.is_file and file.identifier == '818853862'
+        assert missing.is_dir and missing.identifier is None
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
+
 class TestCreateFolder:
 
     @async
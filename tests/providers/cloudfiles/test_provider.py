@@ -14,11 +14,13 @@ import aiohttp.multidict
 import aiohttpretty
 
 from waterbutler.core import streams
+from waterbutler.core import provider as core_provider
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.cloudfiles import settings
 from waterbutler.providers.cloudfiles import CloudFilesProvider
+from waterbutler.providers.cloudfiles import settings as cloudfiles_settings
 
 
 @pytest.fixture
@@ -406,6 +408,134 @@ class TestCRUD:
 
         assert aiohttpretty.has_call(method='DELETE', uri=url)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_delete_folder(self, connected_provider):
+        path = WaterButlerPath('/level1/')
+        list_url = connected_provider.build_url('', prefix=path.path, limit=cloudfiles_settings.LISTING_LIMIT)
+        aiohttpretty.register_json_uri('GET', list_url, body=[
+            {'name': 'level1/file1', 'bytes': 1},
+            {'name': 'level1/level2', 'content_type': 'application/directory'},
+        ])
+        url = core_provider.build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+        aiohttpretty.register_json_uri('DELETE', url, body={'Number Deleted': 3, 'Errors': []})
+
+        yield from connected_provider.delete(path)
+
+        assert aiohttpretty.has_call(method='GET', uri=list_url)
+        assert aiohttpretty.has_call(method='DELETE', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_delete_many_in_chunks(self, connected_provider, monkeypatch):
+        monkeypatch.setattr(cloudfiles_settings, 'BULK_DELETE_CHUNK_SIZE', 2)
+        deleted = []
+        url = core_provider.build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+        aiohttpretty.register_json_uri('DELETE', url, body={'Number Deleted': 2, 'Errors': []})
+
+        original = connected_provider.make_request
+
+        def make_request(method, url, **kwargs):
+            if method == 'DELETE':
+                deleted.append(kwargs['data'].split('\n'))
+            return original(method, url, **kwargs)
+
+        connected_provider.make_request = make_request
+        yield from connected_provider.delete_many([WaterButlerPath('/{}'.format(name)) for name in 'abc'])
+
+        assert sorted(deleted) == [
+            ['/purple%20rain/a', '/purple%20rain/b'],
+            ['/purple%20rain/c'],
+        ]
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_delete_many_reports_errors(self, connected_provider):
+        url = core_provider.build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+        aiohttpretty.register_json_uri('DELETE', url, body={
+            'Number Deleted': 0,
+            'Errors': [['/purple%20rain/a', '401 Unauthorized']],
+        })
+
+        with pytest.raises(exceptions.DeleteError):
+            yield from connected_provider.delete_many([WaterButlerPath('/a')])
+
+
+class TestWalk:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_pages_recursive_listing(self, connected_provider, monkeypatch):
+        monkeypatch.setattr(cloudfiles_settings, 'LISTING_LIMIT', 2)
+        path = WaterButlerPath('/level1/')
+        query = {'prefix': path.path, 'limit': 2}
+        first = connected_provider.build_url('', **query)
+        query['marker'] = 'level1/level2/file2'
+        second = connected_provider.build_url('', **query)
+        aiohttpretty.register_json_uri('GET', first, body=[
+            {'name': 'level1/level2', 'content_type': 'application/directory', 'bytes': 0},
+            {'name': 'level1/level2/file2', 'content_type': 'text/plain', 'bytes': 3,
+             'hash': 'abc', 'last_modified': '2015-01-01T00:00:00'},
+        ])
+        aiohttpretty.register_json_uri('GET', second, body=[
+            {'name': 'level1/implied/file3', 'content_type': 'text/plain', 'bytes': 5,
+             'hash': 'def', 'last_modified': '2015-01-01T00:00:00'},
+        ])
+
+        entries = yield from connected_provider.walk(path).collect()
+
+        assert [(str(path), item.kind) for path, item in entries] == [
+            ('/level1/level2/', 'folder'),
+            ('/level1/level2/file2', 'file'),
+            ('/level1/implied/', 'folder'),
+            ('/level1/implied/file3', 'file'),
+        ]
+        assert entries[2][1].name == 'implied'
+        assert entries[3][1].size == 5
+
+
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_lists_one_object(self, connected_provider, folder_root_level1):
+        path = WaterButlerPath('/level1/')
+        url = connected_provider.build_url('', prefix=path.path, limit=1)
+        aiohttpretty.register_json_uri('GET', url, body=folder_root_level1)
+
+        assert (yield from connected_provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_empty_folder_marker(self, connected_provider):
+        path = WaterButlerPath('/level1_empty/')
+        url = connected_provider.build_url('', prefix=path.path, limit=1)
+        marker_url = connected_provider.build_url('level1_empty')
+        aiohttpretty.register_json_uri('GET', url, body=[])
+        aiohttpretty.register_uri('HEAD', marker_url, headers={'Content-Type': 'application/directory'})
+
+        assert (yield from connected_provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='HEAD', uri=marker_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_marker_is_not_a_file(self, connected_provider):
+        path = WaterButlerPath('/level1_empty')
+        url = connected_provider.build_url(path.path)
+        aiohttpretty.register_uri('HEAD', url, headers={'Content-Type': 'application/directory'})
+
+        assert (yield from connected_provider.exists(path)) is False
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_not_found(self, connected_provider):
+        path = WaterButlerPath('/missing.file')
+        url = connected_provider.build_url(path.path)
+        aiohttpretty.register_uri('HEAD', url, status=404)
+
+        assert (yield from connected_provider.exists(path)) is False
+
 
 class TestMetadata:
 
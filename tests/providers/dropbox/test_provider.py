@@ -162,7 +162,7 @@ class TestCRUD:
     def test_upload(self, provider, file_metadata, file_stream, settings):
         path = yield from provider.validate_path('/phile')
 
-        metadata_url = provider.build_url('metadata', 'auto', path.full_path)
+        metadata_url = provider.build_url('metadata', 'auto', path.full_path, list='false')
         url = provider._build_content_url('files_put', 'auto', path.full_path)
 
         aiohttpretty.register_uri('GET', metadata_url, status=404)
@@ -229,6 +229,37 @@ class TestMetadata:
             yield from provider.metadata(path)
 
 
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_does_not_list_folders(self, provider, folder_metadata):
+        path = yield from provider.validate_path('/')
+        url = provider.build_url('metadata', 'auto', path.full_path, list='false')
+        aiohttpretty.register_json_uri('GET', url, body=folder_metadata)
+
+        assert (yield from provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_at_file_path(self, provider, folder_metadata):
+        path = yield from provider.validate_path('/phile')
+        url = provider.build_url('metadata', 'auto', path.full_path, list='false')
+        aiohttpretty.register_json_uri('GET', url, body=folder_metadata)
+
+        assert (yield from provider.exists(path)) is False
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_not_found(self, provider):
+        path = yield from provider.validate_path('/phile')
+        url = provider.build_url('metadata', 'auto', path.full_path, list='false')
+        aiohttpretty.register_uri('GET', url, status=404)
+
+        assert (yield from provider.exists(path)) is False
+
+
 class TestCreateFolder:
 
     @async
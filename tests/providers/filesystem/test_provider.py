@@ -176,6 +176,20 @@ class TestMetadata:
             yield from provider.metadata(path)
 
 
+class TestExists:
+
+    @async
+    def test_exists(self, provider):
+        assert (yield from provider.exists((yield from provider.validate_path('/flower.jpg'))))
+        assert (yield from provider.exists((yield from provider.validate_path('/subfolder/'))))
+
+    @async
+    def test_kind_must_match(self, provider):
+        assert not (yield from provider.exists((yield from provider.validate_path('/flower.jpg/'))))
+        assert not (yield from provider.exists((yield from provider.validate_path('/subfolder'))))
+        assert not (yield from provider.exists((yield from provider.validate_path('/missing.txt'))))
+
+
 class TestOperations:
 
     def test_can_intra_copy(self, provider):
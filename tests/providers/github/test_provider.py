@@ -1,5 +1,6 @@
 import pytest
 
+from tests import utils
 from tests.utils import async
 
 import io
@@ -656,6 +657,108 @@ class TestCRUD:
     #     assert aiohttpretty.has_call(method='DELETE', uri=url, data=json.dumps(expected_data))
 
 
+class TestWalk:
+
+    @async
+    def test_recursive_tree(self, provider, repo_tree_metadata_root):
+        repo_tree_metadata_root['tree'].append({
+            'path': 'level1/nested.txt', 'mode': '100644', 'type': 'blob', 'sha': 'c', 'size': 3,
+        })
+        provider._fetch_tree = utils.MockCoroutine(return_value=repo_tree_metadata_root)
+        path = yield from provider.validate_path('/')
+
+        entries = yield from provider.walk(path).collect()
+
+        provider._fetch_tree.assert_called_once_with(provider.default_branch, recursive=True)
+        assert [(str(path), item.kind) for path, item in entries] == [
+            ('/file.txt', 'file'),
+            ('/level1/', 'folder'),
+            ('/test.rst', 'file'),
+            ('/level1/nested.txt', 'file'),
+        ]
+        assert all(path.identifier[0] == provider.default_branch for path, _ in entries)
+
+    @async
+    def test_subfolder(self, provider, repo_tree_metadata_root):
+        repo_tree_metadata_root['tree'].append({
+            'path': 'level1/nested.txt', 'mode': '100644', 'type': 'blob', 'sha': 'c', 'size': 3,
+        })
+        provider._fetch_tree = utils.MockCoroutine(return_value=repo_tree_metadata_root)
+        path = yield from provider.validate_path('/level1/')
+
+        entries = yield from provider.walk(path).collect()
+
+        assert [str(path) for path, _ in entries] == ['/level1/nested.txt']
+
+    @async
+    def test_truncated_tree_falls_back(self, provider):
+        provider._fetch_tree = utils.MockCoroutine(return_value={'truncated': True, 'tree': []})
+        provider.metadata = utils.MockCoroutine(return_value=[])
+        path = yield from provider.validate_path('/')
+
+        assert (yield from provider.walk(path).collect()) == []
+        provider.metadata.assert_called_once_with(path)
+
+
+class TestDeleteMany:
+
+    def mock_tree(self, provider, truncated=False):
+        provider._fetch_branch = utils.MockCoroutine(return_value={
+            'commit': {'sha': 'oldcommit', 'commit': {'tree': {'sha': 'oldtree'}}},
+        })
+        provider._fetch_tree = utils.MockCoroutine(return_value={
+            'truncated': truncated,
+            'tree': [
+                {'path': 'file.txt', 'mode': '100644', 'type': 'blob', 'sha': 'a', 'size': 0},
+                {'path': 'level1', 'mode': '040000', 'type': 'tree', 'sha': 'b'},
+                {'path': 'level1/nested.txt', 'mode': '100644', 'type': 'blob', 'sha': 'c', 'size': 0},
+                {'path': 'test.rst', 'mode': '100644', 'type': 'blob', 'sha': 'd', 'size': 0},
+            ],
+        })
+        provider._create_tree = utils.MockCoroutine(return_value={'sha': 'newtree'})
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_single_commit(self, provider):
+        self.mock_tree(provider)
+        commit_url = provider.build_repo_url('git', 'commits')
+        ref_url = provider.build_repo_url('git', 'refs', 'heads', provider.default_branch)
+        aiohttpretty.register_json_uri('POST', commit_url, status=201, body={'sha': 'newcommit'})
+        aiohttpretty.register_json_uri('PATCH', ref_url, status=200, body={})
+
+        paths = [(yield from provider.validate_path('/level1/')), (yield from provider.validate_path('/file.txt'))]
+        yield from provider.delete_many(paths)
+
+        provider._fetch_tree.assert_called_once_with('oldtree', recursive=True)
+        provider._create_tree.assert_called_once_with({'tree': [
+            {'path': 'test.rst', 'mode': '100644', 'type': 'blob', 'sha': 'd'},
+        ]})
+        assert aiohttpretty.has_call(method='POST', uri=commit_url)
+        assert aiohttpretty.has_call(method='PATCH', uri=ref_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_missing_path(self, provider):
+        self.mock_tree(provider)
+        path = yield from provider.validate_path('/nope.txt')
+
+        with pytest.raises(exceptions.NotFoundError):
+            yield from provider.delete_many([path])
+
+        assert provider._create_tree.called is False
+
+    @async
+    def test_truncated_tree_falls_back(self, provider):
+        self.mock_tree(provider, truncated=True)
+        provider.delete = utils.MockCoroutine()
+        path = yield from provider.validate_path('/file.txt')
+
+        yield from provider.delete_many([path])
+
+        provider.delete.assert_called_once_with(path, message=None)
+        assert provider._create_tree.called is False
+
+
 class TestMetadata:
 
     @async
@@ -727,6 +830,28 @@ class TestMetadata:
     # def test_metadata_non_root_folder_commit_sha(self, provider, repo_metadata, branch_metadata, repo_metadata_root):
 
 
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_heads_contents(self, provider):
+        path = yield from provider.validate_path('/file.txt')
+        url = provider.build_repo_url('contents', path.path, ref=path.identifier[0])
+        aiohttpretty.register_uri('HEAD', url, status=200)
+
+        assert (yield from provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='HEAD', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_not_found(self, provider):
+        path = yield from provider.validate_path('/file.txt', branch='other')
+        url = provider.build_repo_url('contents', path.path, ref='other')
+        aiohttpretty.register_uri('HEAD', url, status=404)
+
+        assert (yield from provider.exists(path)) is False
+
+
 class TestCreateFolder:
 
     @async
@@ -1,5 +1,6 @@
 import pytest
 
+from tests import utils
 from tests.utils import async
 
 import io
@@ -371,6 +372,44 @@ class TestMetadata:
         assert aiohttpretty.has_call(method='GET', uri=url)
 
 
+class TestSiblingNames:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_lists_candidates_in_parent(self, provider):
+        path = GoogleDrivePath('/hugo/kim.txt', _ids=['0', '1', '2'])
+        params = {
+            'q': "{} and title contains 'kim'".format(provider._build_query('1')),
+            'fields': 'items(title),nextPageToken',
+            'maxResults': 1000,
+        }
+        first_url = provider.build_url('files', **params)
+        params['pageToken'] = 'next'
+        second_url = provider.build_url('files', **params)
+
+        aiohttpretty.register_json_uri('GET', first_url, body={
+            'items': [{'title': 'kim.txt'}, {'title': 'kim (1).txt'}],
+            'nextPageToken': 'next',
+        })
+        aiohttpretty.register_json_uri('GET', second_url, body={'items': [{'title': 'kimberly.txt'}]})
+
+        names = yield from provider.sibling_names(path)
+
+        assert names == {'kim.txt', 'kim (1).txt', 'kimberly.txt'}
+
+    @async
+    def test_handle_name_conflict_uses_listing(self, provider):
+        path = GoogleDrivePath('/hugo/kim.txt', _ids=['0', '1', '2'])
+        provider.exists = utils.MockCoroutine(return_value=True)
+        provider.sibling_names = utils.MockCoroutine(return_value={'kim.txt', 'kim (1).txt'})
+
+        handled, exists = yield from provider.handle_name_conflict(path, conflict='keep')
+
+        assert exists is False
+        assert handled.name == 'kim (2).txt'
+        assert handled.identifier is None
+
+
 class TestRevisions:
 
     @async
@@ -418,6 +457,34 @@ class TestRevisions:
             yield from provider.revisions(WaterButlerPath('/birdie.jpg'))
 
 
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_fetches_only_the_id(self, provider):
+        path = GoogleDrivePath('/hugo/kim/pins/', _ids=['0', '1', '2', '3'])
+        url = provider.build_url('files', '3', fields='id,labels/trashed')
+        aiohttpretty.register_json_uri('GET', url, body={'id': '3', 'labels': {'trashed': False}})
+
+        assert (yield from provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_trashed(self, provider):
+        path = GoogleDrivePath('/hugo/kim.txt', _ids=['0', '1', '2'])
+        url = provider.build_url('files', '2', fields='id,labels/trashed')
+        aiohttpretty.register_json_uri('GET', url, body={'id': '2', 'labels': {'trashed': True}})
+
+        assert (yield from provider.exists(path)) is False
+
+    @async
+    def test_no_id(self, provider):
+        path = GoogleDrivePath('/hugo/kim.txt', _ids=['0', '1', None])
+
+        assert (yield from provider.exists(path)) is False
+
+
 class TestCreateFolder:
 
     @async
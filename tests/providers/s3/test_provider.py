@@ -3,6 +3,7 @@ import pytest
 from tests.utils import async
 
 import io
+import base64
 import hashlib
 
 import aiohttpretty
@@ -13,6 +14,7 @@ from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.s3 import S3Provider
+from waterbutler.providers.s3 import settings as s3_settings
 from waterbutler.providers.s3.metadata import S3FileMetadata
 from waterbutler.providers.s3.metadata import S3FolderMetadata
 
@@ -497,6 +499,52 @@ class TestMetadata:
         assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
 
 
+class TestExists:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_file(self, provider):
+        path = WaterButlerPath('/foobah')
+        url = provider.bucket.new_key(path.path).generate_url(100, 'HEAD')
+        aiohttpretty.register_uri('HEAD', url, status=200)
+
+        assert (yield from provider.exists(path)) is True
+        assert aiohttpretty.has_call(method='HEAD', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_file_not_found(self, provider):
+        path = WaterButlerPath('/foobah')
+        url = provider.bucket.new_key(path.path).generate_url(100, 'HEAD')
+        aiohttpretty.register_uri('HEAD', url, status=404)
+
+        assert (yield from provider.exists(path)) is False
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_lists_one_key(self, provider, just_a_folder_metadata):
+        path = WaterButlerPath('/naptime/')
+        url = provider.bucket.generate_url(100, 'GET')
+        aiohttpretty.register_uri('GET', url, body=just_a_folder_metadata, headers={'Content-Type': 'application/xml'})
+
+        assert (yield from provider.exists(path)) is True
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_not_found(self, provider):
+        path = WaterButlerPath('/naptime/')
+        url = provider.bucket.generate_url(100, 'GET')
+        aiohttpretty.register_uri('GET', url, body=b'''<?xml version="1.0" encoding="UTF-8"?>
+            <ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+                <Name>bucket</Name>
+                <Prefix>naptime/</Prefix>
+                <MaxKeys>1</MaxKeys>
+                <IsTruncated>false</IsTruncated>
+            </ListBucketResult>''', headers={'Content-Type': 'application/xml'})
+
+        assert (yield from provider.exists(path)) is False
+
+
 class TestCreateFolder:
 
     @async
@@ -612,3 +660,95 @@ class TestOperations:
     def test_equality(self, provider):
         assert provider.can_intra_copy(provider)
         assert provider.can_intra_move(provider)
+
+
+class TestWalk:
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_pages_without_delimiter(self, provider):
+        url = provider.bucket.generate_url(100, 'GET')
+        aiohttpretty.register_uri('GET', url, responses=[
+            {'body': b'''<?xml version="1.0" encoding="UTF-8"?>
+                <ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+                    <Prefix>naptime/</Prefix>
+                    <IsTruncated>true</IsTruncated>
+                    <Contents><Key>naptime/</Key></Contents>
+                    <Contents><Key>naptime/deep/dream.txt</Key><Size>4</Size><ETag>"a"</ETag></Contents>
+                </ListBucketResult>'''},
+            {'body': b'''<?xml version="1.0" encoding="UTF-8"?>
+                <ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+                    <Prefix>naptime/</Prefix>
+                    <IsTruncated>false</IsTruncated>
+                    <Contents><Key>naptime/marked/</Key></Contents>
+                    <Contents><Key>naptime/snore.txt</Key><Size>2</Size><ETag>"b"</ETag></Contents>
+                </ListBucketResult>'''},
+        ])
+
+        entries = yield from provider.walk(WaterButlerPath('/naptime/')).collect()
+
+        assert [(str(path), item.kind) for path, item in entries] == [
+            ('/naptime/deep/', 'folder'),
+            ('/naptime/deep/dream.txt', 'file'),
+            ('/naptime/marked/', 'folder'),
+            ('/naptime/snore.txt', 'file'),
+        ]
+        assert entries[0][1].name == 'deep'
+        assert entries[3][1].size == 2
+
+
+class TestDeleteMany:
+
+    def delete_url(self, provider, keys):
+        body = '<?xml version="1.0" encoding="UTF-8"?><Delete><Quiet>true</Quiet>{}</Delete>'.format(
+            ''.join('<Object><Key>{}</Key></Object>'.format(key) for key in keys)
+        ).encode('utf-8')
+        return provider.bucket.generate_url(100, 'POST', query_parameters={'delete': ''}, headers={
+            'Content-MD5': base64.b64encode(hashlib.md5(body).digest()).decode('ascii'),
+            'Content-Type': 'application/xml',
+        })
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folders_and_files_in_one_request(self, provider):
+        list_url = provider.bucket.generate_url(100, 'GET')
+        aiohttpretty.register_uri('GET', list_url, body=b'''<?xml version="1.0" encoding="UTF-8"?>
+            <ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+                <Name>bucket</Name>
+                <Prefix>naptime/</Prefix>
+                <IsTruncated>false</IsTruncated>
+                <Contents><Key>naptime/</Key></Contents>
+                <Contents><Key>naptime/deep/snore.txt</Key></Contents>
+            </ListBucketResult>''', headers={'Content-Type': 'application/xml'})
+        url = self.delete_url(provider, ['naptime/', 'naptime/deep/snore.txt', 'pillow.txt'])
+        aiohttpretty.register_uri('POST', url, status=200, body=b'''<?xml version="1.0" encoding="UTF-8"?>
+            <DeleteResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></DeleteResult>''')
+
+        yield from provider.delete_many([WaterButlerPath('/naptime/'), WaterButlerPath('/pillow.txt')])
+
+        assert aiohttpretty.has_call(method='POST', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_batches(self, provider, monkeypatch):
+        monkeypatch.setattr(s3_settings, 'DELETE_BATCH_SIZE', 2)
+        paths = [WaterButlerPath('/{}.txt'.format(name)) for name in 'abc']
+        urls = [self.delete_url(provider, ['a.txt', 'b.txt']), self.delete_url(provider, ['c.txt'])]
+        for url in urls:
+            aiohttpretty.register_uri('POST', url, status=200, body=b'<DeleteResult></DeleteResult>')
+
+        yield from provider.delete_many(paths)
+
+        assert all(aiohttpretty.has_call(method='POST', uri=url) for url in urls)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_reports_errors(self, provider):
+        url = self.delete_url(provider, ['a.txt'])
+        aiohttpretty.register_uri('POST', url, status=200, body=b'''<?xml version="1.0" encoding="UTF-8"?>
+            <DeleteResult>
+                <Error><Key>a.txt</Key><Code>AccessDenied</Code><Message>Access Denied</Message></Error>
+            </DeleteResult>''')
+
+        with pytest.raises(exceptions.DeleteError):
+            yield from provider.delete_many([WaterButlerPath('/a.txt')])
@@ -3,6 +3,8 @@ import json
 from tornado import testing
 
 import waterbutler
+from waterbutler.core import breaker
+from waterbutler.core import metrics
 
 from tests import utils
 
@@ -14,6 +16,8 @@ class TestStatusHandler(utils.HandlerTestCase):
         expected = {
             'status': 'up',
             'version': waterbutler.__version__,
+            'metrics': metrics.snapshot(),
+            'upstreams': breaker.states(),
         }
         resp = yield self.http_client.fetch(
             self.get_url('/status'),
@@ -1,6 +1,7 @@
 import asyncio
 import io
 import zipfile
+import tempfile
 from unittest import mock
 
 from tornado import testing
@@ -31,3 +32,18 @@ class TestZipHandler(utils.HandlerTestCase):
         assert zip.testzip() is None
 
         assert zip.open('file.txt').read() == data
+
+    @testing.gen_test
+    def test_download_cached(self):
+        data = b'a cached archive'
+        with tempfile.TemporaryFile() as cached:
+            cached.write(data)
+            cached.flush()
+            self.mock_provider.zip = utils.MockCoroutine(return_value=streams.FileStreamReader(cached))
+
+            resp = yield self.http_client.fetch(
+                self.get_url('/zip?provider=queenhub&path=/freddie/'),
+            )
+
+        assert resp.body == data
+        assert resp.headers['Content-Length'] == str(len(data))
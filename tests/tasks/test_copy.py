@@ -8,6 +8,7 @@ import pytest
 import freezegun
 
 from waterbutler import tasks  # noqa
+from waterbutler.core import checkpoint
 from waterbutler.core.path import WaterButlerPath
 
 import tests.utils as test_utils
@@ -181,3 +182,21 @@ class TestCopyTask:
 
         assert data['email'] is False
         assert data['time'] == 60 + stamp
+
+    def test_folder_copy_is_checkpointed(self, providers, bundles, callback, monkeypatch):
+        src, dest = providers
+        src_bundle, dest_bundle = bundles
+        src_bundle['path'] = WaterButlerPath('/user/bin/')
+
+        manifest = checkpoint.Manifest('key')
+        manifest.discard = test_utils.MockCoroutine()
+        monkeypatch.setattr(copy.core, 'load_checkpoint', test_utils.MockCoroutine(return_value=manifest))
+
+        copy.copy(cp.deepcopy(src_bundle), cp.deepcopy(dest_bundle), '', {'auth': {}})
+
+        src.copy.assert_called_once_with(dest, src_bundle['path'], dest_bundle['path'], checkpoint=manifest)
+        assert manifest.discard.called
+
+        (_, _, data), _ = callback.call_args_list[0]
+        # The callback payload is validated by its consumers, progress is only logged
+        assert 'progress' not in data
@@ -3,6 +3,7 @@ import aiohttp
 
 from waterbutler.core import auth
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 
 from waterbutler.auth.osf import settings
 
@@ -33,7 +34,7 @@ class OsfAuthHandler(auth.BaseAuthHandler):
         if view_only:
             bundle['view_only'] = view_only[0].decode()
 
-        response = yield from aiohttp.request(
+        response = yield from connections.request(
             'get',
             settings.API_URL,
             params=bundle,
@@ -73,7 +74,7 @@ class OsfAuthHandler(auth.BaseAuthHandler):
             params['view_only'] = view_only[0].decode()
 
         try:
-            response = yield from aiohttp.request(
+            response = yield from connections.request(
                 'get',
                 settings.API_URL,
                 params=params,
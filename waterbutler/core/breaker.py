@@ -0,0 +1,187 @@
+"""Circuit breakers for upstream services.
+
+A breaker exists for every provider and upstream host pair and is shared by the
+whole process. While closed every request is let through and its outcome is
+recorded. Once too many of the recent requests failed the breaker opens and
+requests fail immediately with a 503 instead of waiting on a dead upstream.
+After ``BREAKER_RESET_TIMEOUT`` seconds the breaker is half open and lets a few
+probes through, a successful probe closes it and a failed one opens it again.
+"""
+import time
+import asyncio
+import threading
+import collections
+from urllib import parse
+
+from waterbutler.core import metrics
+from waterbutler.core import settings
+from waterbutler.core import exceptions
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def is_failure(response):
+    """Server errors count against an upstream, client errors and throttling do not"""
+    # 501 is a request the upstream will never serve. A 503 asking for a retry later is throttling,
+    # one without Retry-After is usually a proxy in front of an upstream that is down
+    if response.status == 503:
+        return 'Retry-After' not in response.headers
+    return response.status >= 500 and response.status != 501
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, host, window=20, min_requests=10, error_rate=0.5, reset_timeout=30, half_open_probes=1):
+        self.name = name
+        self.host = host
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes = 0
+        self._outcomes = collections.deque(maxlen=window)
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        metrics.incr('breaker', '{}.opened'.format(self.name))
+
+    def before_request(self):
+        """Raises :class:`UpstreamUnavailableError` if the request may not be sent
+
+        :rtype: bool
+        :returns: True if the request is a half open probe
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+
+        metrics.incr('breaker', '{}.rejected'.format(self.name))
+        raise exceptions.UpstreamUnavailableError(self.name, self.host)
+
+    def record(self, failed, probe=False):
+        with self._lock:
+            if probe:
+                self._probes -= 1
+
+            if self._state == HALF_OPEN:
+                if failed:
+                    self._open()
+                elif probe:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            if self._state == OPEN:
+                return
+
+            self._outcomes.append(failed)
+            if (
+                len(self._outcomes) >= self.min_requests and
+                sum(self._outcomes) / len(self._outcomes) >= self.error_rate
+            ):
+                self._open()
+
+    def abandon(self, probe=False):
+        """The request was cancelled before its outcome was known"""
+        if probe:
+            with self._lock:
+                self._probes -= 1
+
+    @asyncio.coroutine
+    def send(self, send):
+        """Calls `send` unless the breaker is open
+
+        :param callable send: Returns a coroutine that resolves to an :class:`aiohttp.ClientResponse`
+        """
+        probe = self.before_request()
+
+        try:
+            response = yield from send()
+        except asyncio.CancelledError:
+            self.abandon(probe)
+            raise
+        except Exception:
+            self.record(True, probe)
+            raise
+
+        self.record(is_failure(response), probe)
+        return response
+
+
+_lock = threading.Lock()
+# Least recently used last, hosts of per user upstreams come and go
+_breakers = collections.OrderedDict()
+
+
+def breaker_for(name, url):
+    """Returns the :class:`CircuitBreaker` for provider `name` and the host of `url`
+
+    :param str name: The provider's name
+    :param str url: The url a request is about to be sent to
+    """
+    host = parse.urlparse(url).netloc
+
+    with _lock:
+        try:
+            breaker = _breakers.pop((name, host))
+        except KeyError:
+            pass
+        else:
+            _breakers[(name, host)] = breaker
+            return breaker
+
+        while len(_breakers) >= settings.BREAKER_MAX_UPSTREAMS:
+            _breakers.popitem(last=False)
+
+        breaker = _breakers[(name, host)] = CircuitBreaker(
+            name, host,
+            window=settings.BREAKER_WINDOW,
+            error_rate=settings.BREAKER_ERROR_RATE,
+            min_requests=settings.BREAKER_MIN_REQUESTS,
+            reset_timeout=settings.BREAKER_RESET_TIMEOUT,
+            half_open_probes=settings.BREAKER_HALF_OPEN_PROBES,
+        )
+        return breaker
+
+
+def states():
+    """The state of every known upstream, grouped by provider
+
+        >>> states()
+        {'cloudfiles': {'identity.api.rackspacecloud.com': 'open'}}
+    """
+    with _lock:
+        breakers = list(_breakers.values())
+
+    upstreams = collections.defaultdict(dict)
+    for breaker in breakers:
+        upstreams[breaker.name][breaker.host] = breaker.state
+    return dict(upstreams)
+
+
+def reset():
+    with _lock:
+        _breakers.clear()
@@ -0,0 +1,288 @@
+"""A cross request cache of provider metadata.
+
+Providers opt in by decorating ``metadata`` with :func:`cached` and every method
+that changes their contents with :func:`invalidates`. Entries are keyed by
+provider, credentials, settings and materialized path, a write to a path
+invalidates every cached variant of that path and of its parent, and a write to
+a folder everything cached below it too.
+
+The cache is off unless ``METADATA_CACHE_BACKEND`` is set to ``'memory'``, an
+LRU local to the process, or ``'redis'``, shared by every process pointed at
+``METADATA_CACHE_URL``. Invalidations only reach the processes sharing a backend,
+the memory backend is for single process deployments. With several tornado
+workers or celery workers writing, the others serve stale metadata for up to
+their TTL, use the redis backend there.
+"""
+import re
+import time
+import pickle
+import asyncio
+import inspect
+import logging
+import functools
+import threading
+import collections
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import settings
+from waterbutler.core import zipcache
+from waterbutler.core.path import WaterButlerPath
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """An in process LRU of at most ``size`` paths"""
+
+    blocking = False
+
+    def __init__(self, size=10000):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, field):
+        with self._lock:
+            try:
+                fields = self._entries.pop(key)
+            except KeyError:
+                return None
+            self._entries[key] = fields
+            expires, value = fields.get(field, (0, None))
+
+        if expires <= time.time():
+            return None
+        return value
+
+    def set(self, key, field, value, ttl):
+        with self._lock:
+            fields = self._entries.pop(key, {})
+            fields[field] = (time.time() + ttl, value)
+            self._entries[key] = fields
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class RedisBackend:
+    """Stores every path as a redis hash of its variants.
+    `client` may be anything implementing ``hget``, ``hset``, ``expire``, ``delete`` and
+    ``scan_iter`` like :class:`redis.StrictRedis`.
+    """
+
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url, timeout=0.5):
+        if redis is None:
+            raise ImportError('The redis metadata cache backend requires the redis package')
+        return cls(redis.StrictRedis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout))
+
+    def get(self, key, field):
+        value = self.client.hget(key, field)
+        if value is None:
+            return None
+
+        expires, value = pickle.loads(value)
+        if expires <= time.time():
+            return None
+        return value
+
+    def set(self, key, field, value, ttl):
+        # Variants expire on their own, the hash lives as long as its newest variant
+        self.client.hset(key, field, pickle.dumps((time.time() + ttl, value)))
+        self.client.expire(key, ttl)
+
+    def delete(self, *keys):
+        self.client.delete(*keys)
+
+    def delete_prefix(self, prefix):
+        # Paths may hold the glob characters of the pattern
+        match = re.sub(r'([*?\[\]\\])', r'\\\1', prefix) + '*'
+        keys = list(self.client.scan_iter(match=match, count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+
+class MetadataCache:
+
+    def __init__(self, backend, ttl=60, ttls=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.ttls = ttls or {}
+
+    def _key(self, provider, path):
+        return 'waterbutler:metadata:{}:{}:{}:{}'.format(
+            provider.NAME,
+            utils.fingerprint(provider.credentials),
+            utils.fingerprint(provider.settings),
+            path,
+        )
+
+    def _field(self, path, kwargs):
+        ids = [part.identifier for part in path.parts] if isinstance(path, WaterButlerPath) else []
+        return repr((ids, sorted(kwargs.items())))
+
+    @asyncio.coroutine
+    def _call(self, method, *args):
+        try:
+            if self.backend.blocking:
+                return (yield from asyncio.get_event_loop().run_in_executor(None, method, *args))
+            return method(*args)
+        except Exception as e:
+            # The cache is an optimization, an unavailable backend is a miss
+            logger.warning('Metadata cache backend failed with {!r}'.format(e))
+            metrics.incr('metadata_cache', 'errors')
+            return None
+
+    @asyncio.coroutine
+    def get(self, provider, path, kwargs):
+        value = yield from self._call(self.backend.get, self._key(provider, path), self._field(path, kwargs))
+
+        if value is None:
+            metrics.incr('metadata_cache', '{}.misses'.format(provider.NAME))
+            return None
+
+        metrics.incr('metadata_cache', '{}.hits'.format(provider.NAME))
+        return pickle.loads(value)
+
+    @asyncio.coroutine
+    def set(self, provider, path, kwargs, metadata):
+        try:
+            value = pickle.dumps(metadata)
+        except Exception:
+            logger.debug('Not caching unpicklable metadata for {}'.format(path))
+            return
+
+        yield from self._call(
+            self.backend.set,
+            self._key(provider, path),
+            self._field(path, kwargs),
+            value,
+            self.ttls.get(provider.NAME, self.ttl),
+        )
+
+    @asyncio.coroutine
+    def invalidate(self, provider, *paths):
+        keys, folders = set(), set()
+        for path in paths:
+            keys.add(self._key(provider, path))
+            if isinstance(path, WaterButlerPath) and path.parent is not None:
+                keys.add(self._key(provider, path.parent))
+            if isinstance(path, WaterButlerPath) and path.is_dir:
+                # Deleting or moving a folder changes everything below it
+                folders.add(self._key(provider, path))
+
+        metrics.incr('metadata_cache', 'invalidations', len(keys))
+        yield from self._call(self.backend.delete, *keys)
+        for folder in folders:
+            yield from self._call(self.backend.delete_prefix, folder)
+
+
+def from_settings():
+    if not settings.METADATA_CACHE_BACKEND:
+        return None
+
+    if settings.METADATA_CACHE_BACKEND == 'memory':
+        backend = MemoryBackend(size=settings.METADATA_CACHE_SIZE)
+    elif settings.METADATA_CACHE_BACKEND == 'redis':
+        backend = RedisBackend.from_url(settings.METADATA_CACHE_URL)
+    else:
+        raise ValueError('Unknown METADATA_CACHE_BACKEND {!r}'.format(settings.METADATA_CACHE_BACKEND))
+
+    return MetadataCache(backend, ttl=settings.METADATA_CACHE_TTL, ttls=settings.METADATA_CACHE_TTLS)
+
+
+metadata_cache = from_settings()
+
+
+def _bind(func, name='path'):
+    """Returns a function splitting a call to `func` into its `name` argument and its other arguments"""
+    signature = inspect.signature(func)
+    var_keyword = next((
+        param.name for param in signature.parameters.values()
+        if param.kind == param.VAR_KEYWORD
+    ), None)
+
+    def bind(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs).arguments
+        others = dict(arguments.pop(var_keyword, {}))
+        others.update(arguments)
+        others.pop('self', None)
+        return others.pop(name), others
+
+    return bind
+
+
+def cached(func):
+    """Decorates a provider's ``metadata`` method. Results are served from and stored in the cache."""
+    bind = _bind(func)
+
+    @functools.wraps(func)
+    @asyncio.coroutine
+    def wrapped(self, *args, **kwargs):
+        if metadata_cache is None:
+            return (yield from func(self, *args, **kwargs))
+
+        path, variant = bind(self, *args, **kwargs)
+
+        metadata = yield from metadata_cache.get(self, path, variant)
+        if metadata is not None:
+            return metadata
+
+        metadata = yield from func(self, *args, **kwargs)
+        yield from metadata_cache.set(self, path, variant, metadata)
+        return metadata
+
+    return wrapped
+
+
+def invalidates(func):
+    """Decorates a provider method that changes what is at its ``path`` argument,
+    such as ``upload``, ``delete`` or ``create_folder``, or at every one of its ``paths``
+    argument, such as ``delete_many``.
+    Cached metadata of the paths, their parents and everything below them, and cached zips
+    of every folder above them, are dropped once the change has been made.
+    """
+    many = 'paths' in inspect.signature(func).parameters
+    bind = _bind(func, 'paths' if many else 'path')
+
+    @functools.wraps(func)
+    @asyncio.coroutine
+    def wrapped(self, *args, **kwargs):
+        try:
+            return (yield from func(self, *args, **kwargs))
+        finally:
+            if metadata_cache is not None or zipcache.zip_cache is not None:
+                paths = bind(self, *args, **kwargs)[0]
+                yield from invalidate(self, *(paths if many else [paths]))
+
+    return wrapped
+
+
+@asyncio.coroutine
+def invalidate(provider, *paths):
+    """Drops the cached metadata of `paths`, their parents and their contents, and the cached zips of the folders above them"""
+    if metadata_cache is not None:
+        yield from metadata_cache.invalidate(provider, *paths)
+    if zipcache.zip_cache is not None:
+        yield from zipcache.zip_cache.invalidate(provider, *paths)
@@ -0,0 +1,146 @@
+"""Checkpoints of folder copies and moves.
+
+A :class:`Manifest` records every child of a folder operation that has been
+transferred along with its metadata, and so its size and hash when the provider
+reports them. Passed as ``checkpoint`` to :meth:`BaseProvider.copy` or
+:meth:`BaseProvider.move` it is saved to its store at most every
+``CHECKPOINT_INTERVAL`` seconds and once more when the operation ends. An
+operation given a manifest that was saved before keeps the destination folder
+and skips every child that is still present and matching there. Manifests saved
+more than ``CHECKPOINT_TTL`` seconds ago are dropped rather than resumed.
+
+Stores are anything implementing blocking ``get``, ``set`` and ``delete`` of
+bytes by key, see :mod:`waterbutler.tasks.core`.
+"""
+import time
+import pickle
+import asyncio
+import logging
+
+from waterbutler.core import metrics
+from waterbutler.core import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(metadata):
+    if metadata.kind != 'file':
+        return metadata.kind, None, None
+
+    extra = metadata.extra or {}
+    md5 = extra.get('md5') or extra.get('hashes', {}).get('md5')
+    return metadata.kind, metadata.size, md5
+
+
+def _same(recorded, present):
+    """Whether two fingerprints of a file agree on every part both know, of which there must be one"""
+    known = [(a, b) for a, b in zip(recorded[1:], present[1:]) if a is not None and b is not None]
+    return bool(known) and all(a == b for a, b in known)
+
+
+class Manifest:
+    """The children of one folder operation that made it to the destination,
+    keyed by their destination path
+    """
+
+    def __init__(self, key, store=None, interval=None, ttl=None):
+        self.key = key
+        self.store = store
+        self.interval = settings.CHECKPOINT_INTERVAL if interval is None else interval
+        self.ttl = settings.CHECKPOINT_TTL if ttl is None else ttl
+
+        # The destination picked by handle_naming and whether it was created
+        self.target = None
+        self.created = None
+        self.entries = {}
+        self.progress = {'transferred': 0, 'skipped': 0, 'bytes': 0}
+
+        self._saved_at = time.time()
+        self._saving = False
+
+    def get(self, path):
+        return self.entries.get(str(path))
+
+    def matches(self, path, metadata):
+        """Whether `metadata`, found at `path` in the destination, is what was recorded there"""
+        recorded = self.get(path)
+        if recorded is None or metadata is None:
+            return False
+
+        recorded, present = _fingerprint(recorded), _fingerprint(metadata)
+        if recorded[0] != present[0]:
+            return False
+        # Files neither side knows the size or hash of may be truncated or stale, they are transferred again
+        return recorded[0] != 'file' or _same(recorded, present)
+
+    def record(self, path, metadata):
+        self.entries[str(path)] = metadata
+        if metadata.kind == 'file':
+            self.progress['transferred'] += 1
+            self.progress['bytes'] += metadata.size or 0
+
+    def skip(self, metadata):
+        self.progress['skipped'] += 1
+        metrics.incr('checkpoint', 'skipped')
+        if metadata.kind == 'file':
+            metrics.incr('checkpoint', 'skipped_bytes', metadata.size or 0)
+
+    @asyncio.coroutine
+    def _call(self, method, *args):
+        try:
+            return (yield from asyncio.get_event_loop().run_in_executor(None, method, *args))
+        except Exception as e:
+            # Losing a checkpoint only costs a retry some work
+            logger.warning('Checkpoint store failed with {!r}'.format(e))
+            metrics.incr('checkpoint', 'errors')
+            return None
+
+    @asyncio.coroutine
+    def load(self):
+        if self.store is None:
+            return self
+
+        value = yield from self._call(self.store.get, self.key)
+        if not value:
+            return self
+
+        saved_at, *state = pickle.loads(value)
+        if time.time() - saved_at > self.ttl:
+            # The destination may have changed any number of ways since
+            metrics.incr('checkpoint', 'expired')
+            yield from self.discard()
+            return self
+
+        self.target, self.created, self.entries, self.progress = state
+        metrics.incr('checkpoint', 'resumed')
+        return self
+
+    @asyncio.coroutine
+    def save(self):
+        if self.store is None or self._saving:
+            return
+
+        try:
+            value = pickle.dumps((time.time(), self.target, self.created, self.entries, self.progress))
+        except Exception as e:
+            logger.warning('Not saving unpicklable checkpoint {}: {!r}'.format(self.key, e))
+            return
+
+        self._saving = True
+        try:
+            yield from self._call(self.store.set, self.key, value)
+        finally:
+            self._saving = False
+            self._saved_at = time.time()
+
+    @asyncio.coroutine
+    def checkpoint(self):
+        """Saves the manifest if it has not been saved in the last ``interval`` seconds"""
+        if time.time() - self._saved_at >= self.interval:
+            yield from self.save()
+
+    @asyncio.coroutine
+    def discard(self):
+        if self.store is not None:
+            yield from self._call(self.store.delete, self.key)
@@ -0,0 +1,119 @@
+"""A process wide pool of keep-alive connections to upstream services.
+
+Every request WaterButler makes to a provider, the auth server, a callback url
+or sentry should be sent through :func:`request` so that TCP and TLS handshakes
+are paid once per host rather than once per request.
+"""
+import asyncio
+import threading
+
+import aiohttp
+
+from waterbutler.core import metrics
+from waterbutler.core import settings
+
+
+class PooledConnector(aiohttp.TCPConnector):
+    """A :class:`aiohttp.TCPConnector` that keeps at most ``limit_per_host`` idle
+    connections for each (host, port, ssl) triplet and records pool hits and misses.
+    Idle connections are evicted by aiohttp once they exceed ``keepalive_timeout``.
+    """
+
+    def __init__(self, *args, limit_per_host=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limit_per_host = limit_per_host
+
+    def _get(self, key):
+        transport, protocol = super()._get(key)
+        metrics.incr('connections', 'pool_misses' if transport is None else 'pool_hits')
+        return transport, protocol
+
+    def _release(self, key, req, transport, protocol, *, should_close=False):
+        if (
+            self.limit_per_host is not None and
+            not self._closes(req, protocol, should_close) and
+            len(self._conns.get(key, ())) >= self.limit_per_host
+        ):
+            metrics.incr('connections', 'pool_overflows')
+            transport.close()
+            return
+        super()._release(key, req, transport, protocol, should_close=should_close)
+
+    def _closes(self, req, protocol, should_close):
+        """Whether aiohttp closes the connection rather than pooling it, as in :meth:`BaseConnector._release`"""
+        if should_close or self._force_close:
+            return True
+        resp = req.response
+        if resp is not None and (resp.message is None or resp.message.should_close):
+            return True
+        # Responses that were not read to the end leave the connection unusable
+        output = protocol.reader.output
+        return bool(output and not output.at_eof())
+
+
+class ConnectionPool:
+    """Hands out a :class:`PooledConnector` per event loop.
+    Celery tasks and backgrounded calls run their own event loops and
+    aiohttp connectors may not be shared between loops.
+    """
+
+    def __init__(self, limit_per_host=None, keepalive_timeout=30, conn_timeout=None):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.conn_timeout = conn_timeout
+        self._lock = threading.Lock()
+        self._connectors = {}
+
+    def connector(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+
+        with self._lock:
+            # Drop connectors of loops that have gone away, their transports are already dead
+            for closed in [other for other in self._connectors if other.is_closed()]:
+                del self._connectors[closed]
+
+            try:
+                return self._connectors[loop]
+            except KeyError:
+                pass
+
+            connector = self._connectors[loop] = PooledConnector(
+                loop=loop,
+                conn_timeout=self.conn_timeout,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            return connector
+
+    @asyncio.coroutine
+    def request(self, method, url, **kwargs):
+        """A drop in replacement for :func:`aiohttp.request` that reuses pooled connections"""
+        kwargs.setdefault('connector', self.connector(loop=kwargs.get('loop')))
+        return (yield from aiohttp.request(method, url, **kwargs))
+
+    def close(self):
+        with self._lock:
+            connectors, self._connectors = self._connectors, {}
+
+        for loop, connector in connectors.items():
+            if not loop.is_closed():
+                connector.close()
+
+
+pool = ConnectionPool(
+    limit_per_host=settings.CONNECTION_POOL_LIMIT_PER_HOST,
+    conn_timeout=settings.CONNECTION_POOL_CONNECT_TIMEOUT,
+    keepalive_timeout=settings.CONNECTION_POOL_KEEPALIVE_TIMEOUT,
+)
+
+
+@asyncio.coroutine
+def request(method, url, **kwargs):
+    """Sends a request using the process wide :class:`ConnectionPool`
+
+    :param str method: The HTTP method
+    :param str url: The url to send the request to
+    :param dict \*\*kwargs: kwargs passed to :func:`aiohttp.request`
+    :rtype: :class:`aiohttp.ClientResponse`
+    """
+    return (yield from pool.request(method, url, **kwargs))
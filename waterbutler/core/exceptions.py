@@ -128,6 +128,14 @@ class InvalidPathError(ProviderError):
         super().__init__(message, code=http.client.BAD_REQUEST)
 
 
+class UpstreamUnavailableError(ProviderError):
+    def __init__(self, provider, host):
+        super().__init__(
+            '{} is temporarily unavailable at {}, please try again later'.format(provider, host),
+            code=http.client.SERVICE_UNAVAILABLE,
+        )
+
+
 @asyncio.coroutine
 def exception_from_response(resp, error=ProviderError, **kwargs):
     """Build and return, not raise, an exception from a response object
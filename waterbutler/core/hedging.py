@@ -0,0 +1,121 @@
+"""Hedged requests for idempotent upstream reads.
+
+A hedged request sends a duplicate of a slow GET or HEAD request once the first
+has been outstanding for longer than the hedge delay and uses whichever answers
+first. The delay is either fixed per provider or the observed latency percentile
+of the provider and operation, see ``HEDGE_PROVIDERS`` in :mod:`waterbutler.core.settings`.
+"""
+import asyncio
+import threading
+import collections
+
+from waterbutler.core import metrics
+from waterbutler.core import settings
+
+
+HEDGEABLE_METHODS = ('GET', 'HEAD')
+
+
+class LatencyTracker:
+    """Keeps the most recent ``sample_size`` latencies for each key"""
+
+    def __init__(self, sample_size=200):
+        self._lock = threading.Lock()
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=sample_size))
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key, percentile, min_samples=1):
+        """The `percentile` latency of `key` or None if fewer than `min_samples` were recorded"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+
+        if not samples or len(samples) < min_samples:
+            return None
+
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+tracker = LatencyTracker(sample_size=settings.LATENCY_SAMPLE_SIZE)
+
+
+def hedge_delay(key):
+    """Returns the number of seconds to wait before hedging a request
+    or None if the provider has not opted into hedging.
+
+    :param tuple key: (provider name, HTTP method, operation)
+    """
+    name, method = key[:2]
+
+    if name not in settings.HEDGE_PROVIDERS or method.upper() not in HEDGEABLE_METHODS:
+        return None
+
+    delay = settings.HEDGE_PROVIDERS[name]
+    if delay is not None:
+        return delay
+
+    observed = tracker.percentile(key, settings.HEDGE_PERCENTILE, min_samples=settings.HEDGE_MIN_SAMPLES)
+    return settings.HEDGE_DEFAULT_DELAY if observed is None else observed
+
+
+@asyncio.coroutine
+def timed(key, send):
+    """Calls `send` and records how long it took to respond"""
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    response = yield from send()
+    tracker.record(key, loop.time() - start)
+    return response
+
+
+@asyncio.coroutine
+def hedged(key, send, delay):
+    """Calls `send` and calls it again if no response has been received after `delay` seconds.
+    The first successful response is returned, the other is cancelled or closed.
+
+    :param tuple key: (provider name, HTTP method, operation)
+    :param callable send: Returns a coroutine that resolves to an :class:`aiohttp.ClientResponse`
+    :param float delay: Seconds to wait before sending the hedge
+    """
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    primary, hedge = asyncio.async(send()), None
+    error, winner, pending = None, None, set()
+
+    try:
+        done, _ = yield from asyncio.wait([primary], timeout=delay)
+        if done:
+            winner = primary
+        else:
+            metrics.incr('hedging', '{}.fired'.format(key[0]))
+            hedge = asyncio.async(send())
+            pending = {primary, hedge}
+
+        while pending and winner is None:
+            done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif winner is None:
+                    winner = future
+    finally:
+        # Also runs when the caller is cancelled, no attempt may be left holding a connection
+        for future in (primary, hedge):
+            if future is None or future is winner:
+                continue
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled() and future.exception() is None:
+                # Both finished in the same tick, only one response may be used
+                future.result().close()
+
+    if winner is None:
+        raise error
+
+    if winner is hedge:
+        metrics.incr('hedging', '{}.won'.format(key[0]))
+
+    tracker.record(key, loop.time() - start)
+    return winner.result()
@@ -0,0 +1,200 @@
+"""Adaptive concurrency limits for upstream requests.
+
+Each provider and set of credentials gets an :class:`AIMDLimiter` which allows
+``window`` requests in flight at once and queues the rest. The window grows
+additively while the upstream is happy and shrinks multiplicatively when it
+answers with a 429, a 503 or a Retry-After header.
+"""
+import asyncio
+import threading
+import collections
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import settings
+
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """The number of seconds in a Retry-After header. HTTP dates count as 0 seconds.
+
+    :param str value: The header's value or None
+    :rtype: float or None
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AIMDLimiter:
+
+    def __init__(self, name, initial_window=10, min_window=1, max_window=64,
+                 decrease_factor=0.5, max_retry_after=30, loop=None):
+        self.name = name
+        self.window = float(initial_window)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.decrease_factor = decrease_factor
+        self.max_retry_after = max_retry_after
+        self.in_flight = 0
+        self.last_used = 0
+
+        self._loop = loop or asyncio.get_event_loop()
+        self._waiters = collections.deque()
+        self._last_decrease = float('-inf')
+        self._paused_until = 0
+        self._wake_handle = None
+
+    @property
+    def idle(self):
+        return self.in_flight == 0 and not self._waiters
+
+    def _has_capacity(self):
+        return (
+            self.in_flight < max(int(self.window), self.min_window) and
+            self._loop.time() >= self._paused_until
+        )
+
+    def _dequeued(self):
+        metrics.incr('limiter', '{}.queue_depth'.format(self.name), -1)
+
+    @asyncio.coroutine
+    def acquire(self):
+        self.last_used = self._loop.time()
+
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.Future(loop=self._loop)
+        self._waiters.append(waiter)
+        metrics.incr('limiter', '{}.queued'.format(self.name))
+        metrics.incr('limiter', '{}.queue_depth'.format(self.name))
+        self._wake()
+
+        start = self._loop.time()
+        try:
+            yield from waiter
+        except asyncio.CancelledError:
+            if not waiter.cancelled():
+                # The slot was handed over just before this task was cancelled
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._dequeued()
+            raise
+        finally:
+            metrics.incr('limiter', '{}.wait_seconds'.format(self.name), self._loop.time() - start)
+
+    def release(self, response=None, started=None):
+        """Frees a slot and adjusts the window based on `response`
+
+        :param response: The upstream response or None if the request failed to complete
+        :param float started: The loop time the request was sent at
+        """
+        self.in_flight -= 1
+        if response is not None:
+            self._adjust(response, started)
+        self._wake()
+
+    def _adjust(self, response, started):
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+        if response.status not in THROTTLE_STATUSES and retry_after is None:
+            if response.status < 500:
+                self.window = min(self.max_window, self.window + 1 / self.window)
+            return
+
+        metrics.incr('limiter', '{}.throttled'.format(self.name))
+        now = self._loop.time()
+
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + min(retry_after, self.max_retry_after))
+
+        # Requests sent before the last decrease were sent with the old window, don't punish twice
+        if started is None or started >= self._last_decrease:
+            self.window = max(self.min_window, self.window * self.decrease_factor)
+            self._last_decrease = now
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            self._dequeued()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+        if self._waiters and self._wake_handle is None and self._loop.time() < self._paused_until:
+            self._wake_handle = self._loop.call_at(self._paused_until, self._resume)
+
+    def _resume(self):
+        self._wake_handle = None
+        self._wake()
+
+    @asyncio.coroutine
+    def send(self, send):
+        """Waits for a free slot then calls `send`
+
+        :param callable send: Returns a coroutine that resolves to an :class:`aiohttp.ClientResponse`
+        """
+        yield from self.acquire()
+        started, response = self._loop.time(), None
+        try:
+            response = yield from send()
+            return response
+        finally:
+            self.release(response, started)
+
+
+_lock = threading.Lock()
+_limiters = {}
+
+
+def _create(name, loop):
+    overrides = settings.LIMITER_PROVIDERS.get(name, {})
+    return AIMDLimiter(
+        name,
+        loop=loop,
+        min_window=overrides.get('LIMITER_MIN_WINDOW', settings.LIMITER_MIN_WINDOW),
+        max_window=overrides.get('LIMITER_MAX_WINDOW', settings.LIMITER_MAX_WINDOW),
+        initial_window=overrides.get('LIMITER_INITIAL_WINDOW', settings.LIMITER_INITIAL_WINDOW),
+        decrease_factor=overrides.get('LIMITER_DECREASE_FACTOR', settings.LIMITER_DECREASE_FACTOR),
+        max_retry_after=overrides.get('LIMITER_MAX_RETRY_AFTER', settings.LIMITER_MAX_RETRY_AFTER),
+    )
+
+
+def limiter_for(name, credentials, loop=None):
+    """Returns the :class:`AIMDLimiter` shared by every provider named `name`
+    using `credentials` on the current event loop
+
+    :param str name: The provider's name
+    :param dict credentials: The provider's credentials
+    """
+    loop = loop or asyncio.get_event_loop()
+    key = (loop, name, utils.fingerprint(credentials))
+
+    with _lock:
+        try:
+            return _limiters[key]
+        except KeyError:
+            pass
+
+        # Forget about loops that have gone away and credentials that have not been used in a while
+        now = loop.time()
+        for stale in [
+            other for other, limiter in _limiters.items()
+            if other[0].is_closed() or (
+                other[0] is loop and limiter.idle and
+                now - limiter.last_used > settings.LIMITER_IDLE_TIMEOUT
+            )
+        ]:
+            del _limiters[stale]
+
+        limiter = _limiters[key] = _create(name, loop)
+        return limiter
@@ -0,0 +1,32 @@
+"""Process wide counters for WaterButler's upstream plumbing.
+Counters are grouped by the component that records them and are
+reported by the /status endpoint.
+
+    >>> incr('connections', 'pool_hits')
+    >>> snapshot()
+    {'connections': {'pool_hits': 1}}
+"""
+import threading
+import collections
+
+
+_lock = threading.Lock()
+_counters = collections.defaultdict(collections.Counter)
+
+
+def incr(group, name, amount=1):
+    with _lock:
+        _counters[group][name] += amount
+
+
+def snapshot():
+    with _lock:
+        return {
+            group: dict(counter)
+            for group, counter in _counters.items()
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
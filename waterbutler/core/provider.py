@@ -1,13 +1,22 @@
 import abc
 import asyncio
+import functools
 import itertools
 from urllib import parse
 
 import furl
-import aiohttp
 
+from waterbutler.core import tree
+from waterbutler.core import cache
+from waterbutler.core import utils
 from waterbutler.core import streams
+from waterbutler.core import breaker
+from waterbutler.core import settings
+from waterbutler.core import hedging
+from waterbutler.core import limiter
+from waterbutler.core import zipcache
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 
 
 def build_url(base, *segments, **query):
@@ -28,6 +37,14 @@ def build_url(base, *segments, **query):
     return url.url
 
 
+def folder_op_concurrency(src_provider, dest_provider):
+    """The number of children a folder copy or move from `src_provider` to `dest_provider`
+    works on at once, see ``FOLDER_OP_CONCURRENCY_PAIRS``
+    """
+    key = '{}:{}'.format(src_provider.NAME, dest_provider.NAME)
+    return settings.FOLDER_OP_CONCURRENCY_PAIRS.get(key, settings.FOLDER_OP_CONCURRENCY)
+
+
 class BaseProvider(metaclass=abc.ABCMeta):
     """The base class for all providers.
     Every provider must, at the least,
@@ -103,7 +120,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
     @asyncio.coroutine
     def make_request(self, *args, **kwargs):
-        """A wrapper around :func:`aiohttp.request`. Inserts default headers.
+        """A wrapper around :func:`waterbutler.core.connections.request`. Inserts default headers.
 
         :param str method: The HTTP method
         :param str url: The url to send the request to
@@ -123,15 +140,43 @@ class BaseProvider(metaclass=abc.ABCMeta):
         throws = kwargs.pop('throws', exceptions.ProviderError)
         if range:
             kwargs['headers']['Range'] = self._build_range_header(range)
-        response = yield from aiohttp.request(*args, **kwargs)
+        response = yield from self._send_request(*args, operation=throws.__name__, **kwargs)
         if expects and response.status not in expects:
             raise (yield from exceptions.exception_from_response(response, error=throws, **kwargs))
         return response
 
     @asyncio.coroutine
-    def move(self, dest_provider, src_path, dest_path, rename=None, conflict='replace', handle_naming=True):
+    def _send_request(self, method, url, operation=None, **kwargs):
+        """Sends a single request upstream. Every attempt fails fast if the upstream's circuit
+        breaker is open, see :mod:`waterbutler.core.breaker`, then waits for a slot from the limiter
+        shared by this provider's credentials, see :mod:`waterbutler.core.limiter`.
+        GET and HEAD requests without a body are hedged if this provider has opted in,
+        see :mod:`waterbutler.core.hedging`.
+
+        :param str method: The HTTP method
+        :param str url: The url to send the request to
+        :param str operation: Identifies the operation being performed for latency tracking
+        :rtype: :class:`aiohttp.Response`
+        """
+        key = (self.NAME, method.upper(), operation)
+        send = functools.partial(connections.request, method, url, **kwargs)
+
+        if settings.LIMITER_ENABLED:
+            send = functools.partial(limiter.limiter_for(self.NAME, self.credentials).send, send)
+
+        if settings.BREAKER_ENABLED:
+            send = functools.partial(breaker.breaker_for(self.NAME, url).send, send)
+
+        delay = None if kwargs.get('data') is not None else hedging.hedge_delay(key)
+        if delay is None:
+            return (yield from hedging.timed(key, send))
+        return (yield from hedging.hedged(key, send, delay))
+
+    @asyncio.coroutine
+    def move(self, dest_provider, src_path, dest_path, rename=None, conflict='replace', handle_naming=True, checkpoint=None):
         """Moves a file or folder from the current provider to the specified one
-        Performs a copy and then a delete.
+        Performs a copy and then a delete, the files of a folder are copied and
+        removed together with it by :func:`BaseProvider.delete_many`.
         Calls :func:`BaseProvider.intra_move` if possible.
 
         :param BaseProvider dest_provider: The provider to move to
@@ -139,107 +184,225 @@ class BaseProvider(metaclass=abc.ABCMeta):
             or :func:`BaseProvider.copy` and :func:`BaseProvider.delete`
         :param dict dest_options: A dict to be sent to either :func:`BaseProvider.intra_move`
             or :func:`BaseProvider.copy`
+        :param Manifest checkpoint: Records the progress of a folder move, see :mod:`waterbutler.core.checkpoint`
         """
         args = (dest_provider, src_path, dest_path)
-        kwargs = {'rename': rename, 'conflict': conflict}
+        kwargs = {'rename': rename, 'conflict': conflict, 'checkpoint': checkpoint}
 
         if handle_naming:
-            dest_path = yield from dest_provider.handle_naming(
-                src_path,
-                dest_path,
-                rename=rename,
-                conflict=conflict,
-            )
+            dest_path = yield from self._checkpointed_naming(dest_provider, src_path, dest_path, rename, conflict, checkpoint)
             args = (dest_provider, src_path, dest_path)
-            kwargs = {}
-
-        if self.can_intra_move(dest_provider, src_path):
-            return (yield from self.intra_move(*args))
-
-        if src_path.is_dir:
-            metadata, created = yield from self._folder_file_op(self.move, *args, **kwargs)
-        else:
-            metadata, created = yield from self.copy(*args, handle_naming=False, **kwargs)
-
-        yield from self.delete(src_path)
+            kwargs = {'checkpoint': checkpoint}
 
-        return metadata, created
+        try:
+            if self.can_intra_move(dest_provider, src_path):
+                return (yield from self.intra_move(*args))
+
+            if src_path.is_dir:
+                metadata, created = yield from self._folder_file_op(self.move, *args, **kwargs)
+                yield from self.delete_many([src_path])
+            else:
+                kwargs.pop('checkpoint')
+                metadata, created = yield from self.copy(*args, handle_naming=False, **kwargs)
+                yield from self.delete(src_path)
+
+            return metadata, created
+        finally:
+            yield from cache.invalidate(self, src_path)
+            yield from cache.invalidate(dest_provider, dest_path)
 
     @asyncio.coroutine
-    def copy(self, dest_provider, src_path, dest_path, rename=None, conflict='replace', handle_naming=True):
+    def copy(self, dest_provider, src_path, dest_path, rename=None, conflict='replace', handle_naming=True, checkpoint=None):
         args = (dest_provider, src_path, dest_path)
-        kwargs = {'rename': rename, 'conflict': conflict, 'handle_naming': handle_naming}
+        kwargs = {'rename': rename, 'conflict': conflict, 'handle_naming': handle_naming, 'checkpoint': checkpoint}
 
         if handle_naming:
-            dest_path = yield from dest_provider.handle_naming(
-                src_path,
-                dest_path,
-                rename=rename,
-                conflict=conflict,
-            )
+            dest_path = yield from self._checkpointed_naming(dest_provider, src_path, dest_path, rename, conflict, checkpoint)
             args = (dest_provider, src_path, dest_path)
-            kwargs = {}
+            kwargs = {'checkpoint': checkpoint}
+
+        try:
+            if self.can_intra_copy(dest_provider, src_path):
+                    return (yield from self.intra_copy(*args))
+
+            if src_path.is_dir:
+                return (yield from self._folder_file_op(self.copy, *args, **kwargs))
+
+            download_stream = yield from self.ranged_download(src_path)
 
-        if self.can_intra_copy(dest_provider, src_path):
-                return (yield from self.intra_copy(*args))
+            if getattr(download_stream, 'name', None):
+                dest_path.rename(download_stream.name)
 
-        if src_path.is_dir:
-            return (yield from self._folder_file_op(self.copy, *args, **kwargs))
+            if not settings.READ_AHEAD_BUDGET:
+                return (yield from dest_provider.upload(download_stream, dest_path))
 
-        download_stream = yield from self.download(src_path)
+            # Keep downloading while the upload waits on its own network
+            download_stream = streams.ReadAheadStream(download_stream)
+            try:
+                return (yield from dest_provider.upload(download_stream, dest_path))
+            finally:
+                download_stream.cancel()
+        finally:
+            yield from cache.invalidate(dest_provider, dest_path)
 
-        if getattr(download_stream, 'name', None):
-            dest_path.rename(download_stream.name)
+    @asyncio.coroutine
+    def _checkpointed_naming(self, dest_provider, src_path, dest_path, rename, conflict, checkpoint):
+        """:meth:`handle_naming` that picks the same destination when resuming from `checkpoint`,
+        rather than a new name for a conflict with its own partial copy
+        """
+        if checkpoint is not None and checkpoint.target is not None:
+            return checkpoint.target
+
+        dest_path = yield from dest_provider.handle_naming(
+            src_path,
+            dest_path,
+            rename=rename,
+            conflict=conflict,
+        )
 
-        return (yield from dest_provider.upload(download_stream, dest_path))
+        if checkpoint is not None and src_path.is_dir:
+            checkpoint.target = dest_path
+        return dest_path
 
     @asyncio.coroutine
-    def _folder_file_op(self, func, dest_provider, src_path, dest_path, **kwargs):
+    def _folder_file_op(self, func, dest_provider, src_path, dest_path, checkpoint=None, **kwargs):
+        """Copies or moves, depending on `func`, the contents of the folder `src_path` into
+        `dest_path`, replacing anything already there.
+
+        Children are listed, revalidated and transferred as a pipeline: the children of a folder
+        are revalidated together with :meth:`revalidate_paths` once it is listed, their transfers
+        start right away and at most :func:`folder_op_concurrency` listings or transfers run at once
+        across the whole tree. Subfolders that can not be copied or moved in a
+        single call are created and walked by the same pipeline rather than recursing into `func`.
+        Files of a move are copied, :meth:`move` removes the source folder as a whole once
+        everything was transferred.
+
+        Every child that is transferred or created is recorded in `checkpoint`, if given. When it
+        already recorded `dest_path` the destination is kept rather than replaced and children
+        still matching their record there are not transferred again.
+        """
         assert src_path.is_dir, 'src_path must be a directory'
         assert asyncio.iscoroutinefunction(func), 'func must be a coroutine'
 
-        try:
-            yield from dest_provider.delete(dest_path)
-            created = True
-        except exceptions.ProviderError as e:
-            if e.code != 404:
-                raise
-            created = False
+        folder = checkpoint and checkpoint.get(dest_path)
+        resumed = folder is not None
+
+        if resumed:
+            created = checkpoint.created
+        else:
+            try:
+                yield from dest_provider.delete(dest_path)
+                created = True
+            except exceptions.ProviderError as e:
+                if e.code != 404:
+                    raise
+                created = False
+
+            folder = yield from dest_provider.create_folder(dest_path)
 
-        folder = yield from dest_provider.create_folder(dest_path)
+            if checkpoint is not None:
+                checkpoint.created = created
+                checkpoint.record(dest_path, folder)
 
         dest_path = yield from dest_provider.revalidate_path(dest_path.parent, dest_path.name, folder=dest_path.is_dir)
 
-        futures = []
-        for item in (yield from self.metadata(src_path)):
-            futures.append(
-                asyncio.async(
-                    func(
-                        dest_provider,
-                        # TODO figure out a way to cut down on all the requests made here
-                        (yield from self.revalidate_path(src_path, item.name, folder=item.is_folder)),
-                        (yield from dest_provider.revalidate_path(dest_path, item.name, folder=item.is_folder)),
-                        handle_naming=False,
-                    )
+        if func == self.move:
+            can_intra = self.can_intra_move
+        else:
+            can_intra = self.can_intra_copy
+
+        window = asyncio.Semaphore(folder_op_concurrency(self, dest_provider))
+        tasks = set()
+
+        @asyncio.coroutine
+        def walk(src, dest, folder, resumed):
+            with (yield from window):
+                items = [(item.name, item.is_folder) for item in (yield from self.metadata(src))]
+                srcs, dests = yield from asyncio.gather(
+                    self.revalidate_paths(src, items),
+                    dest_provider.revalidate_paths(dest, items),
                 )
-            )
-
-        if not futures:
-            folder.children = []
-            return folder, created
+                # What an earlier attempt left in dest
+                present = {}
+                if resumed:
+                    present = {(item.name, item.is_folder): item for item in (yield from dest_provider.metadata(dest))}
+
+            folder.children = [None] * len(items)
+            for index, item in enumerate(items):
+                tasks.add(asyncio.async(transfer(srcs[index], dests[index], item, present.get(item), folder.children, index)))
+
+        @asyncio.coroutine
+        def transfer(src, dest, item, present, children, index):
+            name, is_folder = item
+            whole = not is_folder or can_intra(dest_provider, src)
+            done = checkpoint is not None and checkpoint.matches(dest, present)
+
+            if whole and done:
+                children[index] = present
+                checkpoint.skip(present)
+                return
+
+            with (yield from window):
+                if whole:
+                    op = self.copy if func == self.move and not is_folder else func
+                    children[index], _ = yield from op(dest_provider, src, dest, handle_naming=False)
+                    if checkpoint is not None:
+                        checkpoint.record(dest, children[index])
+                        yield from checkpoint.checkpoint()
+                    return
+
+                if done:
+                    children[index] = checkpoint.get(dest)
+                elif present is not None:
+                    # Created by an earlier attempt after its last checkpoint was saved
+                    children[index] = present
+                    checkpoint.record(dest, present)
+                else:
+                    # dest_parent was created by this operation, nothing needs to be replaced
+                    children[index] = yield from dest_provider.create_folder(dest)
+                    if checkpoint is not None:
+                        checkpoint.record(dest, children[index])
+                dest = yield from dest_provider.revalidate_path(dest.parent, name, folder=True)
 
-        finished, pending = yield from asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
+            yield from walk(src, dest, children[index], done or present is not None)
 
-        if len(pending) != 0:
-            finished.pop().result()
+        tasks.add(asyncio.async(walk(src_path, dest_path, folder, resumed)))
 
-        folder.children = [
-            future.result()[0]  # result is a tuple of (metadata, created)
-            for future in finished
-        ]
+        try:
+            while tasks:
+                done, _ = yield from asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                tasks -= done
+                for task in done:
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if checkpoint is not None:
+                yield from checkpoint.save()
 
         return folder, created
 
+    @cache.invalidates
+    @asyncio.coroutine
+    def delete_many(self, paths, **kwargs):
+        """Deletes every file or folder, with everything in it, in `paths`.
+        Providers with a batch endpoint delete many objects per request, by default
+        at most ``DELETE_MANY_CONCURRENCY`` calls to :meth:`delete` run at once.
+
+        :param list paths: The :class:`WaterButlerPath` s to delete
+        :param dict \*\*kwargs: Passed on to :meth:`delete`
+        :rtype: :class:`None`
+        :raises: :class:`waterbutler.core.exceptions.DeleteError`
+        """
+        window = asyncio.Semaphore(settings.DELETE_MANY_CONCURRENCY)
+
+        @asyncio.coroutine
+        def delete(path):
+            with (yield from window):
+                yield from self.delete(path, **kwargs)
+
+        yield from asyncio.gather(*[delete(path) for path in paths])
+
     @asyncio.coroutine
     def handle_naming(self, src_path, dest_path, rename=None, conflict='replace'):
         """Given a WaterButlerPath and the desired name handle any potential
@@ -264,11 +427,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
         if not dest_path.is_file:
             # Directories always are going to be copied into
             # cp /folder1/ /folder2/ -> /folder1/folder2/
-            dest_path = yield from self.revalidate_path(
-                dest_path,
-                rename or src_path.name,
-                folder=src_path.is_dir
-            )
+            dest_path, = yield from self.revalidate_paths(dest_path, [(rename or src_path.name, src_path.is_dir)])
 
         dest_path, _ = yield from self.handle_name_conflict(dest_path, conflict=conflict)
 
@@ -309,6 +468,13 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
     @asyncio.coroutine
     def exists(self, path, **kwargs):
+        """Checks if anything is at `path`. Called on every upload, copy and name conflict.
+        Falls back to a full :meth:`metadata` call, providers should override it with their
+        cheapest request, such as a HEAD or a listing of a single key.
+
+        :param WaterButlerPath path: The path to check
+        :rtype: bool or metadata, truthy if `path` exists
+        """
         try:
             return (yield from self.metadata(path, **kwargs))
         except exceptions.NotFoundError:
@@ -331,19 +497,55 @@ class BaseProvider(metaclass=abc.ABCMeta):
         if not exists or conflict != 'keep':
             return path, exists
 
-        while (yield from self.exists(path.increment_name(), **kwargs)):
-            pass
-        # path.increment_name()
-        # exists = self.exists(str(path))
+        names = yield from self.sibling_names(path, **kwargs)
+
+        if names is None:
+            while (yield from self.exists(path.increment_name(), **kwargs)):
+                pass
+        else:
+            while path.increment_name().name in names:
+                pass
+
         return path, False
 
+    @asyncio.coroutine
+    def sibling_names(self, path, **kwargs):
+        """Lists the names taken in the parent folder of `path`, used by
+        :meth:`handle_name_conflict` to pick a free name without probing every candidate.
+        Only names that ``path.increment_name()`` could produce need to be included.
+        Returns None, the default, when the parent can not be listed completely and cheaply
+        in which case each candidate is checked with :meth:`exists`.
+
+        :param WaterButlerPath path: The path whose name is taken
+        :rtype: set or None
+        """
+        return None
+
     @asyncio.coroutine
     def revalidate_path(self, base, path, folder=False):
         return base.child(path, folder=folder)
 
+    @asyncio.coroutine
+    def revalidate_paths(self, base, children):
+        """Revalidates many children of the folder `base` at once.
+        Providers whose :meth:`revalidate_path` lists `base` should override this to list it
+        only once, by default every child is revalidated on its own.
+
+        :param WaterButlerPath base: The folder the children are in
+        :param list children: ``(name, folder)`` pairs, as passed to :meth:`revalidate_path`
+        :rtype: list of WaterButlerPath, in the order of `children`
+        """
+        return (yield from asyncio.gather(*[
+            self.revalidate_path(base, name, folder=folder)
+            for name, folder in children
+        ]))
+
     @asyncio.coroutine
     def zip(self, path, **kwargs):
-        """Streams a Zip archive of the given folder
+        """Streams a Zip archive of the given folder, starting with the first entries
+        :meth:`walk` lists while it goes on listing the rest. With the zip cache enabled
+        the whole folder is listed first, unchanged folders are streamed from disk, see
+        :mod:`waterbutler.core.zipcache`.
 
         :param str path: The folder to compress
         """
@@ -352,25 +554,179 @@ class BaseProvider(metaclass=abc.ABCMeta):
         else:
             base_path = path.path
 
-        names, coros, remaining = [], [], [path]
+        walk, fingerprint = self.walk(path), None
+        if zipcache.zip_cache is not None:
+            listed = yield from walk.collect()
+            fingerprint = zipcache.fingerprint(listed)
+            if fingerprint is not None:
+                cached = yield from zipcache.zip_cache.get(self, path, fingerprint)
+                if cached is not None:
+                    return cached
+            walk = tree.Walk(lambda put: put(listed))
+
+        @asyncio.coroutine
+        def source():
+            # Entries are added as the walk lists them, the archive starts with the first batch
+            entries = yield from walk.next()
+            if entries is None:
+                return None
+            return [
+                (
+                    current_path.path.replace(base_path, '', 1),
+                    self.__zip_defered_download(current_path),
+                    self.__zip_content_type(metadata),
+                )
+                for current_path, metadata in entries
+                if current_path.is_file
+            ]
 
-        while remaining:
-            path = remaining.pop()
-            metadata = yield from self.metadata(path)
+        stream = streams.ZipStreamReader(source=source, cancel_source=walk.cancel)
+        if fingerprint is not None:
+            return (yield from zipcache.zip_cache.put(self, path, fingerprint, stream))
+        return stream
 
-            for item in metadata:
-                current_path = yield from self.revalidate_path(
-                    path,
-                    item.name,
-                    folder=item.is_folder
-                )
-                if current_path.is_file:
-                    names.append(current_path.path.replace(base_path, '', 1))
-                    coros.append(self.__zip_defered_download(current_path))
-                else:
-                    remaining.append(current_path)
+    @asyncio.coroutine
+    def stored_zip(self, path, **kwargs):
+        """Lays out a Zip archive of the given folder with every entry stored as is, see
+        :class:`waterbutler.core.streams.StoredZipArchive`. Its size is known before any file
+        is downloaded and ranges of it are read by downloading ranges of the files they overlap.
+
+        :param str path: The folder to compress
+        :rtype: :class:`waterbutler.core.streams.StoredZipArchive`, None when the size of a file is not listed
+        """
+        if path.is_file:
+            base_path = path.parent.path
+        else:
+            base_path = path.path
+
+        entries = []
+        for current_path, metadata in (yield from self.walk(path).collect()):
+            if not current_path.is_file:
+                continue
+
+            size = self.__zip_attribute(metadata, 'size')
+            if size is None:
+                return None
+
+            entries.append((
+                current_path.path.replace(base_path, '', 1),
+                int(size),
+                functools.partial(self.ranged_download, current_path),
+                self.__zip_crc_key(current_path, metadata, size),
+                self.__zip_attribute(metadata, 'modified'),
+            ))
+
+        return streams.StoredZipArchive(entries)
+
+    def walk(self, path, **kwargs):
+        """Walks everything below the folder `path`, or just the file `path`, see :mod:`waterbutler.core.tree`.
+        Providers able to list a whole subtree in a few requests should override this,
+        by default folders are listed one :meth:`metadata` call at a time, up to
+        ``WALK_CONCURRENCY`` of them at once.
+
+        :param WaterButlerPath path: The folder to walk
+        :param dict \*\*kwargs: Passed on to :meth:`metadata`
+        :rtype: :class:`waterbutler.core.tree.Walk`
+        """
+        return tree.Walk(functools.partial(self._walk_folders, path, **kwargs))
 
-        return streams.ZipStreamReader(*zip(names, coros))
+    @asyncio.coroutine
+    def _walk_folders(self, path, put, **kwargs):
+        if path.is_file:
+            return (yield from put([(path, (yield from self.metadata(path, **kwargs)))]))
+
+        window = asyncio.Semaphore(settings.WALK_CONCURRENCY)
+        tasks = set()
+
+        @asyncio.coroutine
+        def visit(folder):
+            with (yield from window):
+                items = yield from self.metadata(folder, **kwargs)
+                children = yield from self.revalidate_paths(folder, [(item.name, item.is_folder) for item in items])
+
+            yield from put(zip(children, items))
+
+            for child in children:
+                if child.is_dir:
+                    tasks.add(asyncio.async(visit(child)))
+
+        tasks.add(asyncio.async(visit(path)))
+
+        try:
+            while tasks:
+                done, _ = yield from asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                tasks -= done
+                for task in done:
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @asyncio.coroutine
+    def ranged_download(self, path, **kwargs):
+        """:meth:`download` that fetches `path` as several byte ranges at once, see
+        :class:`waterbutler.core.streams.RangedStream`, when this provider is listed in
+        ``RANGED_FETCH_PROVIDERS``. Requests for a range or a url and upstreams that ignore
+        the range are downloaded as usual.
+
+        :param WaterButlerPath path: The file to download
+        :param dict \*\*kwargs: Arguments passed on to :meth:`download`
+        """
+        if self.NAME not in settings.RANGED_FETCH_PROVIDERS or kwargs.get('range') or kwargs.get('accept_url'):
+            return (yield from self.download(path, **kwargs))
+
+        kwargs.pop('range', None)
+        try:
+            first = yield from self.download(path, range=(0, settings.RANGED_FETCH_PART_SIZE - 1), **kwargs)
+        except exceptions.ProviderError as e:
+            # Empty files can not satisfy any range
+            if e.code != 416:
+                raise
+            return (yield from self.download(path, **kwargs))
+
+        if not getattr(first, 'partial', False):
+            return first
+
+        try:
+            size = int(first.content_range.rpartition('/')[2])
+        except ValueError:
+            # Upstreams not knowing the size up front answer 'bytes 0-3/*', no parts can be planned
+            if hasattr(first, 'response'):
+                first.response.close()
+            return (yield from self.download(path, **kwargs))
+
+        # Wrapped even when the first part is the whole file, which is not a partial response
+        return streams.RangedStream(
+            functools.partial(self.download, path, **kwargs),
+            size,
+            first=first,
+            name=getattr(first, 'name', None),
+            content_type=first.content_type,
+        )
+
+    def __zip_content_type(self, metadata):
+        """The content type listed for a zip entry, which decides whether it is compressed"""
+        return self.__zip_attribute(metadata, 'content_type')
+
+    def __zip_attribute(self, metadata, name):
+        try:
+            return getattr(metadata, name)
+        except (AttributeError, KeyError):
+            return None
+
+    def __zip_crc_key(self, path, metadata, size):
+        """Identifies the content of a stored zip entry by its etag, None for files without one"""
+        etag = self.__zip_attribute(metadata, 'etag')
+        if etag is None:
+            return None
+        return 'waterbutler:zip:{}:{}:{}:{}:{}:{}'.format(
+            self.NAME,
+            utils.fingerprint(self.credentials),
+            utils.fingerprint(self.settings),
+            path.path,
+            etag,
+            size,
+        )
 
     def __zip_defered_download(self, path):
         """Returns a scoped lambda to defer the execution
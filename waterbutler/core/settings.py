@@ -0,0 +1,154 @@
+try:
+    from waterbutler import settings
+except ImportError:
+    settings = {}
+
+config = settings.get('CORE_CONFIG', {})
+
+
+# Keep-alive connections shared by every upstream request made from a single process
+CONNECTION_POOL_LIMIT_PER_HOST = config.get('CONNECTION_POOL_LIMIT_PER_HOST', 20)
+CONNECTION_POOL_KEEPALIVE_TIMEOUT = config.get('CONNECTION_POOL_KEEPALIVE_TIMEOUT', 30)  # seconds
+CONNECTION_POOL_CONNECT_TIMEOUT = config.get('CONNECTION_POOL_CONNECT_TIMEOUT', None)  # seconds
+
+# Providers allowed to send a duplicate GET or HEAD request when the first one is slow.
+# Maps a provider name to a fixed hedge delay in seconds, or to None to hedge after the
+# observed HEDGE_PERCENTILE latency of the provider and operation.
+#   {'s3': None, 'googledrive': 0.75}
+HEDGE_PROVIDERS = config.get('HEDGE_PROVIDERS', {})
+HEDGE_PERCENTILE = config.get('HEDGE_PERCENTILE', 95)
+HEDGE_DEFAULT_DELAY = config.get('HEDGE_DEFAULT_DELAY', 1)  # seconds, used until enough samples exist
+HEDGE_MIN_SAMPLES = config.get('HEDGE_MIN_SAMPLES', 20)
+LATENCY_SAMPLE_SIZE = config.get('LATENCY_SAMPLE_SIZE', 200)
+
+# Adaptive (AIMD) limit on concurrent requests per provider and set of credentials.
+# The window grows by one request per window of successes and is multiplied by
+# LIMITER_DECREASE_FACTOR on a 429, a 503 or a Retry-After header.
+LIMITER_ENABLED = config.get('LIMITER_ENABLED', True)
+LIMITER_INITIAL_WINDOW = config.get('LIMITER_INITIAL_WINDOW', 10)
+LIMITER_MIN_WINDOW = config.get('LIMITER_MIN_WINDOW', 1)
+LIMITER_MAX_WINDOW = config.get('LIMITER_MAX_WINDOW', 64)
+LIMITER_DECREASE_FACTOR = config.get('LIMITER_DECREASE_FACTOR', 0.5)
+LIMITER_MAX_RETRY_AFTER = config.get('LIMITER_MAX_RETRY_AFTER', 30)  # seconds
+LIMITER_IDLE_TIMEOUT = config.get('LIMITER_IDLE_TIMEOUT', 300)  # seconds before an unused limiter is forgotten
+# Per provider overrides of the windows above
+#   {'github': {'LIMITER_MAX_WINDOW': 8}}
+LIMITER_PROVIDERS = config.get('LIMITER_PROVIDERS', {})
+
+# Circuit breakers per provider and upstream host. A breaker opens once at least
+# BREAKER_ERROR_RATE of the last BREAKER_WINDOW requests failed, fails requests fast for
+# BREAKER_RESET_TIMEOUT seconds, then lets BREAKER_HALF_OPEN_PROBES requests through to decide
+# whether to close again. Breakers of at most BREAKER_MAX_UPSTREAMS upstreams are kept, the least
+# recently used are dropped first.
+BREAKER_ENABLED = config.get('BREAKER_ENABLED', True)
+BREAKER_WINDOW = config.get('BREAKER_WINDOW', 20)
+BREAKER_MIN_REQUESTS = config.get('BREAKER_MIN_REQUESTS', 10)
+BREAKER_ERROR_RATE = config.get('BREAKER_ERROR_RATE', 0.5)
+BREAKER_RESET_TIMEOUT = config.get('BREAKER_RESET_TIMEOUT', 30)  # seconds
+BREAKER_HALF_OPEN_PROBES = config.get('BREAKER_HALF_OPEN_PROBES', 1)
+BREAKER_MAX_UPSTREAMS = config.get('BREAKER_MAX_UPSTREAMS', 1000)
+
+# Coalesce identical concurrent metadata and validate_path calls into one upstream request
+SINGLEFLIGHT_ENABLED = config.get('SINGLEFLIGHT_ENABLED', True)
+
+# Provider instances are reused across requests and tasks made with the same name, auth,
+# credentials and settings so tokens, endpoints and repository details are only fetched once.
+# A PROVIDER_POOL_SIZE of 0 disables reuse.
+PROVIDER_POOL_SIZE = config.get('PROVIDER_POOL_SIZE', 256)
+PROVIDER_POOL_TTL = config.get('PROVIDER_POOL_TTL', 300)  # seconds
+# Per provider overrides of PROVIDER_POOL_TTL. Dataverse instances cache dataset listings.
+PROVIDER_POOL_TTLS = config.get('PROVIDER_POOL_TTLS', {'dataverse': 30})
+
+# Cross request cache of provider metadata, see waterbutler.core.cache.
+# None disables it, 'memory' keeps METADATA_CACHE_SIZE paths per process and
+# 'redis' shares entries through the redis server at METADATA_CACHE_URL. Writes only
+# invalidate the entries of processes sharing the backend, deployments with several
+# server or celery workers should use 'redis'.
+METADATA_CACHE_BACKEND = config.get('METADATA_CACHE_BACKEND', None)
+METADATA_CACHE_URL = config.get('METADATA_CACHE_URL', 'redis://localhost:6379/0')
+METADATA_CACHE_SIZE = config.get('METADATA_CACHE_SIZE', 10000)
+METADATA_CACHE_TTL = config.get('METADATA_CACHE_TTL', 60)  # seconds
+# Per provider overrides of METADATA_CACHE_TTL
+#   {'osfstorage': 10, 'github': 300}
+METADATA_CACHE_TTLS = config.get('METADATA_CACHE_TTLS', {})
+
+# Number of children of a folder copy or move that are revalidated and transferred at once,
+# shared by every subfolder of the operation.
+FOLDER_OP_CONCURRENCY = config.get('FOLDER_OP_CONCURRENCY', 8)
+# Overrides of FOLDER_OP_CONCURRENCY per source and destination provider
+#   {'github:s3': 2, 'osfstorage:osfstorage': 16}
+FOLDER_OP_CONCURRENCY_PAIRS = config.get('FOLDER_OP_CONCURRENCY_PAIRS', {})
+
+# Folder copies and moves run as tasks save the children they transferred to the task backend
+# at most every CHECKPOINT_INTERVAL seconds, a retried or resubmitted task skips them. Checkpoints
+# older than CHECKPOINT_TTL are neither resumed nor kept.
+CHECKPOINT_INTERVAL = config.get('CHECKPOINT_INTERVAL', 5)  # seconds
+CHECKPOINT_TTL = config.get('CHECKPOINT_TTL', 24 * 60 * 60)  # seconds
+
+# Deletes of many paths at once, such as the source of a folder move, on providers without a
+# batch endpoint issue at most DELETE_MANY_CONCURRENCY single deletes at once.
+DELETE_MANY_CONCURRENCY = config.get('DELETE_MANY_CONCURRENCY', 8)
+
+# Walks of folder trees, see waterbutler.core.tree, list up to WALK_CONCURRENCY folders at once on
+# providers without a recursive listing and run at most WALK_BUFFER batches ahead of their consumer.
+WALK_CONCURRENCY = config.get('WALK_CONCURRENCY', 8)
+WALK_BUFFER = config.get('WALK_BUFFER', 16)
+
+# Entries of folder zips are deflated at ZIP_COMPRESSION_LEVEL, -1 for zlib's default and 0 to
+# store everything. Entries whose extension is in ZIP_STORED_EXTENSIONS or whose content type
+# starts with one of ZIP_STORED_TYPES are already compressed and stored as is.
+ZIP_COMPRESSION_LEVEL = config.get('ZIP_COMPRESSION_LEVEL', -1)
+ZIP_STORED_EXTENSIONS = config.get('ZIP_STORED_EXTENSIONS', [
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.m4a', '.aac', '.ogg', '.flac',
+    '.mp4', '.m4v', '.mov', '.avi', '.mkv', '.webm',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub', '.jar',
+])
+ZIP_STORED_TYPES = config.get('ZIP_STORED_TYPES', [
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'audio/', 'video/',
+    'application/zip', 'application/gzip', 'application/x-gzip', 'application/x-bzip2',
+    'application/x-xz', 'application/x-7z-compressed', 'application/x-rar-compressed',
+])
+
+# Deflated zip entries are compressed on a pool of ZIP_COMPRESSION_WORKERS threads shared by the
+# process rather than on the event loop, 0 compresses on the loop. Entries are split into blocks of
+# ZIP_COMPRESSION_BLOCK_SIZE bytes deflated in parallel, with up to two blocks per worker in flight,
+# and the small entries being prefetched are deflated alongside the current one.
+ZIP_COMPRESSION_WORKERS = config.get('ZIP_COMPRESSION_WORKERS', 4)
+ZIP_COMPRESSION_BLOCK_SIZE = config.get('ZIP_COMPRESSION_BLOCK_SIZE', 128 * 1024)  # bytes
+
+# Folder zips open the downloads of the next ZIP_PREFETCH_ENTRIES entries while the current one is
+# compressed, 0 disables it. Entries of up to ZIP_PREFETCH_BUFFER_SIZE bytes are read whole ahead
+# of their turn as long as no more than ZIP_PREFETCH_BUDGET bytes are held per archive.
+ZIP_PREFETCH_ENTRIES = config.get('ZIP_PREFETCH_ENTRIES', 4)
+ZIP_PREFETCH_BUFFER_SIZE = config.get('ZIP_PREFETCH_BUFFER_SIZE', 1024 * 1024)  # bytes
+ZIP_PREFETCH_BUDGET = config.get('ZIP_PREFETCH_BUDGET', 16 * 1024 * 1024)  # bytes
+
+# Folder zips requested with ?zip=stored store every entry and are laid out in advance from the
+# listed sizes, so they have a Content-Length and serve Range requests. The CRC-32s of up to
+# ZIP_CRC_CACHE_SIZE entries are kept per process so ranges need not download the entries they skip,
+# and shared with every process through the redis at ZIP_CRC_CACHE_URL if set. Ranges that would
+# need the CRC of an entry they skip that is still unknown, or of one without an etag, are ignored
+# and the whole archive is sent.
+ZIP_CRC_CACHE_SIZE = config.get('ZIP_CRC_CACHE_SIZE', 100000)
+ZIP_CRC_CACHE_URL = config.get('ZIP_CRC_CACHE_URL', None)
+
+# Folder zips are cached on disk below ZIP_CACHE_PATH, see waterbutler.core.zipcache, None disables
+# it. Once the cached archives take more than ZIP_CACHE_SIZE bytes the least recently served go.
+ZIP_CACHE_PATH = config.get('ZIP_CACHE_PATH', None)
+ZIP_CACHE_SIZE = config.get('ZIP_CACHE_SIZE', 10 * 1024 ** 3)  # bytes
+
+# Cross provider copies download up to READ_AHEAD_BUDGET bytes ahead of the upload, in chunks
+# of READ_AHEAD_CHUNK_SIZE bytes, so both connections stay busy. 0 disables reading ahead.
+READ_AHEAD_BUDGET = config.get('READ_AHEAD_BUDGET', 8 * 1024 * 1024)  # bytes
+READ_AHEAD_CHUNK_SIZE = config.get('READ_AHEAD_CHUNK_SIZE', 64 * 1024)  # bytes
+
+# Providers whose file downloads, for cross provider copies and clients not redirected upstream,
+# are fetched as RANGED_FETCH_PART_SIZE byte ranges over up to RANGED_FETCH_CONCURRENCY
+# connections at once. No more than RANGED_FETCH_BUDGET bytes are held per download.
+#   ['s3', 'cloudfiles', 'googledrive']
+RANGED_FETCH_PROVIDERS = config.get('RANGED_FETCH_PROVIDERS', [])
+RANGED_FETCH_PART_SIZE = config.get('RANGED_FETCH_PART_SIZE', 8 * 1024 * 1024)  # bytes
+RANGED_FETCH_CONCURRENCY = config.get('RANGED_FETCH_CONCURRENCY', 4)
+RANGED_FETCH_BUDGET = config.get('RANGED_FETCH_BUDGET', 32 * 1024 * 1024)  # bytes
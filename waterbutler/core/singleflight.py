@@ -0,0 +1,83 @@
+"""Coalesces identical concurrent provider calls.
+
+The first call of a :func:`coalesce` decorated method starts the upstream work,
+identical calls made while it is in flight wait on it rather than starting
+their own. Calls are identical when they are made on the same event loop to a
+provider with the same name, credentials and settings with the same arguments.
+"""
+import copy
+import asyncio
+import functools
+import threading
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import settings
+from waterbutler.core.path import WaterButlerPath
+
+
+_lock = threading.Lock()
+_inflight = {}
+
+
+class _Flight:
+
+    def __init__(self, task):
+        self.task = task
+        self.followers = 0
+
+
+def _path_key(path):
+    if not isinstance(path, WaterButlerPath):
+        return repr(path)
+    # Two paths with the same str but different ids may resolve to different objects
+    return repr((type(path).__name__, path.full_path, [part.identifier for part in path.parts], path.is_dir))
+
+
+def make_key(provider, method, args, kwargs):
+    return (
+        provider.NAME,
+        utils.fingerprint(provider.credentials),
+        utils.fingerprint(provider.settings),
+        method,
+        tuple(_path_key(arg) for arg in args),
+        tuple((key, _path_key(value)) for key, value in sorted(kwargs.items())),
+    )
+
+
+def coalesce(func):
+    """Decorates a provider coroutine method so that identical concurrent calls send one upstream request.
+    Every caller receives its own copy of the result.
+    """
+    @functools.wraps(func)
+    @asyncio.coroutine
+    def wrapped(self, *args, **kwargs):
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return (yield from func(self, *args, **kwargs))
+
+        loop = asyncio.get_event_loop()
+        key = (loop, ) + make_key(self, func.__qualname__, args, kwargs)
+
+        with _lock:
+            flight = _inflight.get(key)
+            if flight is None:
+                # The upstream call runs in its own task so a cancelled caller does not cancel it for everyone
+                flight = _inflight[key] = _Flight(asyncio.async(func(self, *args, **kwargs), loop=loop))
+                flight.task.add_done_callback(functools.partial(_land, key))
+            else:
+                flight.followers += 1
+                metrics.incr('singleflight', '{}.{}.coalesced'.format(self.NAME, func.__name__))
+
+        result = yield from asyncio.shield(flight.task)
+
+        if flight.followers:
+            # Paths and metadata are mutable, don't let one caller change another's result
+            return copy.deepcopy(result)
+        return result
+
+    return wrapped
+
+
+def _land(key, task):
+    with _lock:
+        _inflight.pop(key, None)
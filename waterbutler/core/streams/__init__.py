@@ -5,6 +5,9 @@ from waterbutler.core.streams.base import StringStream  # noqa
 
 from waterbutler.core.streams.file import FileStreamReader  # noqa
 
+from waterbutler.core.streams.ranged import RangedStream  # noqa
+from waterbutler.core.streams.readahead import ReadAheadStream  # noqa
+
 from waterbutler.core.streams.http import FormDataStream  # noqa
 from waterbutler.core.streams.http import RequestStreamReader  # noqa
 from waterbutler.core.streams.http import ResponseStreamReader  # noqa
@@ -12,6 +15,7 @@ from waterbutler.core.streams.http import ResponseStreamReader  # noqa
 from waterbutler.core.streams.metadata import HashStreamWriter  # noqa
 
 from waterbutler.core.streams.zip import ZipStreamReader  # noqa
+from waterbutler.core.streams.zip import StoredZipArchive  # noqa
 
 from waterbutler.core.streams.base64 import Base64EncodeStream  # noqa
 
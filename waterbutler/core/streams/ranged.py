@@ -0,0 +1,108 @@
+import asyncio
+import collections
+
+from waterbutler.core import settings
+from waterbutler.core import exceptions
+from waterbutler.core.streams.base import BaseStream
+
+
+class RangedStream(BaseStream):
+    """Fetches a file of `size` bytes as byte ranges of `part_size`, several at once over their own
+    connections, and hands them out in order. At most `window` parts are fetched or held at once,
+    bounding memory to ``window * part_size`` bytes, the window defaults to as many parts as fit in
+    ``RANGED_FETCH_BUDGET`` but no more than ``RANGED_FETCH_CONCURRENCY``.
+
+    :param fetch: A coroutine function called with ``range=(start, end)``, inclusive like
+        :meth:`BaseProvider.download`, returning a stream of exactly that range
+    :param int size: The size of the whole file
+    :param first: An already opened stream of the first part, if any
+    :param int part_size: Bytes per range, defaults to ``RANGED_FETCH_PART_SIZE``
+    :param int window: Parts fetched at once
+    """
+
+    def __init__(self, fetch, size, first=None, part_size=None, window=None, name=None, content_type=None):
+        super().__init__()
+        self.fetch = fetch
+        self._size = size
+        self._name = name
+        self._content_type = content_type
+        self.part_size = part_size or settings.RANGED_FETCH_PART_SIZE
+        self.window = window or max(1, min(
+            settings.RANGED_FETCH_CONCURRENCY,
+            settings.RANGED_FETCH_BUDGET // self.part_size,
+        ))
+
+        self._offset = 0
+        self._parts = collections.deque()
+        self._current, self._position = b'', 0
+
+        if first is not None:
+            self._parts.append(asyncio.async(self._drain(first, min(self.part_size, size))))
+            self._offset = min(self.part_size, size)
+
+        self._schedule()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def content_type(self):
+        return self._content_type
+
+    def cancel(self):
+        """Stops fetching parts, for consumers that give up before the end of the stream"""
+        for part in self._parts:
+            part.cancel()
+
+    def _schedule(self):
+        while len(self._parts) < self.window and self._offset < self._size:
+            end = min(self._offset + self.part_size, self._size) - 1
+            self._parts.append(asyncio.async(self._fetch(self._offset, end)))
+            self._offset = end + 1
+
+    @asyncio.coroutine
+    def _fetch(self, start, end):
+        stream = yield from self.fetch(range=(start, end))
+        return (yield from self._drain(stream, end - start + 1))
+
+    @asyncio.coroutine
+    def _drain(self, stream, expected):
+        data = yield from stream.read()
+        if len(data) != expected:
+            # The upstream ignored or truncated the range, handing it out would corrupt the file
+            raise exceptions.DownloadError('Expected a range of {} bytes, received {}'.format(expected, len(data)))
+        return data
+
+    @asyncio.coroutine
+    def _read(self, size):
+        if size < 0:
+            chunks = []
+            chunk = yield from self._read(self.part_size)
+            while chunk:
+                chunks.append(chunk)
+                chunk = yield from self._read(self.part_size)
+            return b''.join(chunks)
+
+        if self._position >= len(self._current):
+            if not self._parts:
+                self.feed_eof()
+                return b''
+
+            try:
+                self._current = yield from self._parts[0]
+            except Exception:
+                self.cancel()
+                raise
+
+            self._position = 0
+            self._parts.popleft()
+            self._schedule()
+
+        chunk = self._current[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
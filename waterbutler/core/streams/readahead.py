@@ -0,0 +1,90 @@
+import asyncio
+
+from waterbutler.core import settings
+from waterbutler.core.streams.base import BaseStream
+
+
+class ReadAheadStream(BaseStream):
+    """Reads `stream` ahead of whoever consumes this stream so neither side of a copy waits on
+    the other's network. Chunks of at most `chunk_size` bytes are read into a queue holding no
+    more than `budget` bytes, at least two chunks, and handed out in order. Reading starts as soon
+    as the stream is created, errors of `stream` are raised to the consumer once the chunks read
+    before them were consumed.
+
+    :param stream: The stream to read ahead of
+    :param int budget: Bytes that may be buffered, defaults to ``READ_AHEAD_BUDGET``
+    :param int chunk_size: Bytes read from `stream` at once, defaults to ``READ_AHEAD_CHUNK_SIZE``
+    """
+
+    def __init__(self, stream, budget=None, chunk_size=None):
+        super().__init__()
+        self.stream = stream
+        self.chunk_size = chunk_size or settings.READ_AHEAD_CHUNK_SIZE
+        self.budget = budget or settings.READ_AHEAD_BUDGET
+
+        self._pending = b''
+        self._queue = asyncio.Queue(maxsize=max(2, self.budget // self.chunk_size))
+        self._task = asyncio.async(self._fill())
+
+    @property
+    def size(self):
+        return self.stream.size
+
+    @property
+    def name(self):
+        return getattr(self.stream, 'name', None)
+
+    @property
+    def content_type(self):
+        return getattr(self.stream, 'content_type', 'application/octet-stream')
+
+    def cancel(self):
+        """Stops reading ahead and `stream` itself, for consumers that give up before the end of the stream"""
+        self._task.cancel()
+        # Ranged streams keep fetching parts on their own
+        if hasattr(self.stream, 'cancel'):
+            self.stream.cancel()
+
+    @asyncio.coroutine
+    def _fill(self):
+        try:
+            while True:
+                chunk = yield from self.stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield from self._queue.put(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            yield from self._queue.put(e)
+        else:
+            yield from self._queue.put(None)
+
+    @asyncio.coroutine
+    def _next(self):
+        item = yield from self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if item is None:
+            self.feed_eof()
+            return False
+        self._pending = item
+        return True
+
+    @asyncio.coroutine
+    def _read(self, size):
+        if self._eof:
+            return b''
+
+        if size < 0:
+            chunks = [self._pending]
+            while (yield from self._next()):
+                chunks.append(self._pending)
+            self._pending = b''
+            return b''.join(chunks)
+
+        if not self._pending and not (yield from self._next()):
+            return b''
+
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
@@ -1,15 +1,174 @@
+import os
+import array
 import asyncio
+import hashlib
 import binascii
+import logging
+import functools
+import mimetypes
+import collections
+import concurrent.futures
 import struct
 import time
 import zipfile
 import zlib
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from waterbutler.core import settings
+from waterbutler.core import exceptions
 from waterbutler.core.streams import BaseStream
 from waterbutler.core.streams import MultiStream
 from waterbutler.core.streams import StringStream
 
 
+logger = logging.getLogger(__name__)
+
+# Sizes and offsets above ZIP64_LIMIT, and more than ZIP_FILECOUNT_LIMIT entries, need Zip64 records
+ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+ZIP_FILECOUNT_LIMIT = zipfile.ZIP_FILECOUNT_LIMIT
+
+# Entries of stored archives are dated to the start of the zip epoch, every request lays them out alike
+STORED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def compression_for(filename, content_type=None):
+    """Returns the zlib level to deflate the entry `filename` at, or None to store it as is
+    because its extension or type is in ``ZIP_STORED_EXTENSIONS`` or ``ZIP_STORED_TYPES``
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    content_type = content_type or mimetypes.guess_type(filename)[0] or ''
+
+    if extension in settings.ZIP_STORED_EXTENSIONS:
+        return None
+    if any(content_type.startswith(stored) for stored in settings.ZIP_STORED_TYPES):
+        return None
+    if settings.ZIP_COMPRESSION_LEVEL == 0:
+        return None
+    return settings.ZIP_COMPRESSION_LEVEL
+
+
+class StoredCompressor:
+    """Stands in for a zlib compressor for entries stored without compression"""
+
+    def compress(self, data):
+        return data
+
+    def flush(self, mode=zlib.Z_FINISH):
+        return b''
+
+
+def deflate_block(block, dictionary, level, last):
+    """Deflates one block of an entry, on a worker thread. Primed with the data before it, and ending
+    on a byte boundary unless it is the last, its output continues the raw deflate stream of the blocks
+    before it
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+_executors = {}
+
+
+def executor_for(workers):
+    """The pool of `workers` threads deflating zip entries, shared by every archive of the process"""
+    if workers not in _executors:
+        _executors[workers] = concurrent.futures.ThreadPoolExecutor(workers)
+    return _executors[workers]
+
+
+class ParallelDeflate:
+    """Deflates an entry as blocks compressed at once on ``ZIP_COMPRESSION_WORKERS`` threads, the
+    way pigz does, while the event loop only hands their output out in order. zlib releases the GIL
+    while it compresses, so the blocks of one entry use as many cores as there are workers.
+    """
+
+    def __init__(self, level, workers=None, block_size=None):
+        workers = workers or settings.ZIP_COMPRESSION_WORKERS
+        self.level = level
+        self.block_size = block_size or settings.ZIP_COMPRESSION_BLOCK_SIZE
+        self.window = 2 * workers
+        self.executor = executor_for(workers)
+        self.blocks = collections.deque()
+        # Deflate looks back at most 32 KiB, the dictionary of the next block
+        self._history = b''
+
+    def submit(self, block, last):
+        future = asyncio.get_event_loop().run_in_executor(
+            self.executor, deflate_block, block, self._history, self.level, last
+        )
+        self.blocks.append((future, last))
+        self._history = (self._history + block[-32768:])[-32768:]
+
+    @asyncio.coroutine
+    def next(self):
+        """The deflated output of the oldest block, and whether it was the last"""
+        future, last = self.blocks.popleft()
+        return (yield from future), last
+
+
+def abandon(stream):
+    """Stops a stream that will not be read to its end, closing the response or file it holds"""
+    if hasattr(stream, 'cancel'):
+        stream.cancel()
+    elif hasattr(stream, 'close'):
+        stream.close()
+    elif hasattr(stream, 'response'):
+        stream.response.close()
+
+
+class PrefetchBudget:
+    """Bytes of small entries that may be held in memory ahead of their turn"""
+
+    def __init__(self, size):
+        self.available = size
+
+    def reserve(self, size):
+        if size > self.available:
+            return False
+        self.available -= size
+        return True
+
+    def release(self, size):
+        self.available += size
+
+
+class ZipLocalFileHeader(BaseStream):
+    """The header for a local file in a zip archive, written once its stream
+    is open so that entries known to be large get a Zip64 extra field
+
+    Note: This class is tightly coupled to ZipStreamReader, and should not be
+    used separately
+    """
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+
+    @property
+    def size(self):
+        return 0
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        if not self._eof:
+            if self.file.known_size is None:
+                stream = yield from self.file.data.ready()
+                size = getattr(stream, 'size', None)
+                # Allow for deflate growing incompressible data, as zipfile does
+                self.file.zip64 = size is not None and size * 1.05 > ZIP64_LIMIT
+
+            self.feed_data(self.file.local_header)
+            self.feed_eof()
+
+        return (yield from asyncio.StreamReader.read(self, n))
+
+
 class ZipLocalFileDescriptor(BaseStream):
     """The descriptor (footer) for a local file in a zip archive
 
@@ -41,31 +200,85 @@ class ZipLocalFileData(BaseStream):
         self.file = file
         self.stream = stream
         self._buffer = bytearray()
+        self._opening = None
+        self._reserved = 0
+        self._budget = None
+        self._read_all = False
+        self._finished = False
         super().__init__(*args, **kwargs)
 
     @property
     def size(self):
         return 0
 
+    def open(self, budget=None):
+        """Starts opening a deferred stream before it is read, reading it whole
+        when it is no larger than ``ZIP_PREFETCH_BUFFER_SIZE`` and fits in `budget`
+        """
+        if self._opening is None and callable(self.stream):
+            self._opening = asyncio.async(self._open(self.stream, budget))
+
     @asyncio.coroutine
-    def _read(self, n=-1, *args, **kwargs):
-        if callable(self.stream):
-            self.stream = yield from (self.stream())
+    def _open(self, opener, budget):
+        stream = yield from opener()
+        size = getattr(stream, 'size', None)
 
-        ret = self._buffer
+        if budget is None or size is None or size > settings.ZIP_PREFETCH_BUFFER_SIZE or not budget.reserve(size):
+            return stream
 
-        while (n == -1 or len(ret) < n) and not self.stream.at_eof():
-            chunk = yield from self.stream.read(n, *args, **kwargs)
+        try:
+            data = yield from stream.read()
+        except Exception:
+            # Cancellation included
+            budget.release(size)
+            abandon(stream)
+            raise
 
-            # Update file info
-            self.file.original_size += len(chunk)
-            self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
+        self._budget, self._reserved = budget, size
+        if isinstance(self.file.compressor, ParallelDeflate):
+            # Deflated alongside the entries before it
+            self._submit_all(data)
+            return StringStream(b'')
+        return StringStream(data)
 
-            # compress
-            compressed = self.file.compressor.compress(chunk)
-            compressed += self.file.compressor.flush(
-                zlib.Z_FINISH if self.stream.at_eof() else zlib.Z_SYNC_FLUSH
-            )
+    def cancel(self):
+        """Stops opening the entry's stream and closes it if it was opened"""
+        if self._opening is not None:
+            opening, self._opening = self._opening, None
+            if not opening.done():
+                opening.cancel()
+            elif not opening.cancelled() and opening.exception() is None:
+                abandon(opening.result())
+        elif not callable(self.stream):
+            abandon(self.stream)
+        self.feed_eof()
+
+    def feed_eof(self):
+        super().feed_eof()
+        if self._reserved:
+            self._budget.release(self._reserved)
+            self._reserved = 0
+
+    @asyncio.coroutine
+    def ready(self):
+        """Returns the stream, opening it first if it was given as a coroutine function"""
+        if self._opening is not None:
+            self.stream, self._opening = (yield from self._opening), None
+        elif callable(self.stream):
+            self.stream = yield from (self.stream())
+        return self.stream
+
+    @asyncio.coroutine
+    def _read(self, n=-1, *args, **kwargs):
+        yield from self.ready()
+
+        ret = self._buffer
+
+        while (n == -1 or len(ret) < n) and not self._finished:
+            if isinstance(self.file.compressor, ParallelDeflate):
+                compressed = yield from self._deflate_blocks()
+            else:
+                compressed = yield from self._compress(n, *args, **kwargs)
 
             # Update file info
             self.file.compressed_size += len(compressed)
@@ -79,11 +292,57 @@ class ZipLocalFileData(BaseStream):
             self._buffer = bytearray()
 
         # EOF is the buffer and stream are both empty
-        if not self._buffer and self.stream.at_eof():
+        if not self._buffer and self._finished:
             self.feed_eof()
 
         return bytes(ret)
 
+    @asyncio.coroutine
+    def _compress(self, n, *args, **kwargs):
+        chunk = b''
+        if not self.stream.at_eof():
+            chunk = yield from self.stream.read(n, *args, **kwargs)
+
+        # Update file info
+        self.file.original_size += len(chunk)
+        self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
+
+        # compress, flushing only at the end so deflate keeps its window across chunks
+        compressed = self.file.compressor.compress(chunk)
+        if self.stream.at_eof():
+            compressed += self.file.compressor.flush(zlib.Z_FINISH)
+            self._finished = True
+
+        return compressed
+
+    @asyncio.coroutine
+    def _deflate_blocks(self):
+        engine = self.file.compressor
+        while not self._read_all and len(engine.blocks) < engine.window:
+            block = bytearray()
+            while len(block) < engine.block_size and not self.stream.at_eof():
+                chunk = yield from self.stream.read(engine.block_size - len(block))
+                if not chunk:
+                    break
+                block += chunk
+            self._submit(bytes(block), self.stream.at_eof() or len(block) < engine.block_size)
+
+        compressed, self._finished = yield from engine.next()
+        return compressed
+
+    def _submit_all(self, data):
+        size = self.file.compressor.block_size
+        for start in range(0, max(len(data), 1), size):
+            self._submit(data[start:start + size], start + size >= len(data))
+
+    def _submit(self, block, last):
+        # Update file info
+        self.file.original_size += len(block)
+        self.file.zinfo.CRC = binascii.crc32(block, self.file.zinfo.CRC)
+
+        self.file.compressor.submit(block, last)
+        self._read_all = last
+
 
 class ZipLocalFile(MultiStream):
     """A local file in a zip archive
@@ -91,15 +350,18 @@ class ZipLocalFile(MultiStream):
     Note: This class is tightly coupled to ZipStreamReader, and should not be
     used separately
     """
-    def __init__(self, file_tuple):
-        filename, stream = file_tuple
+    def __init__(self, file_tuple, size=None, date_time=None):
+        # (name, stream) or (name, stream, content type)
+        filename, stream, *content_type = file_tuple
         filename = filename.strip('/')
+        # Entries of a known size are stored as is, their layout is fixed before they are read
+        level = None if size is not None else compression_for(filename, *content_type)
         # Build a ZipInfo instance to use for the file's header and footer
         self.zinfo = zipfile.ZipInfo(
             filename=filename,
-            date_time=time.localtime(time.time())[:6],
+            date_time=date_time or time.localtime(time.time())[:6],
         )
-        self.zinfo.compress_type = zipfile.ZIP_DEFLATED
+        self.zinfo.compress_type = zipfile.ZIP_STORED if level is None else zipfile.ZIP_DEFLATED
         self.zinfo.external_attr = 0o600 << 16
         self.zinfo.header_offset = 0
         self.zinfo.flag_bits |= 0x08
@@ -107,69 +369,99 @@ class ZipLocalFile(MultiStream):
         self.zinfo.CRC = 0
 
         # define a compressor
-        self.compressor = zlib.compressobj(
-            zlib.Z_DEFAULT_COMPRESSION,
-            zlib.DEFLATED,
-            -15,
-        )
+        if level is None:
+            self.compressor = StoredCompressor()
+        elif settings.ZIP_COMPRESSION_WORKERS:
+            self.compressor = ParallelDeflate(level)
+        else:
+            self.compressor = zlib.compressobj(
+                level,
+                zlib.DEFLATED,
+                -15,
+            )
 
         # meta information - needed to build the footer
-        self.original_size = 0
-        self.compressed_size = 0
+        self.known_size = size
+        self.original_size = size or 0
+        self.compressed_size = size or 0
+        # Whether the local header carries a Zip64 extra field, decided once the stream is open
+        # unless the size is known
+        self.zip64 = size is not None and size > ZIP64_LIMIT
+        self._local_header = None
+
+        self.data = ZipLocalFileData(self, stream)
 
         super().__init__(
-            StringStream(self.local_header),
-            ZipLocalFileData(self, stream),
+            ZipLocalFileHeader(self),
+            self.data,
             ZipLocalFileDescriptor(self),
         )
 
+    def release(self):
+        """Drops the compressor and the streams of a written file. They refer back to it, this
+        frees it as soon as it is no longer referred to rather than when garbage is next collected
+        """
+        self.compressor = None
+        self.data = None
+        self.stream = None
+
     @property
     def local_header(self):
         """The file's header, for inclusion just before the content stream"""
-        return self.zinfo.FileHeader(zip64=False)
+        if self._local_header is None:
+            self._local_header = self.zip64_local_header if self.zip64 else self.zinfo.FileHeader(zip64=False)
+        return self._local_header
 
     @property
-    def directory_header(self):
-        """The file's header, for inclusion in the archive's central directory
+    def zip64_local_header(self):
+        """The file's header with a Zip64 extra field. Built here as some versions of zipfile
+        leave the sizes of entries with data descriptors zeroed rather than deferred to the extra
+        field, and do not raise the version needed to extract them
         """
-        dt = self.zinfo.date_time
-
-        # modification date/time, in MSDOS format
-        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
-        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
-
-        extra_data = self.zinfo.extra
+        dostime, dosdate = self.dos_date_time
+        self.zinfo.extract_version = max(self.zinfo.extract_version, zipfile.ZIP64_VERSION)
+        self.zinfo.create_version = max(self.zinfo.create_version, zipfile.ZIP64_VERSION)
 
+        # Both sizes follow in the data descriptor
+        extra = self.zinfo.extra + struct.pack('<HHQQ', 1, 16, 0, 0)
         filename, flag_bits = self.zinfo._encodeFilenameFlags()
-        centdir = struct.pack(
-            zipfile.structCentralDir,
-            zipfile.stringCentralDir,
-            self.zinfo.create_version,
-            self.zinfo.create_system,
+        header = struct.pack(
+            zipfile.structFileHeader,
+            zipfile.stringFileHeader,
             self.zinfo.extract_version,
             self.zinfo.reserved,
             flag_bits,
             self.zinfo.compress_type,
-            dostime,  # modification time
+            dostime,
             dosdate,
-            self.zinfo.CRC,
-            self.compressed_size,
-            self.original_size,
-            len(self.zinfo.filename.encode('utf-8')),
-            len(extra_data),
-            len(self.zinfo.comment),
             0,
-            self.zinfo.internal_attr,
-            self.zinfo.external_attr,
-            self.zinfo.header_offset,
+            0xffffffff,
+            0xffffffff,
+            len(filename),
+            len(extra),
         )
 
-        return centdir + filename + extra_data + self.zinfo.comment
+        return header + filename + extra
+
+    @property
+    def dos_date_time(self):
+        """The modification time and date, in MSDOS format"""
+        dt = self.zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        return dostime, dosdate
+
+    @property
+    def descriptor_zip64(self):
+        """Whether the data descriptor needs 64 bit sizes, as it does when the local header
+        announced Zip64 or the entry turned out larger than expected
+        """
+        return self.zip64 or max(self.compressed_size, self.original_size) > ZIP64_LIMIT
 
     @property
     def descriptor(self):
         """Local file data descriptor"""
-        fmt = '<4sLLL'
+        fmt = '<4sLQQ' if self.descriptor_zip64 else '<4sLLL'
         signature = b'PK\x07\x08'  # magic number for data descriptor
 
         return struct.pack(
@@ -193,15 +485,125 @@ class ZipLocalFile(MultiStream):
         )
 
 
+# The fields of a written entry the central directory needs, besides its name, and their array type codes
+RECORD_FIELDS = (
+    ('flag_bits', 'H'),
+    ('compress_type', 'H'),
+    ('create_version', 'B'),
+    ('create_system', 'B'),
+    ('extract_version', 'B'),
+    ('dostime', 'H'),
+    ('dosdate', 'H'),
+    ('crc', 'I'),
+    ('compressed_size', 'Q'),
+    ('original_size', 'Q'),
+    ('header_offset', 'Q'),
+    ('external_attr', 'I'),
+)
+
+ZipEntryRecord = collections.namedtuple('ZipEntryRecord', ['filename'] + [name for name, _ in RECORD_FIELDS])
+
+
+class ZipEntryRecords:
+    """What the central directory needs of the entries written so far, their encoded names in a single
+    buffer and every other field in an array of its own. A written entry costs a few dozen bytes plus
+    its name, its ZipLocalFile, compressor and streams are released as soon as it is recorded.
+    """
+
+    def __init__(self):
+        self.names = bytearray()
+        self.name_ends = array.array('Q')
+        self.columns = [array.array(code) for _, code in RECORD_FIELDS]
+        # Bytes taken by the entries, the offset of the next one
+        self.size = 0
+
+    def __len__(self):
+        return len(self.name_ends)
+
+    def __iter__(self):
+        start = 0
+        for index, end in enumerate(self.name_ends):
+            yield ZipEntryRecord(bytes(self.names[start:end]), *(column[index] for column in self.columns))
+            start = end
+
+    def append(self, file):
+        """Records the written ZipLocalFile `file`, which starts where the entries before it end"""
+        filename, flag_bits = file.zinfo._encodeFilenameFlags()
+        dostime, dosdate = file.dos_date_time
+
+        self.names += filename
+        self.name_ends.append(len(self.names))
+        values = (
+            flag_bits,
+            file.zinfo.compress_type,
+            file.zinfo.create_version,
+            file.zinfo.create_system,
+            file.zinfo.extract_version,
+            dostime,
+            dosdate,
+            file.zinfo.CRC,
+            file.compressed_size,
+            file.original_size,
+            self.size,
+            file.zinfo.external_attr,
+        )
+        for column, value in zip(self.columns, values):
+            column.append(value)
+
+        self.size += file.total_bytes
+
+    def directory_header(self, record):
+        """The entry's header, for inclusion in the archive's central directory"""
+        # Sizes and offsets too large for their fields are moved into a Zip64 extra field
+        extra, sizes = [], []
+        for value in (record.original_size, record.compressed_size, record.header_offset):
+            if value > ZIP64_LIMIT:
+                extra.append(value)
+                value = 0xffffffff
+            sizes.append(value)
+        original_size, compressed_size, header_offset = sizes
+
+        extra_data = b''
+        extract_version = record.extract_version
+        if extra:
+            extra_data = struct.pack('<HH' + 'Q' * len(extra), 1, 8 * len(extra), *extra)
+            extract_version = max(extract_version, zipfile.ZIP64_VERSION)
+
+        centdir = struct.pack(
+            zipfile.structCentralDir,
+            zipfile.stringCentralDir,
+            max(record.create_version, extract_version),
+            record.create_system,
+            extract_version,
+            0,  # reserved
+            record.flag_bits,
+            record.compress_type,
+            record.dostime,  # modification time
+            record.dosdate,
+            record.crc,
+            compressed_size,
+            original_size,
+            len(record.filename),
+            len(extra_data),
+            0,  # comment length
+            0,
+            0,  # internal attributes
+            record.external_attr,
+            header_offset,
+        )
+
+        return centdir + record.filename + extra_data
+
+
 class ZipArchiveCentralDirectory(BaseStream):
     """The central directory for a zip archive
 
     Note: This class is tightly coupled to ZipStreamReader, and should not be
     used separately
     """
-    def __init__(self, files, *args, **kwargs):
+    def __init__(self, records, *args, **kwargs):
         super().__init__()
-        self.files = files
+        self.records = records
 
     @property
     def size(self):
@@ -209,16 +611,23 @@ class ZipArchiveCentralDirectory(BaseStream):
 
     @asyncio.coroutine
     def _read(self, n=-1):
-        file_headers = []
-        cumulative_offset = 0
-        for file in self.files:
-            file.zinfo.header_offset = cumulative_offset
-            file_headers.append(file.directory_header)
-            cumulative_offset += file.total_bytes
+        self.feed_eof()
+        return self.build()
 
-        file_headers = b''.join(file_headers)
+    def build(self):
+        """The central directory and end records for the entries recorded so far"""
+        file_headers = b''.join(self.records.directory_header(record) for record in self.records)
+        cumulative_offset = self.records.size
 
-        count = len(self.files)
+        count = len(self.records)
+        size = len(file_headers)
+
+        zip64 = b''
+        if count >= ZIP_FILECOUNT_LIMIT or size > ZIP64_LIMIT or cumulative_offset > ZIP64_LIMIT:
+            zip64 = self.zip64_end_records(count, size, cumulative_offset)
+            count = min(count, 0xffff)
+            size = min(size, 0xffffffff)
+            cumulative_offset = min(cumulative_offset, 0xffffffff)
 
         endrec = struct.pack(
             zipfile.structEndArchive,
@@ -227,22 +636,471 @@ class ZipArchiveCentralDirectory(BaseStream):
             0,
             count,
             count,
-            len(file_headers),
+            size,
             cumulative_offset,
             0,
         )
-        self.feed_eof()
 
-        return b''.join((file_headers, endrec))
+        return b''.join((file_headers, zip64, endrec))
+
+    def zip64_end_records(self, count, size, offset):
+        """The Zip64 end of central directory record and its locator, for archives
+        whose entry count, directory size or directory offset overflow the end record
+        """
+        record = struct.pack(
+            zipfile.structEndArchive64,
+            zipfile.stringEndArchive64,
+            zipfile.sizeEndCentDir64 - 12,  # size of the remaining record
+            zipfile.ZIP64_VERSION,
+            zipfile.ZIP64_VERSION,
+            0,
+            0,
+            count,
+            count,
+            size,
+            offset,
+        )
+        locator = struct.pack(
+            zipfile.structEndArchive64Locator,
+            zipfile.stringEndArchive64Locator,
+            0,
+            offset + size,  # where the record above starts
+            1,
+        )
+        return record + locator
 
 
 class ZipStreamReader(MultiStream):
-    """Combines one or more streams into a single, Zip-compressed stream"""
-    def __init__(self, *streams):
+    """Combines one or more streams into a single, Zip-compressed stream
+
+    Entries are ``(name, stream)`` pairs given up front or, for archives that start streaming
+    while their entries are still being listed, returned in batches by `source`: a coroutine
+    function called whenever every entry so far has been read, returning None once there are
+    no more. The central directory follows the last entry either way.
+
+    Streams may be given as coroutine functions opening them, the next `prefetch` of those,
+    ``ZIP_PREFETCH_ENTRIES`` by default, are opened while the current entry is compressed.
+    Entries of up to ``ZIP_PREFETCH_BUFFER_SIZE`` bytes are read whole ahead of their turn
+    while they fit in ``ZIP_PREFETCH_BUDGET`` bytes.
+
+    Consumers that give up before the end of the archive should :meth:`cancel` it, which calls
+    `cancel_source` to stop whatever `source` lists its entries from, such as a :class:`Walk`.
+    """
+    def __init__(self, *streams, source=None, prefetch=None, cancel_source=None):
+        self.source = source
+        self.cancel_source = cancel_source
+        self.prefetch = settings.ZIP_PREFETCH_ENTRIES if prefetch is None else prefetch
+        self.budget = PrefetchBudget(settings.ZIP_PREFETCH_BUDGET)
+        self.records = ZipEntryRecords()
         # Each incoming stream should be wrapped in a _ZipFile instance
         streams = [ZipLocalFile(each) for each in streams]
 
-        # Append a stream for the archive's footer (central directory)
-        streams.append(ZipArchiveCentralDirectory(streams.copy()))
+        if source is None:
+            # Append a stream for the archive's footer (central directory)
+            streams.append(ZipArchiveCentralDirectory(self.records))
 
         super().__init__(*streams)
+
+    @property
+    def files(self):
+        """The entries not yet written, those written are kept as :class:`ZipEntryRecords`"""
+        current = [self.stream] if isinstance(self.stream, ZipLocalFile) else []
+        return current + [stream for stream in self.streams if isinstance(stream, ZipLocalFile)]
+
+    @asyncio.coroutine
+    def read(self, n=-1):
+        if n < 0:
+            return (yield from super().read(n))
+
+        chunk = b''
+        while len(chunk) < n:
+            if self.stream is None and self.source is not None:
+                # Hand out what is ready rather than wait for the next entries
+                if chunk:
+                    break
+                yield from self._next_files()
+                continue
+
+            if not self.stream:
+                break
+            chunk += yield from super().read(n - len(chunk))
+
+        return chunk
+
+    def cancel(self):
+        """Stops listing and opening entries, for consumers that give up before the end of the archive"""
+        if self.cancel_source is not None:
+            self.cancel_source()
+            self.cancel_source = None
+        for file in self.files:
+            file.data.cancel()
+
+    def close(self):
+        self.cancel()
+
+    @asyncio.coroutine
+    def _next_files(self):
+        batch = yield from self.source()
+
+        if batch is None:
+            self.source = None
+            self.add_streams(ZipArchiveCentralDirectory(self.records))
+            return
+
+        self.add_streams(*[ZipLocalFile(each) for each in batch])
+        self._prefetch()
+
+    def _cycle(self):
+        if isinstance(self.stream, ZipLocalFile):
+            # Written whole, only what the central directory needs is kept
+            self.records.append(self.stream)
+            self.stream.release()
+
+        if not self.streams and getattr(self, 'source', None) is not None:
+            # More entries may follow, read asks the source for them
+            self.stream = None
+            return
+        super()._cycle()
+        self._prefetch()
+
+    def _prefetch(self):
+        """Opens the streams of the entries after the current one"""
+        if not getattr(self, 'prefetch', 0):
+            return
+
+        upcoming = (stream for stream in self.streams if isinstance(stream, ZipLocalFile))
+        for file, _ in zip(upcoming, range(self.prefetch)):
+            file.data.open(self.budget)
+
+
+class CrcCache:
+    """An LRU of the CRC-32s of stored archive entries read before, keyed by whatever identifies
+    a version of their content, so that ranges of an archive need not download the entries they
+    skip to fill in its descriptors and central directory.
+
+    Given `client`, anything implementing blocking ``mget`` and ``set`` like
+    :class:`redis.StrictRedis`, CRC-32s are also shared with every process using it, so a range
+    resuming an archive another process started finds them. Its failures are misses.
+    """
+
+    def __init__(self, size, client=None):
+        self.size = size
+        self.client = client
+        self._entries = collections.OrderedDict()
+
+    @classmethod
+    def from_url(cls, size, url, timeout=0.5):
+        if redis is None:
+            raise ImportError('Sharing zip CRCs requires the redis package')
+        return cls(size, redis.StrictRedis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout))
+
+    @asyncio.coroutine
+    def load(self, keys):
+        """Fetches the CRC-32s of `keys` not known to this process from the shared client"""
+        keys = [key for key in keys if key is not None and key not in self._entries]
+        if self.client is None or not keys:
+            return
+
+        try:
+            values = yield from asyncio.get_event_loop().run_in_executor(None, self.client.mget, [self._key(key) for key in keys])
+        except Exception as e:
+            logger.warning('Zip CRC cache client failed with {!r}'.format(e))
+            return
+
+        for key, value in zip(keys, values):
+            if value is not None:
+                self._remember(key, int(value))
+
+    def get(self, key):
+        try:
+            crc = self._entries.pop(key)
+        except KeyError:
+            return None
+        self._entries[key] = crc
+        return crc
+
+    def set(self, key, crc):
+        self._remember(key, crc)
+        if self.client is not None:
+            future = asyncio.get_event_loop().run_in_executor(None, self.client.set, self._key(key), crc)
+            future.add_done_callback(self._stored)
+
+    def _key(self, key):
+        return 'waterbutler:zip-crc:{}'.format(key)
+
+    def _stored(self, future):
+        if future.exception() is not None:
+            logger.warning('Zip CRC cache client failed with {!r}'.format(future.exception()))
+
+    def _remember(self, key, crc):
+        self._entries.pop(key, None)
+        self._entries[key] = crc
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+
+def crc_cache_from_settings():
+    if settings.ZIP_CRC_CACHE_URL:
+        return CrcCache.from_url(settings.ZIP_CRC_CACHE_SIZE, settings.ZIP_CRC_CACHE_URL)
+    return CrcCache(settings.ZIP_CRC_CACHE_SIZE)
+
+
+crc_cache = crc_cache_from_settings()
+
+
+class ZipEntrySlice(BaseStream):
+    """Bytes `start` up to `end` of a stored entry, read from `stream` which holds the entry from
+    its first byte, or from `start` when the upstream honoured a range. Given `done`, the stream
+    holds the whole entry of `end` bytes and `done` is called with its CRC-32 once it is read.
+
+    Note: This class is tightly coupled to StoredZipArchive, and should not be
+    used separately
+    """
+    def __init__(self, stream, start, end, done=None):
+        super().__init__()
+        self.stream = stream
+        self.start = start
+        self.end = end
+        self.done = done
+        self.position = 0
+        self.crc = 0
+
+    @property
+    def size(self):
+        return self.end - self.start
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        if n < 0:
+            chunks = []
+            chunk = yield from self._read(settings.READ_AHEAD_CHUNK_SIZE)
+            while chunk:
+                chunks.append(chunk)
+                chunk = yield from self._read(settings.READ_AHEAD_CHUNK_SIZE)
+            return b''.join(chunks)
+
+        while self.position < self.end:
+            if self.position < self.start:
+                # Skipping what comes before the range, in chunks that end where it starts
+                chunk = yield from self.stream.read(min(settings.READ_AHEAD_CHUNK_SIZE, self.start - self.position))
+            else:
+                chunk = yield from self.stream.read(min(n, self.end - self.position))
+
+            if not chunk:
+                raise exceptions.DownloadError(
+                    'Expected {} bytes of a zip entry, received {}'.format(self.end, self.position)
+                )
+
+            if self.done is not None:
+                self.crc = binascii.crc32(chunk, self.crc)
+
+            self.position += len(chunk)
+            if self.position > self.start:
+                return chunk
+
+        if self.done is not None:
+            # The archive was laid out for the size the entry was listed with
+            if (yield from self.stream.read(1)):
+                raise exceptions.DownloadError('A zip entry is larger than listed, it changed since')
+            self.done(self.crc & 0xffffffff)
+            self.done = None
+
+        self.feed_eof()
+        return b''
+
+
+class StoredZipStream(BaseStream):
+    """Reads the parts of a stored archive in order, each a coroutine function returning a stream
+
+    Note: This class is tightly coupled to StoredZipArchive, and should not be
+    used separately
+    """
+    def __init__(self, parts, size):
+        super().__init__()
+        self.parts = collections.deque(parts)
+        self.stream = None
+        self._size = size
+
+    @property
+    def size(self):
+        return self._size
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        if n < 0:
+            chunks = []
+            chunk = yield from self._read(settings.READ_AHEAD_CHUNK_SIZE)
+            while chunk:
+                chunks.append(chunk)
+                chunk = yield from self._read(settings.READ_AHEAD_CHUNK_SIZE)
+            return b''.join(chunks)
+
+        while True:
+            if self.stream is None:
+                if not self.parts:
+                    self.feed_eof()
+                    return b''
+                self.stream = yield from self.parts.popleft()()
+
+            chunk = yield from self.stream.read(n)
+            if chunk:
+                return chunk
+            self.stream = None
+
+
+class StoredZipArchive:
+    """A zip archive of entries of known sizes, all stored without compression and laid out before
+    any of them is downloaded. Its size is known up front and any range of it can be read on its own,
+    entries are only downloaded as far as the range overlaps them.
+
+    Entries are ``(name, size, fetch, key, modified)``. `fetch` is a coroutine function returning the
+    entry's stream, or given ``range=(start, end)`` that inclusive range of it. `key` identifies the
+    version of the entry's content in `crcs`, the :class:`CrcCache` of CRC-32s computed by earlier reads,
+    None when it has none. `modified` is when the entry last changed, if listed. A range covering the descriptor or directory record of an entry whose CRC is not
+    known downloads the entry whole to compute it, see :meth:`needs_downloads` to avoid that.
+    """
+    def __init__(self, entries, crcs=None):
+        self.entries = list(entries)
+        self.crcs = crc_cache if crcs is None else crcs
+        # Nothing need be read of empty entries
+        self._crcs = [0 if size == 0 else None for _, size, _, _, _ in self.entries]
+
+        self.files, self.offsets = [], []
+        offset = 0
+        for name, size, _, _, _ in self.entries:
+            file = ZipLocalFile((name, None), size=size, date_time=STORED_DATE_TIME)
+            self.files.append(file)
+            self.offsets.append(offset)
+            offset += file.total_bytes
+
+        self.directory_offset = offset
+        # CRCs are fixed size fields, the directory is as long without them
+        self.size = offset + len(self.central_directory())
+
+    @property
+    def etag(self):
+        """Identifies the bytes of the archive by the key and modification time of every entry, None
+        when an entry has neither and ranges of two versions of the archive could not be told apart
+        """
+        layout = []
+        for name, size, _, key, modified in self.entries:
+            if key is None and modified is None:
+                return None
+            layout.append((name, size, key, modified))
+        return hashlib.sha256(repr(layout).encode('utf-8')).hexdigest()
+
+    def stream(self, start=0, end=None):
+        """A stream of bytes `start` up to, not including, `end` of the archive"""
+        end = self.size if end is None else min(end, self.size)
+        parts = []
+
+        def overlap(offset, length):
+            """The part of `length` bytes at `offset` the range covers, relative to `offset`"""
+            first, last = max(start, offset) - offset, min(end, offset + length) - offset
+            return (first, last) if first < last else None
+
+        for index, file in enumerate(self.files):
+            size = self.entries[index][1]
+            header = self.offsets[index]
+            data = header + len(file.local_header)
+            descriptor = data + size
+
+            covered = overlap(header, len(file.local_header))
+            if covered:
+                parts.append(functools.partial(self._bytes, file.local_header, *covered))
+            covered = overlap(data, size)
+            if covered:
+                parts.append(functools.partial(self._data, index, *covered, whole=end > descriptor))
+            covered = overlap(descriptor, len(file.descriptor))
+            if covered:
+                parts.append(functools.partial(self._descriptor, index, *covered))
+
+        covered = overlap(self.directory_offset, self.size - self.directory_offset)
+        if covered:
+            parts.append(functools.partial(self._directory, *covered))
+
+        return StoredZipStream(parts, end - start)
+
+    @asyncio.coroutine
+    def load_crcs(self):
+        """Fetches the CRC-32s of the entries other processes have read, see :meth:`CrcCache.load`"""
+        yield from self.crcs.load([key for index, (_, _, _, key, _) in enumerate(self.entries) if self._crcs[index] is None])
+
+    def needs_downloads(self, start=0, end=None):
+        """Whether bytes `start` up to `end` hold the CRC-32 of an entry that is not known and that
+        they do not cover whole, which would be downloaded beyond the range just to compute it
+        """
+        end = self.size if end is None else min(end, self.size)
+        directory = end > self.directory_offset
+
+        for index, file in enumerate(self.files):
+            data = self.offsets[index] + len(file.local_header)
+            descriptor = data + self.entries[index][1]
+            if not directory and not (start < descriptor + len(file.descriptor) and end > descriptor):
+                continue
+            # Reading an entry from its first byte computes its CRC on the way
+            if not (start <= data and end >= descriptor) and self.crc(index) is None:
+                return True
+        return False
+
+    def central_directory(self):
+        """The central directory and end records, with the CRCs as they stand"""
+        records = ZipEntryRecords()
+        for file in self.files:
+            records.append(file)
+        return ZipArchiveCentralDirectory(records).build()
+
+    def crc(self, index):
+        """The CRC-32 of entry `index` if it is known"""
+        if self._crcs[index] is None and self.entries[index][3] is not None:
+            crc = self.crcs.get(self.entries[index][3])
+            if crc is not None:
+                self._found(index, crc)
+        return self._crcs[index]
+
+    def _found(self, index, crc):
+        self._crcs[index] = crc
+        self.files[index].zinfo.CRC = crc
+        if self.entries[index][3] is not None:
+            self.crcs.set(self.entries[index][3], crc)
+
+    @asyncio.coroutine
+    def _bytes(self, data, start, end):
+        return StringStream(data[start:end])
+
+    @asyncio.coroutine
+    def _data(self, index, start, end, whole=False):
+        _, size, fetch, _, _ = self.entries[index]
+
+        if (start == 0 and end == size) or (whole and self.crc(index) is None):
+            # Read from the first byte, the entry's CRC comes out of it
+            return ZipEntrySlice((yield from fetch()), start, size, done=functools.partial(self._found, index))
+
+        stream = yield from fetch(range=(start, end - 1))
+        if getattr(stream, 'partial', False):
+            return ZipEntrySlice(stream, 0, end - start)
+        # The upstream ignored the range
+        return ZipEntrySlice(stream, start, end)
+
+    @asyncio.coroutine
+    def _compute_crc(self, index):
+        if self.crc(index) is None:
+            stream = yield from self._data(index, 0, self.entries[index][1])
+            yield from stream.read()
+
+    @asyncio.coroutine
+    def _descriptor(self, index, start, end):
+        yield from self._compute_crc(index)
+        return StringStream(self.files[index].descriptor[start:end])
+
+    @asyncio.coroutine
+    def _directory(self, start, end):
+        window = asyncio.Semaphore(max(settings.ZIP_PREFETCH_ENTRIES, 1))
+
+        @asyncio.coroutine
+        def compute(index):
+            with (yield from window):
+                yield from self._compute_crc(index)
+
+        yield from asyncio.gather(*[compute(index) for index in range(len(self.files)) if self.crc(index) is None])
+        return StringStream(self.central_directory()[start:end])
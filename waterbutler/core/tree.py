@@ -0,0 +1,116 @@
+"""Walks of whole folder trees.
+
+:meth:`BaseProvider.walk` returns a :class:`Walk`, handing out the
+``(path, metadata)`` entries of everything below a folder in batches as they
+are listed, rather than once the whole tree is known::
+
+    walk = provider.walk(path)
+    entries = yield from walk.next()
+    while entries is not None:
+        ...
+        entries = yield from walk.next()
+
+A folder is always handed out before anything inside it. Listings run ahead of
+the consumer by at most ``WALK_BUFFER`` batches.
+"""
+import asyncio
+
+from waterbutler.core import settings
+
+
+class Walk:
+    """The entries of a tree, filled in by the coroutine function `fill`.
+    It is called with a coroutine that queues a batch of entries and runs until
+    the walk ends, its errors are raised to the consumer after the entries queued
+    before them.
+
+    :param fill: A coroutine function called with ``put``
+    :param int buffer: Batches queued ahead of the consumer, defaults to ``WALK_BUFFER``
+    """
+
+    def __init__(self, fill, buffer=None):
+        self._done = False
+        self._queue = asyncio.Queue(maxsize=buffer or settings.WALK_BUFFER)
+        self._task = asyncio.async(self._fill(fill))
+
+    def cancel(self):
+        """Stops listing, for consumers that give up before the end of the walk"""
+        self._task.cancel()
+
+    @asyncio.coroutine
+    def put(self, entries):
+        if entries:
+            yield from self._queue.put(list(entries))
+
+    @asyncio.coroutine
+    def _fill(self, fill):
+        try:
+            yield from fill(self.put)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            yield from self._queue.put(e)
+        else:
+            yield from self._queue.put(None)
+
+    @asyncio.coroutine
+    def next(self):
+        """Returns the next batch of ``(path, metadata)`` entries, None once the walk is over"""
+        if self._done:
+            return None
+
+        batch = yield from self._queue.get()
+        if isinstance(batch, Exception):
+            self._done = True
+            raise batch
+        if batch is None:
+            self._done = True
+        return batch
+
+    @asyncio.coroutine
+    def collect(self):
+        """Returns every remaining entry as a single list"""
+        entries = []
+        batch = yield from self.next()
+        while batch is not None:
+            entries.extend(batch)
+            batch = yield from self.next()
+        return entries
+
+
+class Listing:
+    """Turns the names of a recursive listing, relative to the folder `root`, into
+    entries below it. Folders only implied by the names below them are given the
+    metadata returned by `folder` for their path and, like every folder, are
+    handed out once and before their contents.
+
+    :param WaterButlerPath root: The folder that was listed
+    :param folder: A function returning the metadata of an implied folder's path
+    :param \*\*kwargs: Passed on to :meth:`WaterButlerPath.child`
+    """
+
+    def __init__(self, root, folder, **kwargs):
+        self.folder = folder
+        self.kwargs = kwargs
+        self.folders = {'': root}
+
+    def entries(self, name, metadata, folder=False):
+        """Returns the entries of `name` and of the folders above it not seen before, parents first"""
+        parts = name.strip('/').split('/')
+        entries, key = [], ''
+
+        for index, part in enumerate(parts):
+            parent = self.folders[key]
+            is_folder = folder or index < len(parts) - 1
+            key += part + '/'
+
+            if is_folder and key in self.folders:
+                continue
+
+            path = parent.child(part, folder=is_folder, **self.kwargs)
+            if is_folder:
+                self.folders[key] = path
+
+            entries.append((path, metadata if index == len(parts) - 1 else self.folder(path)))
+
+        return entries
@@ -1,16 +1,22 @@
+import copy
 import json
+import time
 import asyncio
+import hashlib
 import logging
 import functools
+import threading
+import collections
 # from concurrent.futures import ProcessPoolExecutor  TODO Get this working
 
-import aiohttp
-
 from raven.contrib.tornado import AsyncSentryClient
-from stevedore import driver
+from stevedore import extension
 
 from waterbutler import settings
+from waterbutler.core import metrics
 from waterbutler.core import exceptions
+from waterbutler.core import connections
+from waterbutler.core import settings as core_settings
 from waterbutler.server import settings as server_settings
 from waterbutler.core.signing import Signer
 
@@ -30,7 +36,7 @@ class AioSentryClient(AsyncSentryClient):
             self.error_logger.error(message)
             return
 
-        future = aiohttp.request('POST', url, data=data, headers=headers)
+        future = connections.request('POST', url, data=data, headers=headers)
         asyncio.async(future)
 
 
@@ -40,8 +46,32 @@ else:
     client = None
 
 
-def make_provider(name, auth, credentials, settings):
-    """Returns an instance of :class:`waterbutler.core.provider.BaseProvider`
+_provider_classes = None
+_provider_classes_lock = threading.Lock()
+
+
+def provider_classes():
+    """Maps the name of every installed provider to its class.
+    The ``waterbutler.providers`` entry points are only scanned the first time this is called.
+
+    :rtype: dict
+    """
+    global _provider_classes
+
+    if _provider_classes is None:
+        with _provider_classes_lock:
+            if _provider_classes is None:
+                manager = extension.ExtensionManager(
+                    namespace='waterbutler.providers',
+                    invoke_on_load=False,
+                )
+                _provider_classes = {ext.name: ext.plugin for ext in manager}
+
+    return _provider_classes
+
+
+def build_provider(name, auth, credentials, settings):
+    """Returns a new instance of :class:`waterbutler.core.provider.BaseProvider`
 
     :param str name: The name of the provider to instantiate. (s3, box, etc)
     :param dict auth:
@@ -51,16 +81,91 @@ def make_provider(name, auth, credentials, settings):
     :rtype: :class:`waterbutler.core.provider.BaseProvider`
     """
     try:
-        manager = driver.DriverManager(
-            namespace='waterbutler.providers',
-            name=name,
-            invoke_on_load=True,
-            invoke_args=(auth, credentials, settings),
-        )
-    except RuntimeError:
+        provider_class = provider_classes()[name]
+    except KeyError:
         raise exceptions.ProviderNotFound(name)
 
-    return manager.driver
+    return provider_class(auth, credentials, settings)
+
+
+class ProviderPool:
+    """A bounded LRU of provider instances keyed by name, auth, credentials and settings.
+    Reusing an instance keeps whatever it has learned about its upstream, such as
+    access tokens, endpoints or repository details, across requests.
+    Instances are rebuilt once they are older than ``ttl`` seconds.
+
+    :param int size: The maximum number of instances to keep, 0 disables pooling
+    :param int ttl: Seconds an instance may be reused for
+    :param dict ttls: Per provider overrides of ``ttl``
+    """
+
+    def __init__(self, size=256, ttl=300, ttls=None):
+        self.size = size
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self._lock = threading.Lock()
+        self._instances = collections.OrderedDict()
+
+    def get(self, name, auth, credentials, settings):
+        if not self.size:
+            return build_provider(name, auth, credentials, settings)
+
+        key = (name, fingerprint(auth), fingerprint(credentials), fingerprint(settings))
+        now = time.monotonic()
+
+        with self._lock:
+            try:
+                created, provider = self._instances.pop(key)
+            except KeyError:
+                pass
+            else:
+                if now - created < self.ttls.get(name, self.ttl):
+                    self._instances[key] = (created, provider)
+                    metrics.incr('provider_pool', '{}.hits'.format(name))
+                    return provider
+                metrics.incr('provider_pool', '{}.expired'.format(name))
+
+        metrics.incr('provider_pool', '{}.misses'.format(name))
+        # Callers are free to mutate their dicts once they have a provider, don't share them
+        provider = build_provider(name, copy.deepcopy(auth), copy.deepcopy(credentials), copy.deepcopy(settings))
+
+        with self._lock:
+            self._instances[key] = (now, provider)
+            while len(self._instances) > self.size:
+                self._instances.popitem(last=False)
+                metrics.incr('provider_pool', 'evictions')
+
+        return provider
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+
+provider_pool = ProviderPool(
+    size=core_settings.PROVIDER_POOL_SIZE,
+    ttl=core_settings.PROVIDER_POOL_TTL,
+    ttls=core_settings.PROVIDER_POOL_TTLS,
+)
+
+
+def make_provider(name, auth, credentials, settings):
+    """Returns an instance of :class:`waterbutler.core.provider.BaseProvider`,
+    reusing a pooled one if a provider was recently made with the same arguments.
+
+    :param str name: The name of the provider to instantiate. (s3, box, etc)
+    :param dict auth:
+    :param dict credentials:
+    :param dict settings:
+
+    :rtype: :class:`waterbutler.core.provider.BaseProvider`
+    """
+    return provider_pool.get(name, auth, credentials, settings)
+
+
+def fingerprint(obj):
+    """A stable digest of a JSON-like object such as a provider's credentials or settings"""
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode('utf-8')).hexdigest()
 
 
 def as_task(func):
@@ -111,7 +216,7 @@ def async_retry(retries=5, backoff=1, exceptions=(Exception, ), raven=client):
 @asyncio.coroutine
 def send_signed_request(method, url, payload):
     message, signature = signer.sign_payload(payload)
-    return (yield from aiohttp.request(
+    return (yield from connections.request(
         method, url,
         data=json.dumps({
             'payload': message.decode(),
@@ -0,0 +1,274 @@
+"""A disk cache of generated folder zips.
+
+:meth:`BaseProvider.zip` looks archives up by provider, credentials, settings and
+folder, and by a fingerprint of the path, size, etag and modification time of
+every file the walk lists. An unchanged folder is read back from disk rather
+than downloaded and compressed again, while a folder changed by anything,
+WaterButler or not, gets a new fingerprint and misses. Writes decorated with
+:func:`waterbutler.core.cache.invalidates` drop the archives of every folder
+above the paths they change right away.
+
+The cache is off unless ``ZIP_CACHE_PATH`` is set. Once its archives take more
+than ``ZIP_CACHE_SIZE`` bytes the least recently served ones are deleted.
+"""
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import settings
+from waterbutler.core.streams import BaseStream
+from waterbutler.core.streams import FileStreamReader
+from waterbutler.core.path import WaterButlerPath
+
+
+logger = logging.getLogger(__name__)
+
+# Partial archives older than this belong to downloads that were abandoned
+STALE_TEMPORARY = 60 * 60  # seconds
+
+
+def fingerprint(entries):
+    """A digest of the path, size, etag and modification time of every file in the
+    ``(path, metadata)`` `entries` of a walk, None when a file lists neither an etag
+    nor a modification time and a change to it could go unnoticed
+    """
+    files = []
+    for path, metadata in entries:
+        if not path.is_file:
+            continue
+
+        size, etag, modified = (_attribute(metadata, name) for name in ('size', 'etag', 'modified'))
+        if etag is None and modified is None:
+            return None
+        files.append((path.path, size, etag, modified))
+
+    # Walks list folders concurrently, the order of their entries is not stable
+    files.sort(key=lambda file: file[0])
+    return utils.fingerprint(files)
+
+
+def _attribute(metadata, name):
+    try:
+        return getattr(metadata, name)
+    except (AttributeError, KeyError):
+        return None
+
+
+class ZipCacheWriter(BaseStream):
+    """Hands out `stream` while copying it to `file`, opened at `temporary`, which is moved
+    to `final` and reported to `done` once the whole archive has been read. Archives that
+    fail or are not read to the end are discarded. The file is written on an executor.
+    """
+
+    def __init__(self, stream, file, temporary, final, done):
+        super().__init__()
+        self.stream = stream
+        self.file = file
+        self.temporary = temporary
+        self.final = final
+        self.done = done
+
+    @property
+    def size(self):
+        return self.stream.size
+
+    def cancel(self):
+        """Stops the archive and discards what was cached of it, for consumers that give up before its end"""
+        self._discard()
+        self.stream.cancel()
+
+    def close(self):
+        self.cancel()
+
+    def _discard(self):
+        if self.file is not None:
+            file, self.file = self.file, None
+            asyncio.get_event_loop().run_in_executor(None, _discard, file, self.temporary)
+
+    def _write(self, chunk, last):
+        self.file.write(chunk)
+        if last:
+            self.file.close()
+            os.replace(self.temporary, self.final)
+
+    @asyncio.coroutine
+    def _read(self, size):
+        try:
+            chunk = yield from self.stream.read(size)
+        except Exception:
+            self._discard()
+            raise
+
+        if self.file is not None:
+            last = not chunk or self.stream.at_eof()
+            try:
+                yield from asyncio.get_event_loop().run_in_executor(None, self._write, chunk, last)
+            except (OSError, ValueError) as e:
+                # A full or failing disk costs the cache entry, not the download
+                logger.warning('Could not cache zip {}: {!r}'.format(self.final, e))
+                self._discard()
+            else:
+                if last:
+                    self.file = None
+                    self.done()
+
+        if not chunk:
+            self.feed_eof()
+        return chunk
+
+
+def _discard(file, name):
+    file.close()
+    try:
+        os.remove(name)
+    except OSError:
+        pass
+
+
+class ZipCache:
+    """Archives are kept as ``<folder>/<fingerprint>.zip`` below `path`, where ``<folder>`` is
+    a digest of the provider and the folder, so invalidating a folder deletes one directory
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        os.makedirs(path, exist_ok=True)
+
+    def _folder(self, provider, path):
+        return os.path.join(self.path, hashlib.sha256('{}:{}:{}:{}'.format(
+            provider.NAME,
+            utils.fingerprint(provider.credentials),
+            utils.fingerprint(provider.settings),
+            path.path,
+        ).encode('utf-8')).hexdigest())
+
+    def _file(self, provider, path, fingerprint):
+        return os.path.join(self._folder(provider, path), '{}.zip'.format(fingerprint))
+
+    @asyncio.coroutine
+    def _call(self, method, *args):
+        return (yield from asyncio.get_event_loop().run_in_executor(None, method, *args))
+
+    @asyncio.coroutine
+    def get(self, provider, path, fingerprint):
+        """Returns a stream of the archive of `path` cached for `fingerprint`, None when there is none"""
+        try:
+            file = yield from self._call(self._open, self._file(provider, path, fingerprint))
+        except OSError:
+            metrics.incr('zip_cache', '{}.misses'.format(provider.NAME))
+            return None
+
+        metrics.incr('zip_cache', '{}.hits'.format(provider.NAME))
+        stream = FileStreamReader(file)
+        stream.content_type = 'application/zip'
+        return stream
+
+    def _open(self, name):
+        # The modification time of an archive is when it was last served
+        os.utime(name)
+        return open(name, 'rb')
+
+    @asyncio.coroutine
+    def put(self, provider, path, fingerprint, stream):
+        """Returns `stream`, the archive of `path` for `fingerprint`, cached as it is read"""
+        name = self._file(provider, path, fingerprint)
+        temporary = '{}.{}.tmp'.format(name, uuid.uuid4().hex)
+        try:
+            file = yield from self._call(self._create, temporary)
+        except OSError as e:
+            logger.warning('Could not cache zip {}: {!r}'.format(name, e))
+            return stream
+        return ZipCacheWriter(stream, file, temporary, name, self.evict)
+
+    def _create(self, name):
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        return open(name, 'wb')
+
+    def evict(self):
+        """Deletes the least recently served archives in the background until the rest fit in ``size``"""
+        future = asyncio.get_event_loop().run_in_executor(None, self._evict)
+        future.add_done_callback(self._evicted)
+
+    def _evicted(self, future):
+        if future.exception() is not None:
+            logger.warning('Zip cache eviction failed with {!r}'.format(future.exception()))
+
+    def _evict(self):
+        now, files = time.time(), []
+        for folder in os.listdir(self.path):
+            folder = os.path.join(self.path, folder)
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+
+            for name in names:
+                name = os.path.join(folder, name)
+                try:
+                    stat = os.stat(name)
+                except OSError:
+                    continue
+                if name.endswith('.tmp'):
+                    if stat.st_mtime < now - STALE_TEMPORARY:
+                        self._remove(name)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.size:
+                break
+            self._remove(name)
+            metrics.incr('zip_cache', 'evictions')
+            total -= size
+            try:
+                # Only succeeds once the folder has nothing else cached or being written
+                os.rmdir(os.path.dirname(name))
+            except OSError:
+                pass
+
+    def _remove(self, name):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+    @asyncio.coroutine
+    def invalidate(self, provider, *paths):
+        """Deletes the archives of `paths` and of every folder above them"""
+        folders = set()
+        for path in paths:
+            while isinstance(path, WaterButlerPath):
+                folders.add(self._folder(provider, path))
+                path = path.parent
+
+        try:
+            yield from self._call(self._invalidate, folders)
+        except OSError as e:
+            logger.warning('Zip cache invalidation failed with {!r}'.format(e))
+
+    def _invalidate(self, folders):
+        for folder in folders:
+            try:
+                names = os.listdir(folder)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith('.zip'):
+                    self._remove(os.path.join(folder, name))
+                    metrics.incr('zip_cache', 'invalidations')
+
+
+def from_settings():
+    if not settings.ZIP_CACHE_PATH:
+        return None
+    return ZipCache(settings.ZIP_CACHE_PATH, settings.ZIP_CACHE_SIZE)
+
+
+zip_cache = from_settings()
@@ -3,9 +3,11 @@ import http
 import json
 import asyncio
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.box import settings
@@ -14,6 +16,13 @@ from waterbutler.providers.box.metadata import BoxFileMetadata
 from waterbutler.providers.box.metadata import BoxFolderMetadata
 
 
+class _CaseInsensitiveNames(set):
+    """Lowercased names, Box does not allow names differing only by case"""
+
+    def __contains__(self, name):
+        return super().__contains__(name.lower())
+
+
 class BoxProvider(provider.BaseProvider):
     NAME = 'box'
     BASE_URL = settings.BASE_URL
@@ -23,6 +32,7 @@ class BoxProvider(provider.BaseProvider):
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, **kwargs):
         if path == '/':
@@ -82,33 +92,41 @@ class BoxProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def revalidate_path(self, base, path, folder=None):
+        return (yield from self.revalidate_paths(base, [(path, folder)]))[0]
+
+    @asyncio.coroutine
+    def revalidate_paths(self, base, children):
         # TODO Research the search api endpoint
-        resp = yield from self.make_request(
-            'GET',
-            self.build_url('folders', base.identifier, 'items', fields='id,name,type'),
-            expects=(200,),
-            throws=exceptions.ProviderError
-        )
+        entries, offset = {}, 0
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.build_url('folders', base.identifier, 'items', fields='id,name,type', limit=1000, offset=offset),
+                expects=(200,),
+                throws=exceptions.ProviderError
+            )
+            data = yield from resp.json()
 
-        data = yield from resp.json()
-        lower_name = path.lower()
+            for entry in data['entries']:
+                entries.setdefault(entry['name'].lower(), []).append(entry)
 
-        try:
-            item = next(
-                x for x in data['entries']
-                if x['name'].lower() == lower_name and (
-                    folder is None or
-                    (x['type'] == 'folder') == folder
+            offset += len(data['entries'])
+            if not data['entries'] or offset >= data.get('total_count', 0):
+                break
+
+        paths = []
+        for name, folder in children:
+            try:
+                item = next(
+                    x for x in entries.get(name.lower(), ())
+                    if folder is None or (x['type'] == 'folder') == folder
                 )
-            )
-            name = path  # Use path over x['name'] because of casing issues
-            _id = item['id']
-            folder = item['type'] == 'folder'
-        except StopIteration:
-            _id = None
-            name = path
+                # Use name over x['name'] because of casing issues
+                paths.append(base.child(name, _id=item['id'], folder=item['type'] == 'folder'))
+            except StopIteration:
+                paths.append(base.child(name, _id=None, folder=folder))
 
-        return base.child(name, _id=_id, folder=folder)
+        return paths
 
     def can_intra_move(self, other, path=None):
         return self == other
@@ -199,6 +217,7 @@ class BoxProvider(provider.BaseProvider):
 
         return streams.ResponseStreamReader(resp)
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
         if path.identifier and conflict == 'keep':
@@ -227,6 +246,7 @@ class BoxProvider(provider.BaseProvider):
         data = yield from resp.json()
         return BoxFileMetadata(data['entries'][0], path), path.identifier is None
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         if not path.identifier:  # TODO This should be abstracted
@@ -243,6 +263,8 @@ class BoxProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, raw=False, folder=False, revision=None, **kwargs):
         if path.identifier is None:
@@ -270,6 +292,7 @@ class BoxProvider(provider.BaseProvider):
 
         return [BoxRevision(each) for each in [curr] + revisions]
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, **kwargs):
         WaterButlerPath.validate_folder(path)
@@ -370,6 +393,43 @@ class BoxProvider(provider.BaseProvider):
             for each in data['entries']
         ]
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        # Paths are resolved to ids by validate_path, only the id needs to be checked
+        if path.identifier is None:
+            return False
+
+        resp = yield from self.make_request(
+            'GET',
+            self.build_url('folders' if path.is_dir else 'files', path.identifier, fields='id'),
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        # Hands the connection back to the pool, only the status matters
+        yield from resp.release()
+        return resp.status == 200
+
+    @asyncio.coroutine
+    def sibling_names(self, path, **kwargs):
+        # Incremented paths lose their ids so probing them always reports them as free
+        if path.parent.identifier is None:
+            return None
+
+        names, offset = _CaseInsensitiveNames(), 0
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.build_url('folders', path.parent.identifier, 'items', fields='name', limit=1000, offset=offset),
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            data = yield from resp.json()
+            names.update(entry['name'].lower() for entry in data['entries'])
+
+            offset += len(data['entries'])
+            if not data['entries'] or offset >= data['total_count']:
+                return names
+
     def _serialize_item(self, item, path):
         if item['type'] == 'folder':
             serializer = BoxFolderMetadata
@@ -5,12 +5,18 @@ import time
 import asyncio
 import hashlib
 import functools
+import collections
+from urllib import parse
 
 import furl
 
+from waterbutler.core import tree
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.cloudfiles import settings
@@ -99,6 +105,7 @@ class CloudFilesProvider(provider.BaseProvider):
         )
         return streams.ResponseStreamReader(resp)
 
+    @cache.invalidates
     @ensure_connection
     @asyncio.coroutine
     def upload(self, stream, path, check_created=True, fetch_metadata=True, **kwargs):
@@ -133,6 +140,7 @@ class CloudFilesProvider(provider.BaseProvider):
 
         return metadata, created
 
+    @cache.invalidates
     @ensure_connection
     @asyncio.coroutine
     def delete(self, path, **kwargs):
@@ -141,26 +149,7 @@ class CloudFilesProvider(provider.BaseProvider):
         :rtype ResponseStreamReader:
         """
         if path.is_dir:
-            metadata = yield from self.metadata(path, recursive=True)
-
-            delete_files = [
-                os.path.join('/', self.container, path.child(item['name']).path)
-                for item in metadata
-            ]
-
-            delete_files.append(os.path.join('/', self.container, path.path))
-
-            query = {'bulk-delete': ''}
-            yield from self.make_request(
-                'DELETE',
-                self.build_url(**query),
-                data='\n'.join(delete_files),
-                expects=(200, ),
-                throws=exceptions.DeleteError,
-                headers={
-                    'Content-Type': 'text/plain',
-                },
-            )
+            yield from self._bulk_delete((yield from self._object_names(path)))
         else:
             yield from self.make_request(
                 'DELETE',
@@ -169,6 +158,128 @@ class CloudFilesProvider(provider.BaseProvider):
                 throws=exceptions.DeleteError,
             )
 
+    @cache.invalidates
+    @ensure_connection
+    @asyncio.coroutine
+    def delete_many(self, paths, **kwargs):
+        """Deletes the objects at `paths`, folders with every object below them,
+        with bulk-deletes of up to ``BULK_DELETE_CHUNK_SIZE`` objects sent in parallel
+        :param list paths: The paths of the objects and folders to delete
+        """
+        names = []
+        for path in paths:
+            if path.is_dir:
+                names.extend((yield from self._object_names(path)))
+            else:
+                names.append(path.path)
+
+        yield from self._bulk_delete(list(collections.OrderedDict.fromkeys(names)))
+
+    def walk(self, path, **kwargs):
+        """Walks everything below `path` with recursive listings of up to ``LISTING_LIMIT`` objects,
+        folders without a directory marker are implied by the objects below them
+        """
+        if path.is_file:
+            return super().walk(path, **kwargs)
+
+        @asyncio.coroutine
+        def fill(put):
+            listing = tree.Listing(path, lambda folder: CloudFilesFolderMetadata({'subdir': folder.path}))
+
+            @asyncio.coroutine
+            def page(items):
+                entries = []
+                for item in items:
+                    name = item['name'][len(path.path):]
+                    if not name:
+                        continue
+                    if item.get('content_type') == 'application/directory' or name.endswith('/'):
+                        metadata = CloudFilesFolderMetadata({'subdir': item['name'].rstrip('/') + '/'})
+                        entries.extend(listing.entries(name, metadata, folder=True))
+                    else:
+                        entries.extend(listing.entries(name, CloudFilesFileMetadata(item)))
+                yield from put(entries)
+
+            yield from self._list_all(path.path, page)
+
+        return tree.Walk(fill)
+
+    @ensure_connection
+    @asyncio.coroutine
+    def _list_all(self, prefix, page):
+        """Lists every object starting with `prefix`, calling the coroutine function `page`
+        with the objects of each page of the listing as it arrives
+        """
+        query = {'prefix': prefix, 'limit': settings.LISTING_LIMIT}
+
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.build_url('', **query),
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            items = [item for item in (yield from resp.json()) if 'name' in item]
+            yield from page(items)
+
+            if len(items) < settings.LISTING_LIMIT:
+                return
+            query['marker'] = items[-1]['name']
+
+    @asyncio.coroutine
+    def _object_names(self, path):
+        """Lists the names of every object below the folder `path` and its directory markers"""
+        names = []
+
+        @asyncio.coroutine
+        def page(items):
+            names.extend(item['name'] for item in items)
+
+        yield from self._list_all(path.path, page)
+
+        if not path.is_root:
+            names.extend([path.path, path.path.rstrip('/')])
+        return names
+
+    @asyncio.coroutine
+    def _bulk_delete(self, names):
+        """Deletes the objects `names` with bulk-deletes of up to ``BULK_DELETE_CHUNK_SIZE``
+        objects, at most ``DELETE_MANY_CONCURRENCY`` of them at once
+        """
+        window = asyncio.Semaphore(core_settings.DELETE_MANY_CONCURRENCY)
+
+        @asyncio.coroutine
+        def delete(chunk):
+            with (yield from window):
+                resp = yield from self.make_request(
+                    'DELETE',
+                    # Names include their container, bulk-deletes are sent to the account
+                    provider.build_url(self.endpoint, **{'bulk-delete': ''}),
+                    data='\n'.join(parse.quote(os.path.join('/', self.container, name)) for name in chunk),
+                    expects=(200, ),
+                    throws=exceptions.DeleteError,
+                    headers={
+                        'Content-Type': 'text/plain',
+                    },
+                )
+                # Objects that are already gone are not errors, anything else is reported here
+                errors = (yield from resp.json()).get('Errors') or []
+
+            if errors:
+                raise exceptions.DeleteError(
+                    'Unable to delete {} of {} objects: {}'.format(
+                        len(errors), len(chunk),
+                        ', '.join('{} ({})'.format(name, status) for name, status in errors[:10]),
+                    )
+                )
+
+        yield from asyncio.gather(*[
+            delete(names[i:i + settings.BULK_DELETE_CHUNK_SIZE])
+            for i in range(0, len(names), settings.BULK_DELETE_CHUNK_SIZE)
+        ])
+
+    @cache.cached
+    @singleflight.coalesce
     @ensure_connection
     @asyncio.coroutine
     def metadata(self, path, recursive=False, **kwargs):
@@ -182,6 +293,36 @@ class CloudFilesProvider(provider.BaseProvider):
         else:
             return (yield from self._metadata_file(path, **kwargs))
 
+    @ensure_connection
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        """Files are checked with a HEAD, folders by listing at most one object below them
+        and falling back to a HEAD of their directory marker
+        """
+        if path.is_root:
+            return True
+
+        if path.is_dir:
+            resp = yield from self.make_request(
+                'GET',
+                self.build_url('', prefix=path.path, limit=1),
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            if (yield from resp.json()):
+                return True
+
+        resp = yield from self.make_request(
+            'HEAD',
+            self.build_url(path.path.rstrip('/')),
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        yield from resp.release()
+        if resp.status == 404:
+            return False
+        return path.is_dir or resp.headers['Content-Type'] != 'application/directory'
+
     def build_url(self, path, _endpoint=None, **query):
         """Build the url for the specified object
         :param args segments: URI segments
@@ -8,3 +8,8 @@ config = settings.get('CLOUDFILES_PROVIDER_CONFIG', {})
 
 TEMP_URL_SECS = config.get('TEMP_URL_SECS', 100)
 AUTH_URL = config.get('AUTH_URL', 'https://identity.api.rackspacecloud.com/v2.0/tokens')
+
+# Objects listed per request by recursive listings, of walks and folder deletes, at most 10000
+LISTING_LIMIT = config.get('LISTING_LIMIT', 10000)
+# Objects deleted per bulk-delete request, at most 10000
+BULK_DELETE_CHUNK_SIZE = config.get('BULK_DELETE_CHUNK_SIZE', 10000)
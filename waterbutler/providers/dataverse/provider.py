@@ -2,9 +2,11 @@ import asyncio
 import http
 import tempfile
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.dataverse import settings
@@ -42,6 +44,7 @@ class DataverseProvider(provider.BaseProvider):
         # Need to split up the dataverse subpaths and push them into segments
         return super().build_url(*(tuple(path.split('/')) + segments), **query)
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, revision=None, **kwargs):
         """Ensure path is in configured dataset
@@ -67,17 +70,25 @@ class DataverseProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def revalidate_path(self, base, path, folder=False, revision=None):
-        path = path.strip('/')
+        return (yield from self.revalidate_paths(base, [(path, folder)], revision=revision))[0]
 
-        wbpath = None
-        for item in (yield from self._maybe_fetch_metadata(version=revision)):
-            if path == item.name:
-                # Dataverse cant have folders
-                wbpath = base.child(item.name, _id=item.extra['fileId'], folder=False)
-        wbpath = wbpath or base.child(path, _id=None, folder=False)
+    @asyncio.coroutine
+    def revalidate_paths(self, base, children, revision=None):
+        # Later entries win, as they did when the listing was scanned once per path
+        ids = {
+            item.name: item.extra['fileId']
+            for item in (yield from self._maybe_fetch_metadata(version=revision))
+        }
 
-        wbpath.revision = revision or base.revision
-        return wbpath
+        paths = []
+        for path, _ in children:
+            path = path.strip('/')
+            # Dataverse cant have folders
+            wbpath = base.child(path, _id=ids.get(path), folder=False)
+            wbpath.revision = revision or base.revision
+            paths.append(wbpath)
+
+        return paths
 
     @asyncio.coroutine
     def _maybe_fetch_metadata(self, version=None, refresh=False):
@@ -115,6 +126,7 @@ class DataverseProvider(provider.BaseProvider):
         )
         return streams.ResponseStreamReader(resp)
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         """Zips the given stream then uploads to Dataverse.
@@ -156,6 +168,8 @@ class DataverseProvider(provider.BaseProvider):
             expects=(201, ),
             throws=exceptions.UploadError
         )
+        # Pooled instances outlive a request, don't serve the pre-upload listing
+        self._metadata_cache.clear()
 
         # Find appropriate version of file
         metadata = yield from self._get_data('latest')
@@ -164,6 +178,7 @@ class DataverseProvider(provider.BaseProvider):
 
         return file_metadata, path.identifier is None
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         """Deletes the key at the specified path
@@ -180,7 +195,10 @@ class DataverseProvider(provider.BaseProvider):
             expects=(204, ),
             throws=exceptions.DeleteError,
         )
+        self._metadata_cache.clear()
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, version=None, **kwargs):
         """
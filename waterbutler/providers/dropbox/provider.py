@@ -2,9 +2,11 @@ import json
 import http
 import asyncio
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.dropbox import settings
@@ -155,6 +157,7 @@ class DropboxProvider(provider.BaseProvider):
 
         return streams.ResponseStreamReader(resp, size=size)
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
         path, exists = yield from self.handle_name_conflict(path, conflict=conflict)
@@ -171,6 +174,7 @@ class DropboxProvider(provider.BaseProvider):
         data = yield from resp.json()
         return DropboxFileMetadata(data, self.folder), not exists
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         yield from self.make_request(
@@ -181,6 +185,8 @@ class DropboxProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, revision=None, **kwargs):
         if revision:
@@ -229,6 +235,22 @@ class DropboxProvider(provider.BaseProvider):
 
         return DropboxFileMetadata(data, self.folder)
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        # list=false leaves out the contents of folders
+        resp = yield from self.make_request(
+            'GET',
+            self.build_url('metadata', 'auto', path.full_path, list='false'),
+            expects=(200, 404),
+            throws=exceptions.MetadataError
+        )
+        if resp.status == 404:
+            yield from resp.release()
+            return False
+
+        data = yield from resp.json()
+        return not data.get('is_deleted') and (path.is_dir or not data['is_dir'])
+
     @asyncio.coroutine
     def revisions(self, path, **kwargs):
         response = yield from self.make_request(
@@ -245,6 +267,7 @@ class DropboxProvider(provider.BaseProvider):
             if not item.get('is_deleted')
         ]
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, **kwargs):
         """
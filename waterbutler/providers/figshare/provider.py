@@ -2,12 +2,14 @@ import http
 import json
 import asyncio
 
-import aiohttp
 import oauthlib.oauth1
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import connections
+from waterbutler.core import singleflight
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.figshare import metadata
@@ -47,21 +49,35 @@ class BaseFigshareProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def revalidate_path(self, base, path, folder=False):
-        wbpath = base
+        return (yield from self.revalidate_paths(base, [(path, folder)]))[0]
+
+    @asyncio.coroutine
+    def revalidate_paths(self, base, children):
         assert base.is_dir
-        path = path.strip('/')
 
+        entries = {}
         for entry in (yield from self.metadata(base)):
-            if entry.name == path:
-                # base may when refering to a file will have a article id as well
-                # This handles that case so the resulting path is actually correct
-                names, ids = map(lambda x: getattr(entry, x).strip('/').split('/'), ('materialized_path', 'path'))
-                while names and ids:
-                    wbpath = wbpath.child(names.pop(0), _id=ids.pop(0))
-                wbpath._is_folder = entry.kind == 'folder'
-                return wbpath
+            entries.setdefault(entry.name, entry)
+
+        paths = []
+        for path, _ in children:
+            path = path.strip('/')
+            entry = entries.get(path)
+
+            if entry is None:
+                paths.append(base.child(path, folder=False))
+                continue
+
+            # base may when refering to a file will have a article id as well
+            # This handles that case so the resulting path is actually correct
+            wbpath = base
+            names, ids = map(lambda x: getattr(entry, x).strip('/').split('/'), ('materialized_path', 'path'))
+            while names and ids:
+                wbpath = wbpath.child(names.pop(0), _id=ids.pop(0))
+            wbpath._is_folder = entry.kind == 'folder'
+            paths.append(wbpath)
 
-        return base.child(path, folder=False)
+        return paths
 
 
 class FigshareProjectProvider(BaseFigshareProvider):
@@ -70,6 +86,7 @@ class FigshareProjectProvider(BaseFigshareProvider):
         super().__init__(*args, **kwargs)
         self.project_id = self.settings['project_id']
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, **kwargs):
         split = path.rstrip('/').split('/')[1:]
@@ -177,6 +194,7 @@ class FigshareProjectProvider(BaseFigshareProvider):
         provider = yield from self._make_article_provider(path.parts[1].identifier)
         return (yield from provider.download(path, **kwargs))
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         if not path.parent.is_root:
@@ -188,6 +206,7 @@ class FigshareProjectProvider(BaseFigshareProvider):
 
         return (yield from provider.upload(stream, path, **kwargs))
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         provider = yield from self._make_article_provider(path.parts[1].identifier)
@@ -197,6 +216,8 @@ class FigshareProjectProvider(BaseFigshareProvider):
         else:
             yield from provider._remove_from_project(self.project_id)
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, **kwargs):
         if path.is_root:
@@ -220,6 +241,7 @@ class FigshareArticleProvider(BaseFigshareProvider):
         self.article_id = self.settings['article_id']
         self.child = child
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, parent=None, **kwargs):
         split = path.rstrip('/').split('/')[1:]
@@ -319,9 +341,10 @@ class FigshareArticleProvider(BaseFigshareProvider):
                 'Cannot download private files',
                 code=http.client.FORBIDDEN,
             )
-        resp = yield from aiohttp.request('GET', download_url)
+        resp = yield from connections.request('GET', download_url)
         return streams.ResponseStreamReader(resp)
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         yield from self.make_request(
@@ -331,6 +354,7 @@ class FigshareArticleProvider(BaseFigshareProvider):
             throws=exceptions.DeleteError,
         )
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         article_json = yield from self._get_article_json()
@@ -350,6 +374,8 @@ class FigshareArticleProvider(BaseFigshareProvider):
         data = yield from response.json()
         return metadata.FigshareFileMetadata(data, parent=article_json, child=self.child), True
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, **kwargs):
         if path.identifier is None:
@@ -102,6 +102,12 @@ class FileSystemProvider(provider.BaseProvider):
             metadata = self._metadata_file(path)
             return FileSystemFileMetadata(metadata, self.folder)
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        if path.is_dir:
+            return os.path.isdir(path.full_path)
+        return os.path.exists(path.full_path) and not os.path.isdir(path.full_path)
+
     def _metadata_file(self, path, file_name=''):
         full_path = path.full_path if file_name == '' else os.path.join(path.full_path, file_name)
         modified = datetime.datetime.fromtimestamp(os.path.getmtime(full_path))
@@ -1,13 +1,17 @@
 import copy
 import json
 import asyncio
+import collections
 
 import furl
 
 from waterbutler.core import path
+from waterbutler.core import tree
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 
 from waterbutler.providers.github import settings
 from waterbutler.providers.github.metadata import GitHubRevision
@@ -57,6 +61,7 @@ class GitHubProvider(provider.BaseProvider):
         self.owner = self.settings['owner']
         self.repo = self.settings['repo']
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, **kwargs):
         if not getattr(self, '_repo', None):
@@ -129,33 +134,34 @@ class GitHubProvider(provider.BaseProvider):
 
         return streams.ResponseStreamReader(resp, size=data.size)
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, message=None, branch=None, **kwargs):
         assert self.name is not None
         assert self.email is not None
 
+        exists = yield from self.exists(path)
+
         try:
-            exists = yield from self.exists(path)
-        except exceptions.ProviderError as e:
-            if e.data.get('message') == 'Git Repository is empty.':
-                exists = False
-                resp = yield from self.make_request(
-                    'PUT',
-                    self.build_repo_url('contents', '.gitkeep'),
-                    data=json.dumps({
-                        'content': '',
-                        'path': '.gitkeep',
-                        'committer': self.committer,
-                        'branch': path.identifier[0],
-                        'message': 'Initial commit'
-                    }),
-                    expects=(201,),
-                    throws=exceptions.CreateFolderError
-                )
-                data = yield from resp.json()
-                latest_sha = data['commit']['sha']
-        else:
             latest_sha = yield from self._get_latest_sha(ref=path.identifier[0])
+        except exceptions.ProviderError as e:
+            if e.data.get('message') != 'Git Repository is empty.':
+                raise
+            resp = yield from self.make_request(
+                'PUT',
+                self.build_repo_url('contents', '.gitkeep'),
+                data=json.dumps({
+                    'content': '',
+                    'path': '.gitkeep',
+                    'committer': self.committer,
+                    'branch': path.identifier[0],
+                    'message': 'Initial commit'
+                }),
+                expects=(201,),
+                throws=exceptions.CreateFolderError
+            )
+            data = yield from resp.json()
+            latest_sha = data['commit']['sha']
 
         blob = yield from self._create_blob(stream)
         tree = yield from self._create_tree({
@@ -185,6 +191,7 @@ class GitHubProvider(provider.BaseProvider):
             'size': stream.size,
         }, commit=commit), not exists
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, sha=None, message=None, branch=None, **kwargs):
         assert self.name is not None
@@ -195,6 +202,112 @@ class GitHubProvider(provider.BaseProvider):
         else:
             yield from self._delete_file(path, message, **kwargs)
 
+    def walk(self, path, **kwargs):
+        """Walks everything below `path` out of the recursive tree of its branch,
+        falling back to listing folder by folder when the tree is truncated
+        """
+        if path.is_file:
+            return super().walk(path, **kwargs)
+
+        @asyncio.coroutine
+        def fill(put):
+            branch = path.identifier[0]
+            data = yield from self._fetch_tree(branch, recursive=True)
+            if data.get('truncated'):
+                return (yield from self._walk_folders(path, put, **kwargs))
+
+            listing = tree.Listing(
+                path,
+                lambda folder: GitHubFolderTreeMetadata({'path': folder.path.rstrip('/')}),
+                _id=(branch, None),
+            )
+
+            entries = []
+            for item in data['tree']:
+                if not item['path'].startswith(path.path) or item['path'] == path.path.rstrip('/'):
+                    continue
+                name = item['path'][len(path.path):]
+                if item['type'] == 'tree':
+                    entries.extend(listing.entries(name, GitHubFolderTreeMetadata(item), folder=True))
+                elif item['type'] == 'blob':
+                    entries.extend(listing.entries(name, GitHubFileTreeMetadata(item)))
+            yield from put(entries)
+
+        return tree.Walk(fill)
+
+    @cache.invalidates
+    @asyncio.coroutine
+    def delete_many(self, paths, message=None, **kwargs):
+        """Deletes every file and folder in `paths` with a single commit per branch,
+        falling back to one commit per path for trees too large to be listed at once
+        """
+        assert self.name is not None
+        assert self.email is not None
+
+        branches = collections.OrderedDict()
+        for target in paths:
+            branches.setdefault(target.identifier[0], []).append(target)
+
+        for branch, paths in branches.items():
+            yield from self._delete_tree_paths(branch, paths, message=message, **kwargs)
+
+    @asyncio.coroutine
+    def _delete_tree_paths(self, branch, paths, message=None, **kwargs):
+        branch_data = yield from self._fetch_branch(branch)
+
+        old_commit_sha = branch_data['commit']['sha']
+        old_commit_tree_sha = branch_data['commit']['commit']['tree']['sha']
+
+        tree = yield from self._fetch_tree(old_commit_tree_sha, recursive=True)
+        if tree.get('truncated'):
+            return (yield from super().delete_many(paths, message=message, **kwargs))
+
+        found, keep = [target.is_root for target in paths], []
+        for item in tree['tree']:
+            deleted = False
+            for index, target in enumerate(paths):
+                if item['path'] == target.path.rstrip('/') or (target.is_dir and item['path'].startswith(target.path)):
+                    found[index] = deleted = True
+            # Trees are rebuilt from the paths of the blobs left in them
+            if not deleted and item['type'] != 'tree':
+                keep.append({key: item[key] for key in ('path', 'mode', 'type', 'sha')})
+
+        for index, target in enumerate(paths):
+            if not found[index]:
+                raise exceptions.NotFoundError(str(target))
+
+        if keep:
+            tree_sha = (yield from self._create_tree({'tree': keep}))['sha']
+        else:
+            tree_sha = GIT_EMPTY_SHA
+
+        commit_resp = yield from self.make_request(
+            'POST',
+            self.build_repo_url('git', 'commits'),
+            headers={'Content-Type': 'application/json'},
+            data=json.dumps({
+                'message': message or settings.DELETE_MANY_MESSAGE,
+                'committer': self.committer,
+                'tree': tree_sha,
+                'parents': [old_commit_sha],
+            }),
+            expects=(201, ),
+            throws=exceptions.DeleteError,
+        )
+        commit_data = yield from commit_resp.json()
+
+        # Update repository reference, point to the newly created commit.
+        yield from self.make_request(
+            'PATCH',
+            self.build_repo_url('git', 'refs', 'heads', branch),
+            headers={'Content-Type': 'application/json'},
+            data=json.dumps({'sha': commit_data['sha']}),
+            expects=(200, ),
+            throws=exceptions.DeleteError,
+        )
+
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, ref=None, recursive=False, **kwargs):
         """Get Metadata about the requested file or folder
@@ -208,6 +321,21 @@ class GitHubProvider(provider.BaseProvider):
         else:
             return (yield from self._metadata_file(path, ref=ref, **kwargs))
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        # HEAD the contents api, metadata walks commits and the recursive tree for files
+        url = furl.furl(self.build_repo_url('contents', path.path))
+        url.args.update({'ref': path.identifier[0]})
+
+        resp = yield from self.make_request(
+            'HEAD',
+            url.url,
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        yield from resp.release()
+        return resp.status == 200
+
     @asyncio.coroutine
     def revisions(self, path, sha=None, **kwargs):
         resp = yield from self.make_request(
@@ -222,6 +350,7 @@ class GitHubProvider(provider.BaseProvider):
             for item in (yield from resp.json())
         ]
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, branch=None, message=None, **kwargs):
         GitHubPath.validate_folder(path)
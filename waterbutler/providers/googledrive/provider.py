@@ -8,9 +8,11 @@ from urllib import parse
 import furl
 
 from waterbutler.core import path
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 
 from waterbutler.providers.googledrive import settings
 from waterbutler.providers.googledrive import utils as drive_utils
@@ -44,6 +46,7 @@ class GoogleDriveProvider(provider.BaseProvider):
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, file_id=None, **kwargs):
         if path == '/':
@@ -171,6 +174,7 @@ class GoogleDriveProvider(provider.BaseProvider):
             stream.name = path.name + drive_utils.get_download_extension(data)
         return stream
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         assert path.is_file
@@ -186,6 +190,7 @@ class GoogleDriveProvider(provider.BaseProvider):
 
         return GoogleDriveFileMetadata(data, path), path.identifier is None
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         if not path.identifier:
@@ -208,6 +213,50 @@ class GoogleDriveProvider(provider.BaseProvider):
             queries.append("title = '{}'".format(clean_query(title)))
         return ' and '.join(queries)
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        # Paths are resolved to ids by validate_path, only the id needs to be checked
+        if path.identifier is None:
+            return False
+
+        resp = yield from self.make_request(
+            'GET',
+            self.build_url('files', path.identifier, fields='id,labels/trashed'),
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        data = yield from resp.json()
+        return resp.status == 200 and not data['labels']['trashed']
+
+    @asyncio.coroutine
+    def sibling_names(self, path, **kwargs):
+        # Incremented paths lose their ids so probing them always reports them as free.
+        # "contains" is a prefix match on titles, only the possible candidates are listed
+        if path.parent.identifier is None:
+            return None
+
+        query = '{} and title contains \'{}\''.format(
+            self._build_query(path.parent.identifier),
+            clean_query(os.path.splitext(path.name)[0]),
+        )
+
+        names, params = set(), {'q': query, 'fields': 'items(title),nextPageToken', 'maxResults': 1000}
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.build_url('files', **params),
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            data = yield from resp.json()
+            names.update(item['title'] for item in data['items'])
+
+            if not data.get('nextPageToken'):
+                return names
+            params['pageToken'] = data['nextPageToken']
+
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, raw=False, revision=None, **kwargs):
         if path.identifier is None:
@@ -244,6 +293,7 @@ class GoogleDriveProvider(provider.BaseProvider):
             'id': data['etag'] + settings.DRIVE_IGNORE_VERSION,
         })]
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, **kwargs):
         GoogleDrivePath.validate_folder(path)
@@ -6,10 +6,12 @@ import asyncio
 import hashlib
 
 from waterbutler.core import utils
+from waterbutler.core import cache
 from waterbutler.core import signing
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.osfstorage import settings
@@ -41,6 +43,7 @@ class OSFStorageProvider(provider.BaseProvider):
         self.archive_settings = settings.get('archive')
         self.archive_credentials = credentials.get('archive')
 
+    @singleflight.coalesce
     @asyncio.coroutine
     def validate_path(self, path, **kwargs):
         if path == '/':
@@ -74,19 +77,21 @@ class OSFStorageProvider(provider.BaseProvider):
         return WaterButlerPath('/'.join(names), _ids=ids, folder=is_folder)
 
     def revalidate_path(self, base, path, folder=False):
+        return (yield from self.revalidate_paths(base, [(path, folder)]))[0]
+
+    @asyncio.coroutine
+    def revalidate_paths(self, base, children):
         assert base.is_dir
 
-        try:
-            data = next(
-                x for x in
-                (yield from self.metadata(base))
-                if x.name == path and
-                x.kind == ('folder' if folder else 'file')
-            )
+        ids = {
+            (item.name, item.kind): item.path.strip('/')
+            for item in (yield from self.metadata(base))
+        }
 
-            return base.child(data.name, _id=data.path.strip('/'), folder=folder)
-        except StopIteration:
-            return base.child(path, folder=folder)
+        return [
+            base.child(name, _id=ids.get((name, 'folder' if folder else 'file')), folder=folder)
+            for name, folder in children
+        ]
 
     def make_provider(self, settings):
         """Requests on different files may need to use different providers,
@@ -210,6 +215,7 @@ class OSFStorageProvider(provider.BaseProvider):
         download_kwargs['displayName'] = kwargs.get('displayName', name)
         return (yield from provider.download(**download_kwargs))
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         self._create_paths()
@@ -300,6 +306,7 @@ class OSFStorageProvider(provider.BaseProvider):
 
         return OsfStorageFileMetadata(metadata, str(path)), created
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         if path.identifier is None:
@@ -312,6 +319,8 @@ class OSFStorageProvider(provider.BaseProvider):
             expects=(200, )
         )
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, **kwargs):
         if path.identifier is None:
@@ -337,6 +346,7 @@ class OSFStorageProvider(provider.BaseProvider):
             for item in (yield from resp.json())['revisions']
         ]
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, **kwargs):
         resp = yield from self.make_signed_request(
@@ -366,6 +376,13 @@ class OSFStorageProvider(provider.BaseProvider):
 
         return OsfStorageFileMetadata((yield from resp.json()), str(path))
 
+    @asyncio.coroutine
+    def sibling_names(self, path, **kwargs):
+        # Incremented paths lose their ids so probing them always reports them as free
+        if path.parent.identifier is None:
+            return None
+        return {item.name for item in (yield from self._children_metadata(path.parent))}
+
     @asyncio.coroutine
     def _children_metadata(self, path):
         resp = yield from self.make_signed_request(
@@ -1,7 +1,10 @@
 import os
+import base64
 import asyncio
 import hashlib
+import collections
 from urllib import parse
+from xml.sax.saxutils import escape
 
 import xmltodict
 
@@ -9,9 +12,13 @@ from boto.s3.connection import S3Connection
 from boto.s3.connection import OrdinaryCallingFormat
 from boto.s3.connection import SubdomainCallingFormat
 
+from waterbutler.core import tree
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import singleflight
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.s3 import settings
@@ -131,6 +138,7 @@ class S3Provider(provider.BaseProvider):
 
         return streams.ResponseStreamReader(resp)
 
+    @cache.invalidates
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
         """Uploads the given stream to S3
@@ -161,6 +169,7 @@ class S3Provider(provider.BaseProvider):
 
         return (yield from self.metadata(path, **kwargs)), not exists
 
+    @cache.invalidates
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         """Deletes the key at the specified path
@@ -174,6 +183,135 @@ class S3Provider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
 
+    @cache.invalidates
+    @asyncio.coroutine
+    def delete_many(self, paths, **kwargs):
+        """Deletes the keys at `paths` and every key below the folders among them
+        with multi-object deletes of up to ``DELETE_BATCH_SIZE`` keys each
+
+        :param list paths: The paths of the keys and folders to delete
+        """
+        keys = []
+        for path in paths:
+            if path.is_dir:
+                keys.extend((yield from self._list_keys(path.path)))
+            else:
+                keys.append(path.path)
+
+        keys = list(collections.OrderedDict.fromkeys(keys))
+        window = asyncio.Semaphore(core_settings.DELETE_MANY_CONCURRENCY)
+
+        @asyncio.coroutine
+        def delete(batch):
+            with (yield from window):
+                yield from self._delete_keys(batch)
+
+        yield from asyncio.gather(*[
+            delete(keys[i:i + settings.DELETE_BATCH_SIZE])
+            for i in range(0, len(keys), settings.DELETE_BATCH_SIZE)
+        ])
+
+    def walk(self, path, **kwargs):
+        """Walks everything below `path` with listings of up to 1000 keys without a delimiter,
+        folders without a marker key are implied by the keys below them
+        """
+        if path.is_file:
+            return super().walk(path, **kwargs)
+
+        @asyncio.coroutine
+        def fill(put):
+            listing = tree.Listing(path, lambda folder: S3FolderMetadata({'Prefix': folder.path}))
+
+            @asyncio.coroutine
+            def page(contents):
+                entries = []
+                for content in contents:
+                    name = content['Key'][len(path.path):]
+                    if not name:
+                        continue
+                    if content['Key'].endswith('/'):
+                        entries.extend(listing.entries(name, S3FolderKeyMetadata(content), folder=True))
+                    else:
+                        entries.extend(listing.entries(name, S3FileMetadata(content)))
+                yield from put(entries)
+
+            yield from self._list_all(path.path, page)
+
+        return tree.Walk(fill)
+
+    @asyncio.coroutine
+    def _list_keys(self, prefix):
+        """Lists every key starting with `prefix`"""
+        keys = []
+
+        @asyncio.coroutine
+        def page(contents):
+            keys.extend(item['Key'] for item in contents)
+
+        yield from self._list_all(prefix, page)
+        return keys
+
+    @asyncio.coroutine
+    def _list_all(self, prefix, page):
+        """Lists every key starting with `prefix`, calling the coroutine function `page`
+        with the contents of each page of the listing as it arrives
+        """
+        params = {'prefix': prefix}
+
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
+                params=params,
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            parsed = xmltodict.parse((yield from resp.read_and_close()), strip_whitespace=False)['ListBucketResult']
+
+            contents = parsed.get('Contents', [])
+            if isinstance(contents, dict):
+                contents = [contents]
+
+            yield from page(contents)
+
+            if parsed.get('IsTruncated') != 'true' or not contents:
+                return
+            params['marker'] = contents[-1]['Key']
+
+    @asyncio.coroutine
+    def _delete_keys(self, keys):
+        """Deletes up to 1000 `keys` in a single multi-object delete"""
+        body = '<?xml version="1.0" encoding="UTF-8"?><Delete><Quiet>true</Quiet>{}</Delete>'.format(
+            ''.join('<Object><Key>{}</Key></Object>'.format(escape(key)) for key in keys)
+        ).encode('utf-8')
+        headers = {
+            'Content-MD5': base64.b64encode(hashlib.md5(body).digest()).decode('ascii'),
+            'Content-Type': 'application/xml',
+        }
+
+        resp = yield from self.make_request(
+            'POST',
+            self.bucket.generate_url(settings.TEMP_URL_SECS, 'POST', query_parameters={'delete': ''}, headers=headers),
+            data=body,
+            headers=headers,
+            expects=(200, ),
+            throws=exceptions.DeleteError,
+        )
+
+        # Quiet deletes only report the keys that could not be deleted
+        errors = xmltodict.parse((yield from resp.read_and_close()))['DeleteResult'] or {}
+        errors = errors.get('Error', [])
+        if isinstance(errors, dict):
+            errors = [errors]
+
+        if errors:
+            raise exceptions.DeleteError(
+                'Unable to delete {} of {} keys: {}'.format(
+                    len(errors), len(keys),
+                    ', '.join('{} ({})'.format(error['Key'], error['Code']) for error in errors[:10]),
+                )
+            )
+
     @asyncio.coroutine
     def revisions(self, path, **kwargs):
         """Get past versions of the requested key
@@ -201,6 +339,8 @@ class S3Provider(provider.BaseProvider):
             if item['Key'] == path.path
         ]
 
+    @cache.cached
+    @singleflight.coalesce
     @asyncio.coroutine
     def metadata(self, path, revision=None, **kwargs):
         """Get Metadata about the requested file or folder
@@ -213,6 +353,7 @@ class S3Provider(provider.BaseProvider):
 
         return (yield from self._metadata_file(path, revision=revision))
 
+    @cache.invalidates
     @asyncio.coroutine
     def create_folder(self, path, **kwargs):
         """
@@ -232,6 +373,67 @@ class S3Provider(provider.BaseProvider):
 
         return S3FolderMetadata({'Prefix': path.path})
 
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        if path.is_root:
+            return True
+
+        if not path.is_dir:
+            resp = yield from self.make_request(
+                'HEAD',
+                self.bucket.new_key(path.path).generate_url(settings.TEMP_URL_SECS, 'HEAD'),
+                expects=(200, 404),
+                throws=exceptions.MetadataError,
+            )
+            yield from resp.release()
+            return resp.status == 200
+
+        # A folder exists if its marker or any key below it does
+        resp = yield from self.make_request(
+            'GET',
+            self.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
+            params={'prefix': path.path, 'max-keys': 1},
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        if resp.status == 404:
+            yield from resp.release()
+            return False
+        parsed = xmltodict.parse((yield from resp.read_and_close()))['ListBucketResult']
+        return 'Contents' in parsed
+
+    @asyncio.coroutine
+    def sibling_names(self, path, **kwargs):
+        # Every candidate name starts with the original one minus its extension
+        prefix = path.parent.path + os.path.splitext(path.name)[0]
+        names, params = set(), {'prefix': prefix, 'delimiter': '/'}
+
+        while True:
+            resp = yield from self.make_request(
+                'GET',
+                self.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
+                params=params,
+                expects=(200, ),
+                throws=exceptions.MetadataError,
+            )
+            parsed = xmltodict.parse((yield from resp.read_and_close()), strip_whitespace=False)['ListBucketResult']
+
+            contents = parsed.get('Contents', [])
+            prefixes = parsed.get('CommonPrefixes', [])
+
+            if isinstance(contents, dict):
+                contents = [contents]
+
+            if isinstance(prefixes, dict):
+                prefixes = [prefixes]
+
+            keys = [item['Key'] for item in contents] + [item['Prefix'] for item in prefixes]
+            names.update(key[len(path.parent.path):].rstrip('/') for key in keys)
+
+            if parsed.get('IsTruncated') != 'true':
+                return names
+            params['marker'] = parsed.get('NextMarker') or max(keys)
+
     @asyncio.coroutine
     def _metadata_file(self, path, revision=None):
         if revision == 'Latest':
@@ -7,3 +7,6 @@ config = settings.get('S3_PROVIDER_CONFIG', {})
 
 
 TEMP_URL_SECS = config.get('TEMP_URL_SECS', 100)
+
+# Keys deleted per multi-object delete request, at most 1000
+DELETE_BATCH_SIZE = config.get('DELETE_BATCH_SIZE', 1000)
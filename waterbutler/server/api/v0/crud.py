@@ -72,7 +72,7 @@ class CRUDHandler(core.BaseProviderHandler):
         else:
             request_range = None
 
-        result = yield from self.provider.download(range=request_range, **self.arguments)
+        result = yield from self.provider.ranged_download(range=request_range, **self.arguments)
 
         if isinstance(result, str):
             return self.redirect(result)
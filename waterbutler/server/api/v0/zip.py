@@ -1,5 +1,6 @@
 import tornado.gen
 
+from waterbutler.core import streams
 from waterbutler.server import utils
 from waterbutler.server.api.v0 import core
 
@@ -22,4 +23,11 @@ class ZipHandler(core.BaseProviderHandler):
 
         result = yield from self.provider.zip(**self.arguments)
 
-        yield self.write_stream(result)
+        try:
+            if isinstance(result, streams.FileStreamReader):
+                self.set_header('Content-Length', str(result.size))
+
+            yield self.write_stream(result)
+        finally:
+            # Stops listing and downloading the entries of archives the client gave up on
+            result.close()
@@ -4,6 +4,7 @@ import asyncio
 
 import tornado.httputil
 
+from waterbutler.core import streams
 from waterbutler.core import mime_types
 from waterbutler.server import utils
 
@@ -57,7 +58,7 @@ class MetadataMixin:
             request_range = tornado.httputil._parse_request_range(self.request.headers['Range'])
 
         version = self.get_query_argument('version', default=None) or self.get_query_argument('revision', default=None)
-        stream = yield from self.provider.download(
+        stream = yield from self.provider.ranged_download(
             self.path,
             revision=version,
             range=request_range,
@@ -118,6 +119,64 @@ class MetadataMixin:
             utils.make_disposition((self.path.name or 'download') + '.zip')
         )
 
+        if self.get_query_argument('zip', default=None) == 'stored':
+            archive = yield from self.provider.stored_zip(self.path)
+            if archive is not None:
+                return (yield from self.download_stored_zip(archive))
+
         result = yield from self.provider.zip(self.path)
 
-        yield self.write_stream(result)
+        try:
+            if isinstance(result, streams.FileStreamReader):
+                # An archive from the zip cache, its size is known
+                self.set_header('Content-Length', str(result.size))
+
+            yield self.write_stream(result)
+        finally:
+            # Stops listing and downloading the entries of archives the client gave up on
+            result.close()
+
+    @asyncio.coroutine
+    def download_stored_zip(self, archive):
+        request_range, etag = None, archive.etag
+        # Archives of entries whose changes can not be detected are not resumable, a range of
+        # them could be spliced onto one of a different version
+        if etag is not None:
+            etag = '"{}"'.format(etag)
+            self.set_header('Etag', etag)
+            self.set_header('Accept-Ranges', 'bytes')
+
+        # A range of an archive laid out differently than the one it resumes would corrupt it
+        if etag is not None and 'Range' in self.request.headers and self.request.headers.get('If-Range', etag) == etag:
+            request_range = tornado.httputil._parse_request_range(self.request.headers['Range'])
+            yield from archive.load_crcs()
+
+        start, end = 0, archive.size
+        if request_range is not None:
+            start, end = request_range
+            if (start is not None and start >= archive.size) or end == 0:
+                self.set_status(416)
+                self.set_header('Content-Range', 'bytes */{}'.format(archive.size))
+                return
+
+            if start is None:
+                start = 0
+            elif start < 0:
+                start = max(start + archive.size, 0)
+            end = archive.size if end is None else min(end, archive.size)
+
+            if start >= end:
+                self.set_status(416)
+                self.set_header('Content-Range', 'bytes */{}'.format(archive.size))
+                return
+
+        if request_range is not None and archive.needs_downloads(start, end):
+            # Serving it would download entries outside of it, the whole archive costs no more
+            start, end = 0, archive.size
+        elif request_range is not None:
+            self.set_status(206)
+            self.set_header('Content-Range', tornado.httputil._get_content_range(start, end, archive.size))
+
+        self.set_header('Content-Length', str(end - start))
+
+        yield self.write_stream(archive.stream(start, end))
@@ -1,6 +1,8 @@
 import tornado.web
 
 import waterbutler
+from waterbutler.core import breaker
+from waterbutler.core import metrics
 
 
 class StatusHandler(tornado.web.RequestHandler):
@@ -9,5 +11,7 @@ class StatusHandler(tornado.web.RequestHandler):
         """List information about waterbutler status"""
         self.write({
             'status': 'up',
-            'version': waterbutler.__version__
+            'version': waterbutler.__version__,
+            'metrics': metrics.snapshot(),
+            'upstreams': breaker.states(),
         })
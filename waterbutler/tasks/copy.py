@@ -34,6 +34,13 @@ def copy(src_bundle, dest_bundle, callback_url, auth, start_time=None, **kwargs)
 
     logger.info('Starting copying {!r}, {!r} to {!r}, {!r}'.format(src_path, src_provider, dest_path, dest_provider))
 
+    manifest = None
+    if src_path.is_dir:
+        # A retry of this task loads what the failed attempt saved, _folder_file_op skips
+        # the files it recorded that are still at the destination
+        manifest = yield from core.load_checkpoint('copy', src_provider, src_path, dest_provider, dest_path, **kwargs)
+        kwargs['checkpoint'] = manifest
+
     try:
         metadata, created = yield from src_provider.copy(dest_provider, src_path, dest_path, **kwargs)
     except Exception as e:
@@ -43,7 +50,11 @@ def copy(src_bundle, dest_bundle, callback_url, auth, start_time=None, **kwargs)
     else:
         logger.info('Copy succeeded')
         data.update({'destination': dict(src_bundle, **metadata.serialized())})
+        if manifest is not None:
+            yield from manifest.discard()
     finally:
+        if manifest is not None:
+            logger.info('Transferred {transferred} files, {bytes} bytes, skipped {skipped} files'.format(**manifest.progress))
         resp = yield from utils.send_signed_request('PUT', callback_url, dict(data, **{
             'time': time.time() + 60,
             'email': time.time() - start_time > settings.WAIT_TIMEOUT
@@ -1,10 +1,15 @@
 import os
+import time
 import pickle
 import asyncio
 import functools
 
 from celery.backends.base import DisabledBackend
+from celery.backends.base import KeyValueStoreBackend
 
+from waterbutler.core import utils
+from waterbutler.core import checkpoint
+from waterbutler.core import settings as core_settings
 from waterbutler.tasks import app
 from waterbutler.tasks import settings
 from waterbutler.tasks import exceptions
@@ -80,6 +85,74 @@ def adhoc_file_backend(func, was_bound=False, basepath=None):
     return wrapped
 
 
+CHECKPOINT_PREFIX = 'waterbutler-checkpoint-'
+
+
+class FileStore:
+    """Keeps checkpoints next to the results of the adhoc file backend. Every write
+    deletes the checkpoints not written for ``CHECKPOINT_TTL`` seconds, those of
+    tasks that were given up on.
+    """
+
+    def __init__(self, basepath=None, ttl=None):
+        self.basepath = basepath or settings.ADHOC_BACKEND_PATH
+        self.ttl = core_settings.CHECKPOINT_TTL if ttl is None else ttl
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.basepath, key), 'rb') as checkpoint_file:
+                return checkpoint_file.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        path = os.path.join(self.basepath, key)
+        # Write then rename so a crash never leaves half a checkpoint behind
+        with open(path + '.tmp', 'wb') as checkpoint_file:
+            checkpoint_file.write(value)
+        os.replace(path + '.tmp', path)
+        self.prune()
+
+    def prune(self):
+        expired = time.time() - self.ttl
+        for name in os.listdir(self.basepath):
+            path = os.path.join(self.basepath, name)
+            try:
+                if name.startswith(CHECKPOINT_PREFIX) and os.path.getmtime(path) < expired:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.basepath, key))
+        except FileNotFoundError:
+            pass
+
+
+def checkpoint_store():
+    """The store of the task backend, None if it can not hold checkpoints"""
+    if isinstance(app.backend, DisabledBackend):
+        return FileStore()
+    if isinstance(app.backend, KeyValueStoreBackend):
+        return app.backend
+    return None
+
+
+@asyncio.coroutine
+def load_checkpoint(action, src_provider, src_path, dest_provider, dest_path, **kwargs):
+    """Loads the :class:`waterbutler.core.checkpoint.Manifest` of a folder copy or move,
+    the same for every retry or resubmission of a task with the same arguments
+    """
+    key = CHECKPOINT_PREFIX + utils.fingerprint([
+        action,
+        src_provider.NAME, src_provider.settings, str(src_path), src_path.identifier,
+        dest_provider.NAME, dest_provider.settings, str(dest_path), dest_path.identifier,
+        kwargs,
+    ])
+    return (yield from checkpoint.Manifest(key, store=checkpoint_store()).load())
+
+
 def celery_task(func, *args, **kwargs):
     """A wrapper around Celery.task.
     When the wrapped method is called it will be called using